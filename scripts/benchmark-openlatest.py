@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+"""Compares openlatest's directory scan with the listdir()/isfile()/getmtime() scan it replaced.
+
+Synthetic directories of empty files are created in a temporary directory, then each scan is run in its own process so
+that it starts with a cold Python and a warm dentry cache.  When strace is installed, each run is traced and the stat
+and getdents system calls are counted.
+"""
+
+import argparse
+import os
+import os.path
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+TRACED_SYSCALLS = ['getdents64', 'newfstatat', 'statx', 'stat', 'lstat', 'fstatat64']
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+LISTDIR_SCAN = '''
+import os, os.path, sys
+directory = sys.argv[1]
+files = (os.path.join(directory, name) for name in os.listdir(directory))
+files = (name for name in files if not os.path.basename(name).startswith('.') and os.path.isfile(name))
+print(max(files, key=os.path.getmtime, default=None))
+'''
+
+SCANDIR_SCAN = '''
+import sys
+sys.path.insert(0, sys.argv[2])
+import openlatest
+print(openlatest.get_latest_file([sys.argv[1]], False, openlatest.KEY_BY_MOD_TIME))
+'''
+
+SCANS = [('listdir', LISTDIR_SCAN), ('scandir', SCANDIR_SCAN)]
+
+
+def main():
+    opts = parse_args()
+    strace = shutil.which('strace')
+
+    if strace is None:
+        print('strace is not installed, so system calls will not be counted.', file=sys.stderr)
+
+    print('{:>9}  {:<8}  {:>9}  {:>10}  {:>10}'.format('entries', 'scan', 'seconds', 'stat calls', 'getdents'))
+
+    with tempfile.TemporaryDirectory(prefix='openlatest-benchmark-', dir=opts.dir) as root:
+        for size in opts.sizes:
+            directory = os.path.join(root, str(size))
+            create_directory(directory, size)
+
+            for name, scan in SCANS:
+                seconds, counts = run_scan(scan, directory, strace)
+                print('{:>9}  {:<8}  {:>9.3f}  {:>10}  {:>10}'.format(
+                    size, name, seconds, format_count(counts, TRACED_SYSCALLS[1:]),
+                    format_count(counts, TRACED_SYSCALLS[:1])))
+
+            shutil.rmtree(directory)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmarks the directory scan of openlatest.')
+    parser.add_argument('sizes', nargs='*', type=int, default=DEFAULT_SIZES, metavar='N',
+                        help='The number of files in each synthetic directory (default: %(default)s)')
+    parser.add_argument('--dir', action='store', default=None, metavar='DIR', dest='dir',
+                        help='Create the synthetic directories in DIR, to benchmark a particular file system ' +
+                        '(default: the system temporary directory)')
+
+    return parser.parse_args()
+
+
+def create_directory(directory, size):
+    os.makedirs(directory)
+
+    for i in range(size):
+        os.close(os.open(os.path.join(directory, 'file-{:07d}.log'.format(i)), os.O_CREAT | os.O_WRONLY, 0o644))
+
+
+def run_scan(scan, directory, strace):
+    cmd = [sys.executable, '-c', scan, directory, SRC_DIR]
+    counts = None
+
+    if strace is None:
+        start = time.monotonic()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+        seconds = time.monotonic() - start
+    else:
+        with tempfile.NamedTemporaryFile('r') as summary:
+            start = time.monotonic()
+            subprocess.run([strace, '-f', '-c', '-o', summary.name, '-e', 'trace=' + ','.join(TRACED_SYSCALLS)] + cmd,
+                           check=True, stdout=subprocess.DEVNULL)
+            seconds = time.monotonic() - start
+            counts = parse_strace_summary(summary.read())
+
+    return seconds, counts
+
+
+def parse_strace_summary(summary):
+    """Reads the number of calls of each system call from the table that `strace -c' writes."""
+    counts = {}
+
+    for line in summary.splitlines():
+        match = re.match(r'^\s*[\d.]+\s+[\d.]+\s+\d+\s+(\d+)\s+(?:\d+\s+)?(\w+)\s*$', line)
+
+        if match:
+            counts[match.group(2)] = int(match.group(1))
+
+    return counts
+
+
+def format_count(counts, syscalls):
+    return 'n/a' if counts is None else str(sum(counts.get(syscall, 0) for syscall in syscalls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+#!/bin/bash
+
+# Checks that `sysmonitor --watch' stays within its CPU overhead budget.  sysmonitor exits with a non-zero status when
+# a counted watch goes over the budget.
+
+py_src_dir="$(dirname "$0")/../src"
+
+python3 "${py_src_dir}/sysmonitor.py" --watch 0.1 --watch-count 100 --disk --net --pressure --loadavg \
+    --watch-file /dev/null --watch-max-bytes 0 "$@"
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
 import argparse
+import collections
+import io
+import json
 import os
 import os.path
 import shlex
@@ -8,8 +11,16 @@ import shutil
 import subprocess
 import sys
 import tempfile
+import threading
 from collections.abc import Sequence
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, fields
+from typing import Optional, TextIO
+
+from catvidslib import probe
+from catvidslib import progress
+from jnscommons import jnsindex
+from jnscommons import jnsstr
 
 
 class ExitCodeError(Exception):
@@ -18,17 +29,52 @@ class ExitCodeError(Exception):
         self.exit_code = exit_code
 
 
+class PreflightError(Exception):
+    pass
+
+
 @dataclass
 class CvOpts:
     dry_run: str
+    force: bool
+    jobs: int
+    probe_jobs: int
+    summary_file: Optional[str]
     source_directories: Sequence[str]
 
 
 _CMD_FFMPEG = 'ffmpeg'
+_CMD_FFPROBE = 'ffprobe'
 _DEFAULT_OUTPUT_EXTENSION = 'mp4'
+_DEFAULT_JOBS = 1
+_DEFAULT_PROBE_JOBS = min(32, (os.cpu_count() or 1) + 4)
+
+_MANIFEST_VERSION = 1
+
+_PROBE_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.jns', 'catvids', 'probe-cache.json')
+
+# The encoders to use to re-encode a video to match the other videos, by the name of the codec it has to match.  Codecs
+# that are not here are encoded with the encoder of the same name.
+_ENCODERS = {
+    'av1': 'libaom-av1',
+    'h264': 'libx264',
+    'hevc': 'libx265',
+    'mp3': 'libmp3lame',
+    'opus': 'libopus',
+    'vorbis': 'libvorbis',
+    'vp8': 'libvpx',
+    'vp9': 'libvpx-vp9',
+}
+
+_EXIT_CODE_FAILURE = 1
+_EXIT_CODE_PARTIAL_FAILURE = 2
 
 _FORMAT_DIM = '\033[2m'
 _FORMAT_PLAIN = '\033[0m'
+_FORMAT_CLEAR_LINE = '\r\033[K'
+
+_SUMMARY_FILE_STDOUT = '-'
+_SUMMARY_LOCK = threading.Lock()
 
 
 def main() -> None:
@@ -51,19 +97,41 @@ def _parse_args() -> CvOpts:
 
     parser.add_argument('--dry-run', action='store_true', dest='dry_run', default=False,
                         help='Print the commands that will be executed but do not invoke them (default: %(default)s).')
+    parser.add_argument('-f', '--force', action='store_true', dest='force', default=False,
+                        help='Concatenate the videos even if the output is up to date (default: %(default)s).')
+    parser.add_argument('-j', '--jobs', action='store', type=int, dest='jobs', default=_DEFAULT_JOBS, metavar='N',
+                        help='Concatenate the videos of up to N source directories at the same time.  The output of '
+                        'each directory is printed once it is done (default: %(default)s).')
+    parser.add_argument('--probe-jobs', action='store', type=int, dest='probe_jobs', default=_DEFAULT_PROBE_JOBS,
+                        metavar='N',
+                        help='Probe up to N videos at the same time before concatenating them (default: %(default)s).')
+    parser.add_argument('--summary', action='store', dest='summary_file', default=None, metavar='FILE',
+                        help='Append a JSON line with the size, duration and throughput of each concatenated video to '
+                        f'FILE, or print it if FILE is {_SUMMARY_FILE_STDOUT} (default: %(default)s).')
     parser.add_argument(action='store', metavar='source_directory', dest='source_directories', nargs='+',
                         help='The source directory that contains the videos to be concatenated.')
 
     args = parser.parse_args()
     return CvOpts(
         dry_run=args.dry_run,
+        force=args.force,
+        jobs=args.jobs,
+        probe_jobs=args.probe_jobs,
+        summary_file=args.summary_file,
         source_directories=args.source_directories,
     )
 
 
 def _validate_opts(opts: CvOpts) -> None:
-    if shutil.which(_CMD_FFMPEG) is None:
-        raise ExitCodeError(f'{_CMD_FFMPEG} must be installed an available on the system path', exit_code=1)
+    for cmd in [_CMD_FFMPEG, _CMD_FFPROBE]:
+        if shutil.which(cmd) is None:
+            raise ExitCodeError(f'{cmd} must be installed an available on the system path', exit_code=1)
+
+    if opts.jobs < 1:
+        raise ExitCodeError(f'The number of jobs must be at least 1. (jobs={opts.jobs})', exit_code=1)
+
+    if opts.probe_jobs < 1:
+        raise ExitCodeError(f'The number of probe jobs must be at least 1. (probe_jobs={opts.probe_jobs})', exit_code=1)
 
     for source_directory in opts.source_directories:
         if len(source_directory) == 0:
@@ -77,35 +145,334 @@ def _validate_opts(opts: CvOpts) -> None:
 
 
 def _concat_vids(opts: CvOpts) -> None:
-    for source_directory in opts.source_directories:
-        _concat_vids_for_source(opts, source_directory)
-        print()
+    probe_cache = probe.ProbeCache(_PROBE_CACHE_FILE, _CMD_FFPROBE)
+
+    try:
+        _concat_vids_with_cache(opts, probe_cache)
+    finally:
+        _save_probe_cache(probe_cache)
 
-def _concat_vids_for_source(opts: CvOpts, source_directory: str) -> None:
-    with tempfile.TemporaryDirectory() as temp_dir:
-        listing_file_name = os.path.join(temp_dir, 'catvids-listing.txt')
-        output_file_name = _get_output_file_name(source_directory)
 
-        with open(listing_file_name, 'w', encoding='utf-8') as listing_file:
-            for vid_file_name in sorted(os.listdir(source_directory)):
-                listing_file.write(f"file '{os.path.abspath(os.path.join(source_directory, vid_file_name))}'\n")
+def _concat_vids_with_cache(opts: CvOpts, probe_cache: probe.ProbeCache) -> None:
+    failures: dict[str, Exception] = {}
 
-        print(f'Listing for {output_file_name}:')
+    if opts.jobs == 1:
+        for source_directory in opts.source_directories:
+            error = _try_concat_vids_for_source(opts, source_directory, sys.stdout, probe_cache)
+            print()
+
+            if error is not None:
+                failures[source_directory] = error
+    else:
+        with ThreadPoolExecutor(max_workers=opts.jobs) as executor:
+            futures = {
+                executor.submit(_concat_vids_for_source_job, opts, source_directory, probe_cache): source_directory
+                for source_directory in opts.source_directories
+            }
+
+            # Each job's output is printed all at once, as soon as that job is done, so jobs never interleave
+            for future in as_completed(futures):
+                output, error = future.result()
+                print(output, flush=True)
+
+                if error is not None:
+                    failures[futures[future]] = error
+
+    _raise_for_failures(opts, failures)
+
+
+def _concat_vids_for_source_job(
+    opts: CvOpts,
+    source_directory: str,
+    probe_cache: probe.ProbeCache,
+) -> tuple[str, Optional[Exception]]:
+    out = io.StringIO()
+    error = _try_concat_vids_for_source(opts, source_directory, out, probe_cache)
+
+    return out.getvalue(), error
+
+
+def _try_concat_vids_for_source(
+    opts: CvOpts,
+    source_directory: str,
+    out: TextIO,
+    probe_cache: probe.ProbeCache,
+) -> Optional[Exception]:
+    error = None
+
+    try:
+        _concat_vids_for_source(opts, source_directory, out, probe_cache)
+    except (OSError, PreflightError, subprocess.CalledProcessError) as e:
+        print(f'Could not concatenate the videos in {source_directory}: {_describe_error(e)}', file=out, flush=True)
+        error = e
+
+    return error
+
+
+def _raise_for_failures(opts: CvOpts, failures: dict[str, Exception]) -> None:
+    if failures:
+        lines = [f'{len(failures)} of {len(opts.source_directories)} source directories failed:']
+        lines.extend(f'  {d}: {_describe_error(failures[d])}' for d in opts.source_directories if d in failures)
+        exit_code = _EXIT_CODE_FAILURE if len(failures) == len(opts.source_directories) else _EXIT_CODE_PARTIAL_FAILURE
+
+        raise ExitCodeError('\n'.join(lines), exit_code=exit_code)
+
+
+def _describe_error(error: Exception) -> str:
+    if isinstance(error, subprocess.CalledProcessError):
+        description = f'{error.cmd[0]} exited with status {error.returncode}'
+    else:
+        description = str(error)
+
+    return description
+
+
+def _concat_vids_for_source(
+    opts: CvOpts,
+    source_directory: str,
+    out: TextIO,
+    probe_cache: probe.ProbeCache,
+) -> None:
+    output_file_name = _get_output_file_name(source_directory)
+    vids = _preflight(opts, source_directory, out, probe_cache)
+    manifest = _create_manifest(vids)
+
+    if not opts.force and _is_up_to_date(output_file_name, manifest):
+        print(f'Skipping {source_directory}, {output_file_name} is up to date.', file=out, flush=True)
+    else:
+        stats = _concat_vids_into(opts, out, vids, output_file_name, manifest)
+
+        if stats is not None:
+            print(f'Wrote {output_file_name}: {_format_summary(stats)}', file=out, flush=True)
+            _write_summary(opts, source_directory, output_file_name, stats)
+
+
+def _concat_vids_into(
+    opts: CvOpts,
+    out: TextIO,
+    vids: Sequence[tuple[str, probe.MediaInfo]],
+    output_file_name: str,
+    manifest: dict,
+) -> Optional[progress.RunStats]:
+    # Re-encoded videos can be as big as the originals, so they are kept next to the output instead of in /tmp.  This
+    # also puts the new output on the same file system as the old one, so it can be renamed over it.
+    with tempfile.TemporaryDirectory(prefix='.catvids-', dir=os.path.dirname(output_file_name)) as temp_dir:
+        listing_file_name = _write_listing(opts, out, vids, temp_dir)
+        temp_output_file_name = os.path.join(temp_dir, os.path.basename(output_file_name))
+
+        print(f'Listing for {output_file_name}:', file=out)
         with open(listing_file_name, 'r', encoding='utf-8') as listing_file:
-            print(listing_file.read().strip())
+            print(listing_file.read().strip(), file=out, flush=True)
 
-        _run(
+        stats = _run(
             opts,
+            out,
             [
                 _CMD_FFMPEG,
                 '-f', 'concat',
                 '-safe', '0',
                 '-i', listing_file_name,
                 '-c', 'copy',
-                _get_output_file_name(source_directory),
-            ]
+                temp_output_file_name,
+            ],
+            _get_total_duration(vids),
         )
 
+        # The output only ever appears once it is whole, so an interrupted run leaves the old output, or none
+        if not opts.dry_run:
+            os.replace(temp_output_file_name, output_file_name)
+            _write_manifest(output_file_name, manifest)
+
+    return stats
+
+
+def _write_listing(
+    opts: CvOpts,
+    out: TextIO,
+    vids: Sequence[tuple[str, probe.MediaInfo]],
+    temp_dir: str,
+) -> str:
+    reference = _get_reference_media_info(vids)
+    listing_file_name = os.path.join(temp_dir, 'catvids-listing.txt')
+
+    with open(listing_file_name, 'w', encoding='utf-8') as listing_file:
+        for i, (vid_file_name, info) in enumerate(vids):
+            if info.get_streams() != reference.get_streams():
+                vid_file_name = _normalize_vid(opts, out, vid_file_name, info, reference, temp_dir, i)
+
+            listing_file.write(f"file '{os.path.abspath(vid_file_name)}'\n")
+
+    return listing_file_name
+
+
+def _preflight(
+    opts: CvOpts,
+    source_directory: str,
+    out: TextIO,
+    probe_cache: probe.ProbeCache,
+) -> list[tuple[str, probe.MediaInfo]]:
+    file_names = [os.path.join(source_directory, name) for name in sorted(os.listdir(source_directory))]
+    file_names = [file_name for file_name in file_names if os.path.isfile(file_name)]
+
+    with ThreadPoolExecutor(max_workers=opts.probe_jobs) as executor:
+        infos = list(executor.map(probe_cache.probe, file_names))
+
+    vids = []
+
+    for file_name, info in zip(file_names, infos):
+        if info is None:
+            print(f'Skipping {file_name}, which is not a video.', file=out)
+        else:
+            vids.append((file_name, info))
+
+    if not vids:
+        raise PreflightError(f'There are no videos in {source_directory}')
+
+    return vids
+
+
+def _create_manifest(vids: Sequence[tuple[str, probe.MediaInfo]]) -> dict:
+    inputs = []
+
+    for vid_file_name, _ in vids:
+        stat = os.stat(vid_file_name)
+        inputs.append([os.path.basename(vid_file_name), stat.st_size, stat.st_mtime_ns])
+
+    return {'version': _MANIFEST_VERSION, 'inputs': inputs}
+
+
+def _is_up_to_date(output_file_name: str, manifest: dict) -> bool:
+    old_manifest = jnsindex.read_index(_get_manifest_file_name(output_file_name), manifest['version'])
+
+    try:
+        output_stat = os.stat(output_file_name)
+    except OSError:
+        output_stat = None
+
+    # The output is checked too, so an output that was replaced or changed since it was written is written again
+    return (
+        old_manifest is not None
+        and output_stat is not None
+        and old_manifest.get('inputs') == manifest['inputs']
+        and old_manifest.get('output') == [output_stat.st_size, output_stat.st_mtime_ns]
+    )
+
+
+def _write_manifest(output_file_name: str, manifest: dict) -> None:
+    output_stat = os.stat(output_file_name)
+    jnsindex.write_index(
+        _get_manifest_file_name(output_file_name),
+        {**manifest, 'output': [output_stat.st_size, output_stat.st_mtime_ns]},
+    )
+
+
+def _get_manifest_file_name(output_file_name: str) -> str:
+    return os.path.join(os.path.dirname(output_file_name), f'.{os.path.basename(output_file_name)}.catvids.json')
+
+
+def _get_reference_media_info(vids: Sequence[tuple[str, probe.MediaInfo]]) -> probe.MediaInfo:
+    # The streams that most of the videos have are kept, so that the fewest videos are re-encoded.  Ties go to the
+    # streams of the first video.
+    counts = collections.Counter(info.get_streams() for _, info in vids)
+    first_indexes: dict[tuple, int] = {}
+
+    for i, (_, info) in enumerate(vids):
+        first_indexes.setdefault(info.get_streams(), i)
+
+    streams = max(counts, key=lambda s: (counts[s], -first_indexes[s]))
+    return vids[first_indexes[streams]][1]
+
+
+def _normalize_vid(
+    opts: CvOpts,
+    out: TextIO,
+    vid_file_name: str,
+    info: probe.MediaInfo,
+    reference: probe.MediaInfo,
+    temp_dir: str,
+    index: int,
+) -> str:
+    differences = ', '.join(_describe_stream_differences(info, reference))
+    print(f'Re-encoding {vid_file_name} to match the other videos ({differences})', file=out)
+
+    normalized_file_name = os.path.join(temp_dir, f'normalized-{index:04d}.{_DEFAULT_OUTPUT_EXTENSION}')
+    _run(opts, out, _create_normalize_cmd(vid_file_name, info, reference, normalized_file_name), info.duration)
+
+    return normalized_file_name
+
+
+def _describe_stream_differences(info: probe.MediaInfo, reference: probe.MediaInfo) -> list[str]:
+    differences = []
+
+    for stream, reference_stream, codec_type in [(info.video, reference.video, 'video'),
+                                                 (info.audio, reference.audio, 'audio')]:
+        if stream is None or reference_stream is None:
+            if stream is not reference_stream:
+                differences.append(f'{"no" if stream is None else "extra"} {codec_type} stream')
+            continue
+
+        for field in fields(stream):
+            value = getattr(stream, field.name)
+            reference_value = getattr(reference_stream, field.name)
+
+            if value != reference_value:
+                differences.append(f'{codec_type} {field.name} {value} instead of {reference_value}')
+
+    return differences
+
+
+def _create_normalize_cmd(
+    vid_file_name: str,
+    info: probe.MediaInfo,
+    reference: probe.MediaInfo,
+    normalized_file_name: str,
+) -> list[str]:
+    cmd = [_CMD_FFMPEG, '-nostdin', '-y', '-i', vid_file_name]
+    video = reference.video
+    audio = reference.audio
+
+    if video is not None and info.video is None:
+        raise PreflightError(f'{vid_file_name} has no video, so it cannot be concatenated with the other videos')
+
+    if audio is not None and info.audio is None:
+        # Silence is added for the length of the video, so the audio of the videos after it stays in sync
+        channel_layout = {1: 'mono', 2: 'stereo'}.get(audio.channels, f'{audio.channels}c')
+        cmd.extend(['-f', 'lavfi', '-i', f'anullsrc=channel_layout={channel_layout}:sample_rate={audio.sample_rate}',
+                    '-shortest'])
+
+    if video is not None:
+        cmd.extend([
+            '-map', '0:v:0',
+            '-c:v', _ENCODERS.get(video.codec_name, video.codec_name),
+            '-vf', f'scale={video.width}:{video.height},format={video.pix_fmt}',
+            '-r', video.frame_rate,
+            '-video_track_timescale', video.time_base.rpartition('/')[2],
+        ])
+
+    if audio is not None:
+        cmd.extend([
+            '-map', '0:a:0' if info.audio is not None else '1:a:0',
+            '-c:a', _ENCODERS.get(audio.codec_name, audio.codec_name),
+            '-ar', str(audio.sample_rate),
+            '-ac', str(audio.channels),
+        ])
+
+    cmd.append(normalized_file_name)
+    return cmd
+
+
+def _get_total_duration(vids: Sequence[tuple[str, probe.MediaInfo]]) -> Optional[float]:
+    durations = [info.duration for _, info in vids]
+    return None if None in durations else sum(durations)
+
+
+def _save_probe_cache(probe_cache: probe.ProbeCache) -> None:
+    try:
+        probe_cache.save()
+    except OSError as e:
+        # The cache only saves probing the same videos again later
+        print(f'Could not save the probe cache. (cache_file={probe_cache.cache_file}, error={e})', file=sys.stderr)
+
 
 def _get_output_file_name(source_directory: str) -> str:
     abs_path = os.path.abspath(source_directory)
@@ -115,15 +482,104 @@ def _get_output_file_name(source_directory: str) -> str:
     return f'{os.path.join(parent_dir, base_name)}.{_DEFAULT_OUTPUT_EXTENSION}'
 
 
-def _run(opts: CvOpts, cmd: Sequence[str]) -> None:
-    _print_dim(' '.join([shlex.quote(part) for part in cmd]))
+def _run(
+    opts: CvOpts,
+    out: TextIO,
+    cmd: Sequence[str],
+    total_seconds: Optional[float] = None,
+) -> Optional[progress.RunStats]:
+    # ffmpeg's own statistics are replaced by its machine readable progress, which is read from its output
+    cmd = [cmd[0], '-nostats', '-progress', 'pipe:1', *cmd[1:]]
+    _print_dim(' '.join([shlex.quote(part) for part in cmd]), out)
+
+    return None if opts.dry_run else _run_with_progress(out, cmd, total_seconds)
+
+
+def _run_with_progress(out: TextIO, cmd: Sequence[str], total_seconds: Optional[float]) -> progress.RunStats:
+    stats = progress.RunStats(total_seconds)
+    parser = progress.ProgressParser()
+    interactive = out is sys.stdout
+    live = interactive and out.isatty()
+
+    # A job's output is kept with the rest of its output, so ffmpeg's messages are collected in a file that is read
+    # once it is done.  The job cannot be interacted with, so ffmpeg is given no input and fails instead of asking
+    # whether to overwrite an existing output.
+    with tempfile.TemporaryFile('w+', encoding='utf-8', errors='replace') as messages:
+        with subprocess.Popen(
+            cmd,
+            stdin=None if interactive else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=None if interactive else messages,
+            text=True,
+            errors='replace',
+        ) as process:
+            for line in process.stdout:
+                update = parser.feed(line)
+
+                if update is not None:
+                    stats.update(update)
+
+                    if live:
+                        print(_FORMAT_CLEAR_LINE + _format_stats(stats), end='', file=out, flush=True)
+
+        if live:
+            print(file=out)
+
+        messages.seek(0)
+        out.write(messages.read())
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
+
+    return stats
+
+
+def _format_stats(stats: progress.RunStats) -> str:
+    parts = []
+    percent = stats.get_percent()
+    eta_seconds = stats.get_eta_seconds()
+
+    if percent is not None:
+        parts.append(f'{percent:5.1f}%')
+
+    parts.append(f'{stats.total_size / progress.BYTES_IN_MEGABYTE:.1f} MB')
+    parts.append(f'{stats.get_megabytes_per_second():.1f} MB/s')
+    parts.append(f'{stats.get_speed():.2f}x')
+    parts.append(f'elapsed {jnsstr.seconds_to_minutes_and_seconds(stats.elapsed_seconds)}')
+
+    if eta_seconds is not None and percent is not None and percent < 100:
+        parts.append(f'ETA {jnsstr.seconds_to_minutes_and_seconds(eta_seconds)}')
+
+    return '  '.join(parts)
+
+
+def _format_summary(stats: progress.RunStats) -> str:
+    return (f'{stats.total_size / progress.BYTES_IN_MEGABYTE:.1f} MB in '
+            f'{jnsstr.seconds_to_minutes_and_seconds(stats.elapsed_seconds)} '
+            f'({stats.get_megabytes_per_second():.1f} MB/s, {stats.get_speed():.2f}x)')
+
+
+def _write_summary(opts: CvOpts, source_directory: str, output_file_name: str, stats: progress.RunStats) -> None:
+    if opts.summary_file is None:
+        return
+
+    summary = json.dumps({
+        'source_directory': os.path.abspath(source_directory),
+        'output_file': output_file_name,
+        **stats.to_summary(),
+    })
 
-    if not opts.dry_run:
-        subprocess.run(cmd, check=True)
+    # Jobs finish at the same time, so each whole line is written by one job at a time
+    with _SUMMARY_LOCK:
+        if opts.summary_file == _SUMMARY_FILE_STDOUT:
+            print(summary, flush=True)
+        else:
+            with open(opts.summary_file, 'a', encoding='utf-8') as summary_file:
+                summary_file.write(summary + '\n')
 
 
-def _print_dim(output: str) -> None:
-    print(_FORMAT_DIM + output + _FORMAT_PLAIN, flush=True)
+def _print_dim(output: str, out: TextIO = sys.stdout) -> None:
+    print(_FORMAT_DIM + output + _FORMAT_PLAIN, file=out, flush=True)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,193 @@
+import json
+import os
+import os.path
+import subprocess
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Optional
+
+from jnscommons import jnsindex
+
+
+_CACHE_VERSION = 1
+
+# The formats that ffprobe reports for files that are not videos, even though it can read them: still images and
+# plain text
+_NON_MEDIA_FORMATS = ('image2', 'tty')
+_NON_MEDIA_FORMAT_SUFFIX = '_pipe'
+
+
+@dataclass(frozen=True)
+class StreamInfo:
+    """The parameters of a stream that have to match between files for them to be concatenated without re-encoding."""
+    codec_type: str
+    codec_name: str
+    time_base: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    pix_fmt: Optional[str] = None
+    frame_rate: Optional[str] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    """The streams that ffmpeg uses by default from a file (its first video and first audio stream) and its duration."""
+    duration: Optional[float]
+    video: Optional[StreamInfo]
+    audio: Optional[StreamInfo]
+
+    def get_streams(self) -> tuple[Optional[StreamInfo], Optional[StreamInfo]]:
+        return self.video, self.audio
+
+
+class ProbeCache:
+    """Probes files with ffprobe, and remembers what it found by each file's path, size and modification time.
+
+    A file is only probed again once its size or modification time changes.  Files that are not videos are remembered
+    too, so they are not probed again either.  The cache can be used from several threads at once.
+
+    Args:
+        cache_file: the file that the cache is kept in.
+        ffprobe_cmd: the ffprobe command.
+    """
+
+    def __init__(self, cache_file: str, ffprobe_cmd: str):
+        self.cache_file = cache_file
+        self.ffprobe_cmd = ffprobe_cmd
+        self._entries = _read_cache(cache_file)
+        self._lock = threading.Lock()
+        self._changed = False
+
+    def probe(self, file_name: str) -> Optional[MediaInfo]:
+        """Returns a file's streams, or None if the file is not a video or audio file."""
+        path = os.path.abspath(file_name)
+        stat = os.stat(path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+
+        if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            info = _media_info_from_dict(entry['info'])
+        else:
+            info = _run_ffprobe(self.ffprobe_cmd, path)
+
+            with self._lock:
+                self._entries[path] = {
+                    'size': stat.st_size,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'info': None if info is None else asdict(info),
+                }
+                self._changed = True
+
+        return info
+
+    def save(self) -> None:
+        """Writes the cache, if anything was probed, forgetting the files that no longer exist."""
+        entries = None
+
+        with self._lock:
+            if self._changed:
+                entries = {path: entry for path, entry in self._entries.items() if os.path.exists(path)}
+                self._changed = False
+
+        if entries is not None:
+            _write_cache(self.cache_file, entries)
+
+
+def _run_ffprobe(ffprobe_cmd: str, path: str) -> Optional[MediaInfo]:
+    result = subprocess.run(
+        [ffprobe_cmd, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', path],
+        stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+
+    probe = None
+
+    if result.returncode == 0:
+        try:
+            probe = json.loads(result.stdout)
+        except ValueError:
+            probe = None
+
+    return None if probe is None else _media_info_from_probe(probe)
+
+
+def _media_info_from_probe(probe: dict[str, Any]) -> Optional[MediaInfo]:
+    format_name = probe.get('format', {}).get('format_name', '')
+    streams = probe.get('streams', [])
+    video = next((_stream_info_from_probe(s) for s in streams if s.get('codec_type') == 'video'
+                  and not s.get('disposition', {}).get('attached_pic')), None)
+    audio = next((_stream_info_from_probe(s) for s in streams if s.get('codec_type') == 'audio'), None)
+
+    info = None
+
+    if (video is not None or audio is not None) and format_name not in _NON_MEDIA_FORMATS and \
+            not format_name.endswith(_NON_MEDIA_FORMAT_SUFFIX):
+        info = MediaInfo(duration=_to_float(probe.get('format', {}).get('duration')), video=video, audio=audio)
+
+    return info
+
+
+def _stream_info_from_probe(stream: dict[str, Any]) -> StreamInfo:
+    if stream['codec_type'] == 'video':
+        info = StreamInfo(
+            codec_type='video',
+            codec_name=stream.get('codec_name', ''),
+            time_base=stream.get('time_base', ''),
+            width=stream.get('width'),
+            height=stream.get('height'),
+            pix_fmt=stream.get('pix_fmt'),
+            frame_rate=stream.get('r_frame_rate'),
+        )
+    else:
+        info = StreamInfo(
+            codec_type='audio',
+            codec_name=stream.get('codec_name', ''),
+            time_base=stream.get('time_base', ''),
+            sample_rate=to_int(stream.get('sample_rate')),
+            channels=stream.get('channels'),
+        )
+
+    return info
+
+
+def _media_info_from_dict(info: Optional[dict[str, Any]]) -> Optional[MediaInfo]:
+    media_info = None
+
+    if info is not None:
+        media_info = MediaInfo(
+            duration=info['duration'],
+            video=StreamInfo(**info['video']) if info['video'] else None,
+            audio=StreamInfo(**info['audio']) if info['audio'] else None,
+        )
+
+    return media_info
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = None
+
+    return number
+
+
+def to_int(value: Any) -> Optional[int]:
+    """Converts a number read from ffprobe or ffmpeg to an int.  Returns None if it is missing or not a number."""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = None
+
+    return number
+
+
+def _read_cache(cache_file: str) -> dict[str, Any]:
+    cache = jnsindex.read_index(cache_file, _CACHE_VERSION)
+    return cache.get('entries', {}) if cache is not None else {}
+
+
+def _write_cache(cache_file: str, entries: dict[str, Any]) -> None:
+    jnsindex.write_index(cache_file, {'version': _CACHE_VERSION, 'entries': entries})
@@ -0,0 +1,103 @@
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from catvidslib import probe
+
+
+BYTES_IN_MEGABYTE = 1000 * 1000
+
+
+@dataclass
+class Progress:
+    """One update from `ffmpeg -progress'."""
+    media_seconds: float
+    total_size: int
+    done: bool
+
+
+class ProgressParser:
+    """Reads the `key=value' lines that `ffmpeg -progress' writes, one line at a time.
+
+    ffmpeg writes a block of keys for every update, and ends each block with `progress=continue', or with
+    `progress=end' after the last one.
+    """
+
+    def __init__(self):
+        self._values: dict[str, str] = {}
+
+    def feed(self, line: str) -> Optional[Progress]:
+        """Reads a line.  Returns the update once its block is complete, otherwise None."""
+        key, separator, value = line.strip().partition('=')
+        progress = None
+
+        if separator:
+            self._values[key] = value
+
+        if separator and key == 'progress':
+            values, self._values = self._values, {}
+            progress = Progress(
+                media_seconds=_parse_media_seconds(values),
+                total_size=probe.to_int(values.get('total_size')) or 0,
+                done=value == 'end',
+            )
+
+        return progress
+
+
+@dataclass
+class RunStats:
+    """How far along an ffmpeg run is, and how fast it is going.
+
+    Args:
+        total_seconds: how long the output will be, in seconds, or None if it is not known.
+    """
+    total_seconds: Optional[float]
+    media_seconds: float = 0.0
+    total_size: int = 0
+    elapsed_seconds: float = 0.0
+    _start: float = field(default_factory=time.monotonic, repr=False)
+
+    def update(self, progress: Progress) -> None:
+        self.media_seconds = progress.media_seconds
+        self.total_size = progress.total_size
+        self.elapsed_seconds = time.monotonic() - self._start
+
+    def get_percent(self) -> Optional[float]:
+        return min(100.0, 100.0 * self.media_seconds / self.total_seconds) if self.total_seconds else None
+
+    def get_megabytes_per_second(self) -> float:
+        return self.total_size / BYTES_IN_MEGABYTE / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def get_speed(self) -> float:
+        """Returns how many seconds of output are written per second."""
+        return self.media_seconds / self.elapsed_seconds if self.elapsed_seconds > 0 else 0.0
+
+    def get_eta_seconds(self) -> Optional[float]:
+        speed = self.get_speed()
+        eta_seconds = None
+
+        if self.total_seconds and speed > 0:
+            eta_seconds = max(0.0, self.total_seconds - self.media_seconds) / speed
+
+        return eta_seconds
+
+    def to_summary(self) -> dict[str, Optional[float]]:
+        return {
+            'bytes': self.total_size,
+            'elapsed_seconds': round(self.elapsed_seconds, 3),
+            'media_seconds': round(self.media_seconds, 3),
+            'expected_media_seconds': self.total_seconds,
+            'megabytes_per_second': round(self.get_megabytes_per_second(), 3),
+            'speed': round(self.get_speed(), 3),
+        }
+
+
+def _parse_media_seconds(values: dict[str, str]) -> float:
+    # ffmpeg writes out_time_ms in microseconds too, so either one will do
+    microseconds = probe.to_int(values.get('out_time_us'))
+
+    if microseconds is None:
+        microseconds = probe.to_int(values.get('out_time_ms')) or 0
+
+    return max(0.0, microseconds / 1000000)
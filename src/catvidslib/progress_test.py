@@ -0,0 +1,57 @@
+import unittest
+
+from catvidslib import progress
+
+
+class ProgressParserTest(unittest.TestCase):
+
+    def test_update_per_block(self):
+        parser = progress.ProgressParser()
+
+        self.assertIsNone(parser.feed('out_time_us=1500000\n'))
+        self.assertIsNone(parser.feed('total_size=2048\n'))
+        self.assertEqual(parser.feed('progress=continue\n'),
+                         progress.Progress(media_seconds=1.5, total_size=2048, done=False))
+        self.assertIsNone(parser.feed('out_time_us=3000000\n'))
+        self.assertEqual(parser.feed('progress=end\n'),
+                         progress.Progress(media_seconds=3.0, total_size=0, done=True))
+
+    def test_unknown_and_missing_values(self):
+        parser = progress.ProgressParser()
+        parser.feed('out_time_us=N/A')
+        parser.feed('out_time_ms=250000')
+        parser.feed('not a value')
+
+        self.assertEqual(parser.feed('progress=continue'),
+                         progress.Progress(media_seconds=0.25, total_size=0, done=False))
+
+
+class RunStatsTest(unittest.TestCase):
+
+    def test_rates(self):
+        stats = progress.RunStats(total_seconds=100.0, _start=0.0)
+        stats.update(progress.Progress(media_seconds=25.0, total_size=10 * progress.BYTES_IN_MEGABYTE, done=False))
+        stats.elapsed_seconds = 5.0
+
+        self.assertEqual(stats.get_percent(), 25.0)
+        self.assertEqual(stats.get_speed(), 5.0)
+        self.assertEqual(stats.get_megabytes_per_second(), 2.0)
+        self.assertEqual(stats.get_eta_seconds(), 15.0)
+
+    def test_unknown_length(self):
+        stats = progress.RunStats(total_seconds=None)
+
+        self.assertIsNone(stats.get_percent())
+        self.assertIsNone(stats.get_eta_seconds())
+        self.assertEqual(stats.get_speed(), 0.0)
+        self.assertEqual(stats.get_megabytes_per_second(), 0.0)
+
+    def test_percent_is_at_most_100(self):
+        stats = progress.RunStats(total_seconds=10.0)
+        stats.media_seconds = 11.0
+
+        self.assertEqual(stats.get_percent(), 100.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,9 +4,13 @@ import argparse
 import os
 import os.path
 import shlex
+import shutil
 import subprocess
 import sys
 
+from cheatlib import nameindex
+from cheatlib import searchindex
+from cheatlib import sections
 from jnscommons import jnsstr
 
 
@@ -16,9 +20,16 @@ from jnscommons import jnsstr
 
 
 DEFAULT_EDITOR = 'vim'
+DEFAULT_PAGER = 'less'
+DEFAULT_MAX_SEARCH_RESULTS = 10
+DEFAULT_MAX_SEARCH_SNIPPETS = 3
+DEFAULT_MAX_SUGGESTIONS = 5
+DEFAULT_PATH_TIMEOUT = 5.0
 
 NO_ERROR = 0
 ERR_CHEATSHEET_NOT_FOUND = 2
+ERR_NO_SEARCH_RESULTS = 3
+ERR_SECTION_NOT_FOUND = 4
 
 
 # #### #
@@ -42,12 +53,38 @@ def _parse_opts():
     # positional arguments
     parser.add_argument('cheatsheet', nargs='?', metavar='cheatsheet', default='',
                         help='The cheatsheet to be viewed')
+    parser.add_argument('section', nargs='*', metavar='section',
+                        help='Print only the section of the cheatsheet whose heading matches these words')
 
     # optional arguments
+    parser.add_argument('-f', '--fuzzy', action='store_true', default=False, dest='fuzzy',
+                        help='View the cheatsheet with the most similar name when there is no cheatsheet with the ' +
+                        'requested name (default:  %(default)s)')
     parser.add_argument('-l', '--list', action='store_true', default=False, dest='list_cheatsheets',
                         help='List the available cheatsheets (default:  %(default)s)')
     parser.add_argument('-p', '--list-path', action='store_true', default=False, dest='list_paths',
                         help='Display the paths that will be searched to find the cheatsheets (default:  %(default)s)')
+    parser.add_argument('--pager', action='store_true', default=False, dest='pager',
+                        help='Show the cheatsheet in $PAGER instead of opening it in an editor (default:  %(default)s)')
+    parser.add_argument('-o', '--stdout', action='store_true', default=False, dest='stdout',
+                        help='Print the cheatsheet instead of opening it in an editor (default:  %(default)s)')
+    parser.add_argument('-s', '--search', action='store', nargs='+', default=None, metavar='TERM', dest='search_terms',
+                        help='List the cheatsheets that contain every TERM, best match first (default:  %(default)s)')
+    parser.add_argument('--max-results', action='store', type=int, default=DEFAULT_MAX_SEARCH_RESULTS, metavar='N',
+                        dest='max_results',
+                        help='The most cheatsheets to list when searching (default:  %(default)s)')
+    parser.add_argument('--max-snippets', action='store', type=int, default=DEFAULT_MAX_SEARCH_SNIPPETS, metavar='N',
+                        dest='max_snippets',
+                        help='The most matching lines to show for each cheatsheet when searching ' +
+                        '(default:  %(default)s)')
+    parser.add_argument('--max-suggestions', action='store', type=int, default=DEFAULT_MAX_SUGGESTIONS, metavar='N',
+                        dest='max_suggestions',
+                        help='The most similar cheatsheet names to suggest when a cheatsheet is not found ' +
+                        '(default:  %(default)s)')
+    parser.add_argument('-t', '--timeout', action='store', type=float, default=DEFAULT_PATH_TIMEOUT, metavar='SECONDS',
+                        dest='timeout',
+                        help='Skip the paths that cannot be read within SECONDS, or 0 to wait for every path ' +
+                        '(default:  %(default)s)')
     parser.add_argument('--verbose', action='store_true', default=False, dest='verbose',
                         help='Display more information about what actions are being taken (default:  %(default)s)')
 
@@ -76,6 +113,41 @@ def _create_help_epilog():
     e.append(' * Paths can contain whitespace but cannot start or end with a whitespace character')
     e.append(' * The paths will be searched for the requested cheatsheet in the order that they are specified')
     e.append(' * The default path will be searched first')
+    e.append('')
+    e.append('SLOW PATHS')
+    e.append('All of the paths are read at the same time, so a slow path, such as one on a network mount, does not '
+             'hold up the others.  A cheatsheet is viewed as soon as it is found and every path before it has been '
+             'read.  Paths that cannot be read within --timeout seconds are skipped and reported, instead of making '
+             '`{}\' hang.'.format(os.path.basename(sys.argv[0])))
+    e.append('')
+    e.append('INDEX')
+    e.append('The paths from the configuration file and the names of the cheatsheets in each path are remembered in an '
+             'index here:')
+    e.append('  {}'.format(_get_name_index_file_name()))
+    e.append('The configuration file is only read again when it changes, and a path is only listed again when its '
+             'modification time changes.  The index can be deleted at any time.')
+    e.append('')
+    e.append('SECTIONS')
+    e.append('Words after the cheatsheet name print just the section of the cheatsheet whose markdown heading matches '
+             'them, instead of opening the cheatsheet in an editor.  For example, `{} git configs\' prints the section '
+             'under the "Configs" heading of the git cheatsheet.  The section goes to $PAGER instead with --pager.  '
+             'Where each section starts and ends is remembered in an index here:'.format(
+                 os.path.basename(sys.argv[0])))
+    e.append('  {}'.format(_get_heading_index_file_name()))
+    e.append('')
+    e.append('SIMILAR NAMES')
+    e.append('When there is no cheatsheet with the requested name, the cheatsheets with the most similar names are '
+             'suggested, or with --fuzzy the most similar one is viewed.  Names are compared by the three letter '
+             'sequences they share, which are kept in the index, so only the names that have something in common with '
+             'the requested name are compared.')
+    e.append('')
+    e.append('SEARCHING')
+    e.append('--search lists the cheatsheets that contain every one of the terms, ranked by how often the terms appear '
+             'and how rare they are, along with the lines that contain the most terms.  Terms are matched as whole '
+             'words and without regard to case.  The words in every cheatsheet are remembered in an index here:')
+    e.append('  {}'.format(_get_search_index_file_name()))
+    e.append('A cheatsheet is only read again when its modification time or size changes.  Cheatsheets that cannot '
+             'be checked within --timeout seconds are searched as they were last indexed.')
 
     return jnsstr.wrap_str_array(e)
 
@@ -87,53 +159,159 @@ def _create_help_epilog():
 
 def _perform_action(opts):
     err = NO_ERROR
+    index = _create_name_index(opts)
 
     if opts.list_cheatsheets:
-        err = _perform_list_cheatsheets()
+        err = _perform_list_cheatsheets(index)
     elif opts.list_paths:
-        err = _perform_list_paths()
+        err = _perform_list_paths(index)
+    elif opts.search_terms:
+        err = _perform_search(opts, index)
     else:
-        err = _perform_view_cheatsheet(opts)
+        err = _perform_view_cheatsheet(opts, index)
+
+    _save_index(opts, index)
+    _print_timed_out_paths(opts, index)
 
     return err
 
 
-def _perform_list_cheatsheets():
-    for path in _get_paths():
-        print('\n'.join(_get_cheatsheets_in_path(path)))
+def _perform_list_cheatsheets(index):
+    for _, cheatsheets in _get_cheatsheets(index):
+        print('\n'.join(cheatsheets))
 
     return NO_ERROR
 
 
-def _is_cheatsheet_file(path, file_name):
-    return os.path.isfile(os.path.join(path, file_name)) and not file_name.startswith('.')
-
-
-def _perform_list_paths():
-    print('\n'.join(_get_paths()))
+def _perform_list_paths(index):
+    print('\n'.join(_get_paths(index)))
     return NO_ERROR
 
 
-def _perform_view_cheatsheet(opts):
+def _perform_view_cheatsheet(opts, index):
     err = NO_ERROR
-    path, file_name = next(
-        ((p, f) for p in _get_paths() for f in os.listdir(p) if _is_requested_cheatsheet(opts, p, f)),
-        (None, None)
-    )
+    path, file_name = index.find_cheatsheet(opts.cheatsheet)
+    suggestions = []
+
+    if not (path and file_name):
+        suggestions = index.find_similar_cheatsheets(opts.cheatsheet, opts.max_suggestions)
+
+        if opts.fuzzy and suggestions:
+            path, file_name = suggestions[0]
+
+            if opts.verbose:
+                print('Cheatsheet not found, viewing the most similar: {}'.format(file_name), flush=True)
 
     if path and file_name:
-        err = _launch_cheatsheet_in_editor(opts, path, file_name)
+        err = _view_cheatsheet(opts, path, file_name)
     else:
-        print('Cheatsheet not found in any paths:\n{}'.format('\n'.join(_get_paths())), file=sys.stderr)
+        print('Cheatsheet not found in any paths:\n{}'.format('\n'.join(_get_paths(index))), file=sys.stderr)
+        _print_suggestions(suggestions)
         err = ERR_CHEATSHEET_NOT_FOUND
 
     return err
 
+
+def _print_suggestions(suggestions):
+    if suggestions:
+        print('\nDid you mean:', file=sys.stderr)
+
+        for path, file_name in suggestions:
+            print('  {}  ({})'.format(os.path.splitext(file_name)[0], os.path.join(path, file_name)), file=sys.stderr)
+
+
+def _perform_search(opts, index):
+    err = NO_ERROR
+    file_names = [os.path.join(path, f) for path, cheatsheets in _get_cheatsheets(index) for f in cheatsheets]
+
+    with searchindex.SearchIndex(_get_search_index_file_name(), timeout=_get_timeout(opts)) as search_index:
+        search_index.update(file_names)
+        results = search_index.search(' '.join(opts.search_terms), opts.max_results, opts.max_snippets)
+        _print_timed_out_files(opts, search_index)
+
+    for result in results:
+        print(result.file_name)
+
+        for snippet in result.snippets:
+            print('  {}: {}'.format(snippet.line_number, snippet.line))
+
+    if not results:
+        print('No cheatsheets contain: {}'.format(' '.join(opts.search_terms)), file=sys.stderr)
+        err = ERR_NO_SEARCH_RESULTS
+
+    return err
+
+
 # ############################## #
 # Cheatsheet Launching Functions #
 # ############################## #
 
 
+def _view_cheatsheet(opts, path, cheatsheet_file):
+    err = NO_ERROR
+
+    if opts.section:
+        err = _print_section(opts, os.path.join(path, cheatsheet_file))
+    elif opts.stdout or opts.pager:
+        err = _print_cheatsheet(opts, os.path.join(path, cheatsheet_file))
+    else:
+        err = _launch_cheatsheet_in_editor(opts, path, cheatsheet_file)
+
+    return err
+
+
+def _print_cheatsheet(opts, cheatsheet_file):
+    with open(cheatsheet_file, 'rb') as f:
+        return _write_output(opts, lambda out: shutil.copyfileobj(f, out))
+
+
+def _print_section(opts, cheatsheet_file):
+    err = NO_ERROR
+    query = ' '.join(opts.section)
+    heading_index = sections.HeadingIndex(_get_heading_index_file_name())
+    headings = heading_index.get_headings(cheatsheet_file)
+    _save_index(opts, heading_index)
+    heading = sections.find_section(headings, query)
+
+    if heading:
+        section = sections.read_section(cheatsheet_file, heading)
+        err = _write_output(opts, lambda out: out.write(section))
+    else:
+        print('Section not found in {}: {}'.format(cheatsheet_file, query), file=sys.stderr)
+
+        if headings:
+            print('\nSections:\n{}'.format('\n'.join('  ' * (h.level - 1) + h.title for h in headings)),
+                  file=sys.stderr)
+
+        err = ERR_SECTION_NOT_FOUND
+
+    return err
+
+
+def _write_output(opts, write_fn):
+    err = NO_ERROR
+
+    if opts.pager:
+        cmd = _get_pager_command()
+
+        if opts.verbose:
+            print(' '.join([shlex.quote(part) for part in cmd]), flush=True)
+
+        with subprocess.Popen(cmd, stdin=subprocess.PIPE) as pager:
+            try:
+                write_fn(pager.stdin)
+                pager.stdin.close()
+            except BrokenPipeError:
+                pass  # The pager was closed before it read everything
+
+        err = pager.returncode
+    else:
+        write_fn(sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+
+    return err
+
+
 def _launch_cheatsheet_in_editor(opts, path, cheatsheet_file):
     cmd = _get_editor_command()
     cmd.append(os.path.join(path, cheatsheet_file))
@@ -144,11 +322,43 @@ def _launch_cheatsheet_in_editor(opts, path, cheatsheet_file):
     return subprocess.call(cmd)
 
 
-def _is_requested_cheatsheet(opts, path, file_name):
-    return _is_cheatsheet_file(path, file_name) and (
-        opts.cheatsheet == file_name or
-        opts.cheatsheet == os.path.splitext(file_name)[0]
-    )
+# ################## #
+# Indexing Functions #
+# ################## #
+
+
+def _create_name_index(opts):
+    return nameindex.NameIndex(_get_name_index_file_name(), _get_config_file_name(), _get_config_file_paths,
+                               [_get_jns_cheatsheets_path()], timeout=_get_timeout(opts))
+
+
+def _get_timeout(opts):
+    return opts.timeout if opts.timeout > 0 else None
+
+
+def _save_index(opts, index):
+    try:
+        index.save()
+    except OSError as e:
+        # The index only makes the next run faster, so the action still succeeds without it
+        if opts.verbose:
+            print('Could not save the cheatsheet index: {}'.format(e), file=sys.stderr)
+
+
+def _get_name_index_file_name():
+    return os.path.join(_get_index_dir(), 'names.json')
+
+
+def _get_search_index_file_name():
+    return os.path.join(_get_index_dir(), 'search.sqlite3')
+
+
+def _get_heading_index_file_name():
+    return os.path.join(_get_index_dir(), 'headings.json')
+
+
+def _get_index_dir():
+    return os.path.join(_get_home_dir(), '.jns', 'cheat-index')
 
 
 # ############## #
@@ -156,13 +366,8 @@ def _is_requested_cheatsheet(opts, path, file_name):
 # ############## #
 
 
-def _get_paths():
-    paths = []
-
-    paths.append(_get_jns_cheatsheets_path())
-    paths.extend(_get_config_file_paths())
-
-    return paths
+def _get_paths(index):
+    return index.get_paths()
 
 
 def _get_jns_cheatsheets_path():
@@ -173,8 +378,7 @@ def _get_jns_cheatsheets_path():
     ))
 
 
-def _get_config_file_paths():
-    config_file_name = _get_config_file_name()
+def _get_config_file_paths(config_file_name):
     paths = []
 
     if os.path.exists(config_file_name):
@@ -210,8 +414,20 @@ def _get_path_from_config_line(line):
     return path
 
 
-def _get_cheatsheets_in_path(path):
-    return [f for f in os.listdir(path) if _is_cheatsheet_file(path, f)]
+def _get_cheatsheets(index):
+    return index.iter_cheatsheets()
+
+
+def _print_timed_out_paths(opts, index):
+    if index.timed_out_paths:
+        print('Skipped these paths because they could not be read within {} seconds:\n{}'.format(
+            opts.timeout, '\n'.join(index.timed_out_paths)), file=sys.stderr)
+
+
+def _print_timed_out_files(opts, search_index):
+    if search_index.timed_out_files:
+        print('Searched what was already indexed for these cheatsheets because they could not be checked within {} '
+              'seconds:\n{}'.format(opts.timeout, '\n'.join(search_index.timed_out_files)), file=sys.stderr)
 
 
 # ####################### #
@@ -234,5 +450,9 @@ def _get_editor_command():
     return shlex.split(os.environ.get('EDITOR', DEFAULT_EDITOR))
 
 
+def _get_pager_command():
+    return shlex.split(os.environ.get('PAGER', DEFAULT_PAGER))
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,95 @@
+import collections
+
+
+# The most names that share trigrams with the requested name to compare it with more carefully
+MAX_CANDIDATES = 50
+
+# How similar a name has to be to the requested name to be suggested, from 0 to 1
+DEFAULT_MIN_SIMILARITY = 0.5
+
+
+def trigrams(name):
+    """Returns the set of three character sequences in a name.
+
+    The name is lowercased and padded like PostgreSQL's pg_trgm does, so that the start and end of the name count for
+    more than its middle.
+    """
+    padded = '  {} '.format(name.lower())
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def create_trigram_index(names):
+    """Maps every trigram in a list of names to the indexes of the names that contain it."""
+    index = collections.defaultdict(list)
+
+    for i, name in enumerate(names):
+        for trigram in trigrams(name):
+            index[trigram].append(i)
+
+    return dict(index)
+
+
+def find_similar(name, trigram_index, names, max_results, min_similarity=DEFAULT_MIN_SIMILARITY):
+    """Finds the names that are most similar to a name.
+
+    Only the names that share trigrams with the name are considered, using the trigram index, so the names that have
+    nothing in common with it are never looked at.  The names with the best trigram similarity are then scored by the
+    better of their trigram similarity and their edit distance, which catches swapped letters in short names that
+    share few trigrams.
+
+    Args:
+        name (str): the name to find similar names for.
+        trigram_index (dict): the index of `names', from `create_trigram_index'.
+        names (list): the names that were indexed.
+        max_results (int): the most names to return.
+        min_similarity (float): the least similarity, from 0 to 1, that a name can have and be returned.
+
+    Returns:
+        Returns a list of `(similarity, index)' tuples, most similar first, where `index' is the index of the name in
+        `names'.
+    """
+    name_trigrams = trigrams(name)
+    shared = collections.Counter()
+
+    for trigram in name_trigrams:
+        shared.update(trigram_index.get(trigram, ()))
+
+    # A padded name has one more trigram than it has characters, unless some of its trigrams repeat, which is close
+    # enough to pick the candidates without finding every name's trigrams
+    candidates = sorted(shared, key=lambda i: -shared[i] / (len(name_trigrams) + len(names[i]) + 1 - shared[i]))
+    results = []
+
+    for i in candidates[:MAX_CANDIDATES]:
+        similarity = max(shared[i] / (len(name_trigrams) + len(trigrams(names[i])) - shared[i]),
+                         _edit_similarity(name.lower(), names[i].lower()))
+
+        if similarity >= min_similarity:
+            results.append((similarity, i))
+
+    results.sort(key=lambda r: (-r[0], r[1]))
+
+    return results[:max_results]
+
+
+def _edit_similarity(a, b):
+    return 1 - _edit_distance(a, b) / max(len(a), len(b), 1)
+
+
+def _edit_distance(a, b):
+    # The optimal string alignment distance: insertions, deletions, substitutions and swaps of neighboring characters
+    previous2 = None
+    previous = list(range(len(b) + 1))
+
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+
+        previous2, previous = previous, current
+
+    return previous[len(b)]
@@ -0,0 +1,48 @@
+import unittest
+
+from cheatlib import fuzzy
+
+
+_NAMES = ['git', 'github', 'tmux', 'docker', 'docker-compose', 'grep']
+
+
+class TrigramsTest(unittest.TestCase):
+
+    def test_padded_lowercase_trigrams(self):
+        self.assertEqual(fuzzy.trigrams('Git'), {'  g', ' gi', 'git', 'it '})
+
+    def test_index_of_names(self):
+        index = fuzzy.create_trigram_index(['git', 'gist'])
+
+        self.assertEqual(index[' gi'], [0, 1])
+        self.assertEqual(index['it '], [0])
+
+
+class FindSimilarTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = fuzzy.create_trigram_index(_NAMES)
+
+    def test_misspelled_name(self):
+        self.assertEqual(self._find('dcoker')[0], 'docker')
+        self.assertEqual(self._find('tumx'), ['tmux'])
+
+    def test_most_similar_first(self):
+        self.assertEqual(self._find('gti', max_results=1), ['git'])
+        self.assertEqual(self._find('docker-compse')[0], 'docker-compose')
+
+    def test_nothing_similar(self):
+        self.assertEqual(self._find('zzz'), [])
+
+    def test_similarity_range(self):
+        results = fuzzy.find_similar('git', self.index, _NAMES, len(_NAMES), min_similarity=0)
+
+        self.assertEqual(results[0], (1.0, 0))
+        self.assertTrue(all(0 <= similarity <= 1 for similarity, _ in results))
+
+    def _find(self, name, max_results=3):
+        return [_NAMES[i] for _, i in fuzzy.find_similar(name, self.index, _NAMES, max_results)]
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+import os
+import os.path
+import threading
+import time
+
+from cheatlib import fuzzy
+from jnscommons import jnsindex
+
+
+INDEX_VERSION = 2
+
+
+class NameIndex:
+    """Remembers the paths from the configuration file and the names of the cheatsheets in each path.
+
+    The whole index is kept in a single file.  The configuration file's paths are only read again when its modification
+    or change time is different from when they were indexed, and a path's cheatsheets are only listed again when the
+    path's own times are different.  Only the paths that changed are listed again; the rest are answered from the index
+    after a single stat.
+
+    The names of each path's cheatsheets, without their extensions, are also indexed by their trigrams so that
+    similar names can be found without comparing the requested name with every cheatsheet.
+
+    A cheatsheet that is a symbolic link is indexed by its name, so the index does not notice when the link's target is
+    removed until something else in its path changes.
+
+    All of the paths are checked at the same time, each in its own thread, so that a slow path does not hold up the
+    others.  A path that is not checked within `timeout' seconds is skipped and added to `timed_out_paths'.  The threads
+    are daemon threads, so a path on a hung mount does not keep the program from exiting.
+
+    Args:
+        index_file (str): the file that holds the index.
+        config_file (str): the configuration file that the paths are read from.
+        read_config_paths (function): reads the paths from the configuration file.  It is given the file's name and
+            returns a list of paths.
+        default_paths (list): the paths that are searched before the paths from the configuration file.
+        timeout (float): the most seconds to wait for each path, or None to wait as long as it takes.
+    """
+
+    def __init__(self, index_file, config_file, read_config_paths, default_paths, timeout=None):
+        self.index_file = index_file
+        self.config_file = config_file
+        self.read_config_paths = read_config_paths
+        self.default_paths = default_paths
+        self.timeout = timeout
+        self.timed_out_paths = []
+        self._index = jnsindex.read_index(index_file, INDEX_VERSION) or _create_empty_index()
+        self._changed = False
+        self._listings = {}
+
+    def get_paths(self):
+        """Returns the default paths followed by the paths from the configuration file."""
+        config_stat = _stat_or_none(self.config_file)
+        config = self._index['config']
+
+        if not _is_current(config, config_stat):
+            paths = self.read_config_paths(self.config_file) if config_stat is not None else []
+            config = _create_record(config_stat, jnsindex.get_indexed_ns(), paths=paths)
+            self._index['config'] = config
+            self._changed = True
+
+        return self.default_paths + config['paths']
+
+    def iter_cheatsheets(self):
+        """Yields `(path, file_names)' for every path, in order.  Paths that time out are skipped.
+
+        `file_names' are the file names of the cheatsheets in the path, in the order that the path lists them.
+        """
+        for path, record in self._iter_path_records():
+            yield path, record['cheatsheets']
+
+    def find_cheatsheet(self, name):
+        """Finds the cheatsheet with a name, or with a name that is `name' once its extension is removed.
+
+        The cheatsheet in the first path that has it is used.  It is returned as soon as every path before that one has
+        been checked, without waiting for the paths after it.
+
+        Returns:
+            Returns the path and the file name of the cheatsheet, or `(None, None)' if it was not found.
+        """
+        found = None, None
+
+        for path, cheatsheets in self.iter_cheatsheets():
+            file_name = next((f for f in cheatsheets if is_cheatsheet_name(name, f)), None)
+
+            if file_name is not None:
+                found = path, file_name
+                break
+
+        return found
+
+    def find_similar_cheatsheets(self, name, max_results):
+        """Finds the cheatsheets whose names, without their extensions, are most similar to `name'.
+
+        When more than one path has a cheatsheet with the same name, only the one in the first path is returned, since
+        it is the one that the name would view.
+
+        Returns:
+            Returns a list of `(path, file_name)' tuples, most similar first.
+        """
+        results = []
+
+        for path_number, (path, record) in enumerate(self._iter_path_records()):
+            cheatsheets = record['cheatsheets']
+            names = [_get_name(f) for f in cheatsheets]
+
+            for similarity, i in fuzzy.find_similar(name, record['trigrams'], names, max_results):
+                results.append((-similarity, path_number, path, cheatsheets[i]))
+
+        results.sort()
+        seen_names = set()
+        cheatsheets = []
+
+        for _, _, path, file_name in results:
+            if _get_name(file_name) not in seen_names:
+                seen_names.add(_get_name(file_name))
+                cheatsheets.append((path, file_name))
+
+        return cheatsheets[:max_results]
+
+    def save(self):
+        """Writes the index, if it has changed since it was read."""
+        if self._changed:
+            self._forget_removed_paths()
+            jnsindex.write_index(self.index_file, self._index)
+            self._changed = False
+
+    def _iter_path_records(self):
+        paths = self.get_paths()
+
+        # Every path starts being checked before waiting for any of them
+        for path in paths:
+            if path not in self._listings:
+                self._listings[path] = _PathListing(path, self._index['paths'].get(path), self.timeout)
+
+        for path in paths:
+            listing = self._listings[path]
+
+            if not listing.wait():
+                if path not in self.timed_out_paths:
+                    self.timed_out_paths.append(path)
+            elif listing.error is not None:
+                raise listing.error
+            else:
+                if listing.changed:
+                    self._index['paths'][path] = listing.record
+                    self._changed = True
+
+                yield path, listing.record
+
+    def _forget_removed_paths(self):
+        # Only paths that are still configured are kept, so that the index does not grow forever
+        paths = set(self.default_paths + self._index['config'].get('paths', []))
+
+        for path in [p for p in self._index['paths'] if p not in paths]:
+            del self._index['paths'][path]
+
+
+class _PathListing:
+    """Checks a path in a daemon thread, and lists it again if it has changed since `record' was made."""
+
+    def __init__(self, path, record, timeout):
+        self.path = path
+        self.record = record
+        self.changed = False
+        self.error = None
+        self._deadline = None if timeout is None else time.monotonic() + timeout
+        self._done = threading.Event()
+        threading.Thread(target=self._run, name='cheat-path-listing', daemon=True).start()
+
+    def wait(self):
+        """Waits until the path has been checked or the timeout has passed.  Returns whether the path was checked."""
+        return self._done.wait(None if self._deadline is None else max(0, self._deadline - time.monotonic()))
+
+    def _run(self):
+        try:
+            path_stat = os.stat(self.path)
+
+            if not _is_current(self.record, path_stat):
+                indexed_ns = jnsindex.get_indexed_ns()
+                cheatsheets = _list_cheatsheets(self.path)
+                trigrams = fuzzy.create_trigram_index([_get_name(f) for f in cheatsheets])
+                self.record = _create_record(path_stat, indexed_ns, cheatsheets=cheatsheets, trigrams=trigrams)
+                self.changed = True
+        except OSError as e:
+            self.error = e
+        finally:
+            self._done.set()
+
+
+def is_cheatsheet_name(name, file_name):
+    """Returns whether `name' refers to a cheatsheet file, either by its whole name or by its name without extension."""
+    return name == file_name or name == _get_name(file_name)
+
+
+def _get_name(file_name):
+    return os.path.splitext(file_name)[0]
+
+
+def _list_cheatsheets(path):
+    with os.scandir(path) as entries:
+        return [entry.name for entry in entries if not entry.name.startswith('.') and entry.is_file()]
+
+
+def _create_record(stat, indexed_ns, **values):
+    record = {
+        'mtime_ns': None if stat is None else stat.st_mtime_ns,
+        'ctime_ns': None if stat is None else stat.st_ctime_ns,
+        'indexed_ns': indexed_ns,
+    }
+    record.update(values)
+
+    return record
+
+
+def _is_current(record, stat):
+    if not record:
+        current = False
+    elif stat is None:
+        current = record['mtime_ns'] is None
+    else:
+        current = (record['mtime_ns'] == stat.st_mtime_ns and record['ctime_ns'] == stat.st_ctime_ns
+                   and jnsindex.is_settled(stat.st_mtime_ns, record['indexed_ns']))
+
+    return current
+
+
+def _create_empty_index():
+    return {'version': INDEX_VERSION, 'config': {}, 'paths': {}}
+
+
+def _stat_or_none(file_name):
+    try:
+        stat = os.stat(file_name)
+    except FileNotFoundError:
+        stat = None
+
+    return stat
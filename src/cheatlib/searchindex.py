@@ -0,0 +1,312 @@
+import array
+import collections
+import math
+import os
+import os.path
+import re
+import sqlite3
+import threading
+import time
+
+from jnscommons import jnsindex
+
+
+INDEX_VERSION = 1
+
+# The Okapi BM25 parameters: how quickly repeating a term stops adding to a file's score, and how much a long file's
+# score is reduced for being long
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# How much a term adds to a file's score when it is also part of the file's name
+NAME_MATCH_BOOST = 2.0
+
+# How long to wait for another process that is updating the index
+LOCK_TIMEOUT = 30.0
+
+# How much of the index SQLite may keep in memory.  Indexing many files at once inserts words all over the index.
+CACHE_KIB = 64 * 1024
+
+_TERM_RE = re.compile(r'\w+')
+
+_SCHEMA = [
+    '''CREATE TABLE files (
+        id INTEGER PRIMARY KEY,
+        file_name TEXT NOT NULL UNIQUE,
+        mtime_ns INTEGER NOT NULL,
+        size INTEGER NOT NULL,
+        indexed_ns INTEGER NOT NULL,
+        length INTEGER NOT NULL,
+        line_offsets BLOB NOT NULL
+    )''',
+    '''CREATE TABLE postings (
+        term TEXT NOT NULL,
+        file_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        lines TEXT NOT NULL,
+        PRIMARY KEY (term, file_id)
+    ) WITHOUT ROWID''',
+    'CREATE INDEX postings_file_id ON postings (file_id)',
+]
+
+
+SearchResult = collections.namedtuple('SearchResult', ['file_name', 'score', 'snippets'])
+Snippet = collections.namedtuple('Snippet', ['line_number', 'line'])
+
+
+class SearchIndex:
+    """An inverted index of the words in a set of files, kept in an SQLite database.
+
+    For every word, the index remembers which files contain it and on which lines.  It also remembers where each line
+    of each file starts, so the lines shown with the results are read directly instead of searching the files for them.
+    A search only reads the parts of the index for the words that are searched for.
+
+    A file is only read again when its modification time or size has changed since it was indexed.
+
+    The files in each directory are checked in their own daemon thread, so that a slow directory does not hold up the
+    others.  The files in a directory that is not checked within `timeout' seconds keep what was indexed for them and
+    are added to `timed_out_files'.  A file that cannot be read is left out of the index.
+
+    Args:
+        index_file (str): the database file that holds the index.
+        timeout (float): the most seconds to wait for each directory, or None to wait as long as it takes.
+    """
+
+    def __init__(self, index_file, timeout=None):
+        self.index_file = index_file
+        self.timeout = timeout
+        self.timed_out_files = []
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        self._db = sqlite3.connect(index_file, timeout=LOCK_TIMEOUT)
+        self._db.execute('PRAGMA cache_size = -{:d}'.format(CACHE_KIB))
+        self._create_schema()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def update(self, file_names):
+        """Makes the index match a set of files.
+
+        Files that are new, or whose modification time or size has changed, are indexed.  Files that are no longer in
+        the set are forgotten.
+        """
+        file_names = set(file_names)
+        stats = self._stat_files(file_names)
+
+        with self._db:
+            indexed = {row[0]: row for row in self._db.execute(
+                'SELECT file_name, id, mtime_ns, size, indexed_ns FROM files')}
+
+            for file_name, row in indexed.items():
+                if file_name not in file_names:
+                    self._remove_file(row[1])
+
+            for file_name, stat in stats.items():
+                row = indexed.get(file_name)
+
+                if row is not None and (stat is None or not _is_current(row, stat)):
+                    self._remove_file(row[1])
+
+                if stat is not None and (row is None or not _is_current(row, stat)):
+                    self._try_add_file(file_name, stat)
+
+    def search(self, query, max_results, max_snippets):
+        """Finds the files that contain every word in a query.
+
+        The files are ranked with Okapi BM25, using the number of lines that contain each word, and with a boost for
+        words that are also in the file's name.
+
+        Args:
+            query (str): the words to search for.
+            max_results (int): the most files to return.
+            max_snippets (int): the most lines to return for each file.
+
+        Returns:
+            Returns a list of `SearchResult', best first.  Each result's snippets are the lines that contain the most
+            words from the query.
+        """
+        terms = sorted(set(tokenize(query)))
+        postings = [self._read_postings(term) for term in terms]
+
+        return self._rank(terms, postings, max_results, max_snippets) if terms and all(postings) else []
+
+    def close(self):
+        self._db.close()
+
+    def _rank(self, terms, postings, max_results, max_snippets):
+        file_count, average_length = self._db.execute('SELECT COUNT(*), AVG(length) FROM files').fetchone()
+        matches = set.intersection(*(set(p) for p in postings))
+        files = self._read_files(matches)
+        results = []
+
+        for file_id in matches:
+            file_name, length, _ = files[file_id]
+            score = _score_file(file_id, file_name, length, terms, postings, file_count, average_length)
+            results.append((score, file_name, file_id))
+
+        results.sort(key=lambda r: (-r[0], r[1]))
+
+        return [SearchResult(file_name=file_name, score=score,
+                             snippets=_read_snippets(file_name, files[file_id][2],
+                                                     [p[file_id][1] for p in postings], max_snippets))
+                for score, file_name, file_id in results[:max_results]]
+
+    def _create_schema(self):
+        with self._db:
+            version = self._db.execute('PRAGMA user_version').fetchone()[0]
+
+            if version != INDEX_VERSION:
+                self._db.execute('DROP TABLE IF EXISTS postings')
+                self._db.execute('DROP TABLE IF EXISTS files')
+
+                for statement in _SCHEMA:
+                    self._db.execute(statement)
+
+                self._db.execute('PRAGMA user_version = {:d}'.format(INDEX_VERSION))
+
+    def _stat_files(self, file_names):
+        directories = collections.defaultdict(list)
+        stats = {}
+
+        for file_name in file_names:
+            directories[os.path.dirname(file_name)].append(file_name)
+
+        # Every directory starts being checked before waiting for any of them
+        checks = [_FileCheck(names, self.timeout) for names in directories.values()]
+
+        for check in checks:
+            if check.wait():
+                stats.update(check.stats)
+            else:
+                self.timed_out_files.extend(sorted(check.file_names))
+
+        return stats
+
+    def _try_add_file(self, file_name, stat):
+        try:
+            self._add_file(file_name, stat)
+        except OSError:
+            pass  # The file cannot be read, so it is tried again the next time the index is updated
+
+    def _add_file(self, file_name, stat):
+        indexed_ns = jnsindex.get_indexed_ns()
+        line_offsets = array.array('q')
+        term_lines = collections.defaultdict(list)
+        length = 0
+        offset = 0
+
+        with open(file_name, 'rb') as f:
+            for line_number, line in enumerate(f, start=1):
+                line_offsets.append(offset)
+                offset += len(line)
+                line_terms = tokenize(line.decode('utf-8', 'replace'))
+                length += len(line_terms)
+
+                for term in set(line_terms):
+                    term_lines[term].append(line_number)
+
+        file_id = self._db.execute(
+            'INSERT INTO files (file_name, mtime_ns, size, indexed_ns, length, line_offsets) VALUES (?, ?, ?, ?, ?, ?)',
+            (file_name, stat.st_mtime_ns, stat.st_size, indexed_ns, length, line_offsets.tobytes())).lastrowid
+        self._db.executemany(
+            'INSERT INTO postings (term, file_id, count, lines) VALUES (?, ?, ?, ?)',
+            ((term, file_id, len(lines), ','.join(map(str, lines))) for term, lines in term_lines.items()))
+
+    def _remove_file(self, file_id):
+        self._db.execute('DELETE FROM postings WHERE file_id = ?', (file_id,))
+        self._db.execute('DELETE FROM files WHERE id = ?', (file_id,))
+
+    def _read_postings(self, term):
+        rows = self._db.execute('SELECT file_id, count, lines FROM postings WHERE term = ?', (term,))
+        return {file_id: (count, lines) for file_id, count, lines in rows}
+
+    def _read_files(self, file_ids):
+        files = {}
+
+        for file_id in file_ids:
+            files[file_id] = self._db.execute('SELECT file_name, length, line_offsets FROM files WHERE id = ?',
+                                              (file_id,)).fetchone()
+
+        return files
+
+
+class _FileCheck:
+    """Stats a set of files in a daemon thread.  A file that cannot be stat'ed has None as its stat."""
+
+    def __init__(self, file_names, timeout):
+        self.file_names = file_names
+        self.stats = {}
+        self._deadline = None if timeout is None else time.monotonic() + timeout
+        self._done = threading.Event()
+        threading.Thread(target=self._run, name='cheat-file-check', daemon=True).start()
+
+    def wait(self):
+        """Waits until the files have been checked or the timeout has passed.  Returns whether they were checked."""
+        return self._done.wait(None if self._deadline is None else max(0, self._deadline - time.monotonic()))
+
+    def _run(self):
+        try:
+            for file_name in self.file_names:
+                self.stats[file_name] = _stat_or_none(file_name)
+        finally:
+            self._done.set()
+
+
+def tokenize(text):
+    """Splits text into the lowercase words that are indexed and searched for."""
+    return _TERM_RE.findall(text.lower())
+
+
+def _read_snippets(file_name, line_offsets, term_lines, max_snippets):
+    # The lines with the most different words from the query come first, then the earliest lines
+    counts = collections.Counter(int(line) for lines in term_lines for line in lines.split(','))
+    line_numbers = sorted(counts, key=lambda line: (-counts[line], line))[:max_snippets]
+    offsets = array.array('q')
+    offsets.frombytes(line_offsets)
+    snippets = []
+
+    try:
+        with open(file_name, 'rb') as f:
+            for line_number in sorted(line_numbers):
+                f.seek(offsets[line_number - 1])
+                snippets.append(Snippet(line_number=line_number, line=f.readline().decode('utf-8', 'replace').strip()))
+    except OSError:
+        pass  # The file was removed since it was indexed, so it is shown without snippets
+
+    return snippets
+
+
+def _score_file(file_id, file_name, length, terms, postings, document_count, average_length):
+    name_terms = set(tokenize(os.path.basename(file_name)))
+    score = 0.0
+
+    for term, term_postings in zip(terms, postings):
+        score += _score_term(term_postings[file_id][0], len(term_postings), document_count, length, average_length)
+
+        if term in name_terms:
+            score += NAME_MATCH_BOOST
+
+    return score
+
+
+def _score_term(term_frequency, document_frequency, document_count, length, average_length):
+    idf = math.log(1 + (document_count - document_frequency + 0.5) / (document_frequency + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length) if average_length else BM25_K1
+    return idf * term_frequency * (BM25_K1 + 1) / (term_frequency + norm)
+
+
+def _stat_or_none(file_name):
+    try:
+        stat = os.stat(file_name)
+    except OSError:
+        stat = None
+
+    return stat
+
+
+def _is_current(row, stat):
+    _, _, mtime_ns, size, indexed_ns = row
+    return mtime_ns == stat.st_mtime_ns and size == stat.st_size and jnsindex.is_settled(stat.st_mtime_ns, indexed_ns)
@@ -0,0 +1,134 @@
+import math
+import os
+import os.path
+import shutil
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+from cheatlib import searchindex
+
+
+# Old enough to be outside the racy window of an index made now
+_OLD_NS = time.time_ns() - 3600 * 1000 * 1000 * 1000
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = searchindex.SearchIndex(os.path.join(self.temp_dir, 'index', 'search.db'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_tokenize(self):
+        self.assertEqual(searchindex.tokenize('Git rebase --onto, HEAD~2'), ['git', 'rebase', 'onto', 'head', '2'])
+
+    def test_every_term_must_match(self):
+        self._update(tar='tar -x extracts files\n', zip='unzip extracts files\n')
+
+        self.assertEqual(sorted(self._search('extracts files')), ['tar.md', 'zip.md'])
+        self.assertEqual(self._search('tar extracts'), ['tar.md'])
+        self.assertEqual(self._search('missing'), [])
+        self.assertEqual(self._search(''), [])
+
+    def test_occurrences_rank_higher(self):
+        self._update(one='remote\nother\nother\nother\n', three='remote\nremote\nremote\nother\n')
+
+        self.assertEqual(self._search('remote'), ['three.md', 'one.md'])
+
+    def test_rarer_terms_count_more(self):
+        self._update(a='common\nrare\nrare\n', b='common\ncommon\nrare\n', c='common\n', d='common\n')
+
+        self.assertEqual(self._search('common rare'), ['a.md', 'b.md'])
+
+    def test_shorter_files_rank_higher(self):
+        self._update(short='branch\n', long='branch\n' + 'filler words here\n' * 20)
+
+        self.assertEqual(self._search('branch'), ['short.md', 'long.md'])
+
+    def test_name_match_is_boosted(self):
+        self._update(git='git commit\n', notes='git commit\ngit commit\n')
+
+        self.assertEqual(self._search('git commit'), ['git.md', 'notes.md'])
+        self.assertEqual(self._search('commit'), ['notes.md', 'git.md'])
+
+    def test_score_is_bm25(self):
+        self._update(a='x y\n', b='y\n')
+        score = self.index.search('x', 1, 1)[0].score
+
+        # One of two files has the term once, in a file of two terms, where the average file has 1.5 terms
+        idf = math.log(1 + 1.5 / 1.5)
+        norm = searchindex.BM25_K1 * (1 - searchindex.BM25_B + searchindex.BM25_B * 2 / 1.5)
+        self.assertAlmostEqual(score, idf * (searchindex.BM25_K1 + 1) / (1 + norm))
+
+    def test_snippets_have_most_terms(self):
+        self._update(git='# Git\ngit stash\ngit stash pop\nstash list\n')
+        result = self.index.search('git stash', 1, 2)[0]
+
+        self.assertEqual(result.snippets,
+                         [searchindex.Snippet(2, 'git stash'), searchindex.Snippet(3, 'git stash pop')])
+
+    def test_changed_file_reindexed(self):
+        self._update(git='old words\n')
+        self._update(git='new words here\n', mtime_ns=_OLD_NS + 1000)
+
+        self.assertEqual(self._search('old'), [])
+        self.assertEqual(self._search('new'), ['git.md'])
+
+    def test_unlisted_files_forgotten(self):
+        self._update(git='commit\n', svn='commit\n')
+        self._update(git='commit\n')
+
+        self.assertEqual(self._search('commit'), ['git.md'])
+
+    def test_missing_file_is_left_out(self):
+        self.index.update([os.path.join(self.temp_dir, 'missing.md')])
+
+        self.assertEqual(self._search('missing'), [])
+
+    def test_timed_out_files_kept(self):
+        self._update(git='commit\n')
+        file_name = os.path.join(self.temp_dir, 'git.md')
+        stat = os.stat
+
+        def slow_stat(path, *args, **kwargs):
+            if path == file_name:
+                time.sleep(0.5)
+
+            return stat(path, *args, **kwargs)
+
+        with open(file_name, 'w', encoding='utf-8') as f:
+            f.write('push\n')
+
+        self.index.timeout = 0.05
+
+        with unittest.mock.patch('os.stat', slow_stat):
+            self.index.update([file_name])
+
+        self.assertEqual(self.index.timed_out_files, [file_name])
+        self.assertEqual(self._search('commit'), ['git.md'])
+
+    def _update(self, mtime_ns=_OLD_NS, **texts):
+        file_names = []
+
+        for name, text in texts.items():
+            file_name = os.path.join(self.temp_dir, name + '.md')
+
+            with open(file_name, 'w', encoding='utf-8') as f:
+                f.write(text)
+
+            os.utime(file_name, ns=(mtime_ns, mtime_ns))
+            file_names.append(file_name)
+
+        self.index.update(file_names)
+
+    def _search(self, query):
+        return [os.path.basename(result.file_name) for result in self.index.search(query, 10, 1)]
+
+
+if __name__ == '__main__':
+    unittest.main()
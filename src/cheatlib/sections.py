@@ -0,0 +1,139 @@
+import collections
+import mmap
+import os
+import os.path
+import re
+
+from jnscommons import jnsindex
+
+
+INDEX_VERSION = 1
+
+# An ATX heading: one to six #'s followed by whitespace or the end of the line, indented at most three spaces
+_HEADING_RE = re.compile(rb'^ {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$')
+_FENCE_RE = re.compile(rb'^ {0,3}(`{3,}|~{3,})')
+_WORD_RE = re.compile(r'\w+')
+
+
+Heading = collections.namedtuple('Heading', ['level', 'title', 'start', 'end'])
+
+
+class HeadingIndex:
+    """Remembers where each markdown section of a set of files starts and ends.
+
+    A section starts at its heading and ends at the next heading of the same or a higher level, or at the end of the
+    file.  Lines in fenced code blocks are never headings, so comments in shell snippets do not start sections.
+
+    All of the files are kept in a single index file.  A file is only read again when its modification time or size
+    has changed since it was indexed.
+
+    Args:
+        index_file (str): the file that holds the index.
+    """
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        self._index = jnsindex.read_index(index_file, INDEX_VERSION) or _create_empty_index()
+        self._changed = False
+
+    def get_headings(self, file_name):
+        """Returns a list of `Heading' for every heading in a file, in the order that they appear."""
+        stat = os.stat(file_name)
+        record = self._index['files'].get(file_name)
+
+        if not _is_current(record, stat):
+            indexed_ns = jnsindex.get_indexed_ns()
+
+            with open(file_name, 'rb') as f:
+                headings = parse_headings(f)
+
+            record = {
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'indexed_ns': indexed_ns,
+                'headings': [list(heading) for heading in headings],
+            }
+            self._index['files'][file_name] = record
+            self._changed = True
+
+        return [Heading(*heading) for heading in record['headings']]
+
+    def save(self):
+        """Writes the index, if it has changed since it was read."""
+        if self._changed:
+            self._forget_removed_files()
+            jnsindex.write_index(self.index_file, self._index)
+            self._changed = False
+
+    def _forget_removed_files(self):
+        for file_name in [f for f in self._index['files'] if not os.path.exists(f)]:
+            del self._index['files'][file_name]
+
+
+def parse_headings(f):
+    """Reads the markdown headings from a file that was opened in binary mode.  Returns a list of `Heading'."""
+    headings = []
+    fence = None
+    offset = 0
+
+    for line in f:
+        fence_match = _FENCE_RE.match(line)
+
+        if fence is not None:
+            if fence_match and fence_match.group(1).startswith(fence):
+                fence = None
+        elif fence_match:
+            fence = fence_match.group(1)
+        else:
+            heading_match = _HEADING_RE.match(line.rstrip(b'\r\n'))
+
+            if heading_match:
+                title = (heading_match.group(2) or b'').decode('utf-8', 'replace')
+                headings.append([len(heading_match.group(1)), title, offset, None])
+
+        offset += len(line)
+
+    # Each section ends where the next section of the same or a higher level starts
+    for i, heading in enumerate(headings):
+        heading[3] = next((h[2] for h in headings[i + 1:] if h[0] <= heading[0]), offset)
+
+    return [Heading(*heading) for heading in headings]
+
+
+def find_section(headings, query):
+    """Finds the heading that best matches a query.
+
+    A heading whose words are exactly the query's words is best, then a heading that contains all of the query's
+    words, then a heading that contains all of them as parts of words.  When more than one heading matches equally
+    well, the first one is used.
+
+    Returns:
+        Returns the `Heading', or None if no heading matches.
+    """
+    words = _get_words(query)
+    matchers = [
+        lambda title: _get_words(title) == words,
+        lambda title: all(word in _get_words(title) for word in words),
+        lambda title: all(word in title.lower() for word in words),
+    ]
+
+    return next((h for matches in matchers for h in headings if matches(h.title)), None) if words else None
+
+
+def read_section(file_name, heading):
+    """Reads just the bytes of a section from a file, without reading the rest of the file."""
+    with open(file_name, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return m[heading.start:heading.end]
+
+
+def _get_words(text):
+    return _WORD_RE.findall(text.lower())
+
+
+def _is_current(record, stat):
+    return (record is not None and record['mtime_ns'] == stat.st_mtime_ns and record['size'] == stat.st_size
+            and jnsindex.is_settled(stat.st_mtime_ns, record['indexed_ns']))
+
+
+def _create_empty_index():
+    return {'version': INDEX_VERSION, 'files': {}}
@@ -235,6 +235,7 @@ function make_symbolic_links {
     make_symbolic_link "${jns_src_dir}/psgrep.sh"             "${home_bin_dir}/psgrep"
     make_symbolic_link "${jns_src_dir}/strindexof.py"         "${home_bin_dir}/strindexof"
     make_symbolic_link "${jns_src_dir}/strlen.sh"             "${home_bin_dir}/strlen"
+    make_symbolic_link "${jns_src_dir}/sysmonitor.py"         "${home_bin_dir}/sysmonitor"
     make_symbolic_link "${jns_src_dir}/unite.py"              "${home_bin_dir}/unite"
     make_symbolic_link "${jns_src_dir}/ununite.py"            "${home_bin_dir}/ununite"
 
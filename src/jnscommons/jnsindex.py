@@ -0,0 +1,62 @@
+import json
+import os
+import os.path
+import tempfile
+import time
+
+
+# A file or directory that changed within this many nanoseconds of being indexed may have changed again within the
+# resolution of its timestamps, so its index is not trusted.  Two seconds covers the coarsest timestamps in common use
+# (FAT).
+RACY_NS = 2 * 1000 * 1000 * 1000
+
+
+def get_indexed_ns():
+    """Returns the time to record as when something is indexed.
+
+    Call it before reading what is indexed, so that a change made while reading makes the index look out of date.
+    """
+    return time.time_ns()
+
+
+def is_settled(mtime_ns, indexed_ns):
+    """Returns whether something last modified at `mtime_ns' was indexed at `indexed_ns' long enough after it changed
+    that its index can be trusted."""
+    return mtime_ns < indexed_ns - RACY_NS
+
+
+def read_index(index_file, version):
+    """Reads a JSON index file.  Returns None if it does not exist, cannot be read, or is not the given version."""
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = None
+
+    return index if isinstance(index, dict) and index.get('version') == version else None
+
+
+def write_index(index_file, index):
+    """Writes a JSON index file atomically, so that other processes only ever read a whole index.
+
+    The index is written to a temporary file next to `index_file', which is then renamed over it.
+    """
+    index_dir = os.path.dirname(index_file) or '.'
+    os.makedirs(index_dir, exist_ok=True)
+    file_desc, temp_file = tempfile.mkstemp(dir=index_dir, prefix='.', suffix='.tmp')
+
+    try:
+        with os.fdopen(file_desc, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+
+        os.replace(temp_file, index_file)
+    except BaseException:
+        _remove(temp_file)
+        raise
+
+
+def _remove(file_name):
+    try:
+        os.remove(file_name)
+    except OSError:
+        pass
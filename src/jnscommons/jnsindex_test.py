@@ -0,0 +1,62 @@
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from jnscommons import jnsindex
+
+
+class IsSettledTest(unittest.TestCase):
+
+    def test_change_before_indexing(self):
+        self.assertTrue(jnsindex.is_settled(1000, 1000 + jnsindex.RACY_NS + 1))
+
+    def test_change_within_racy_window(self):
+        self.assertFalse(jnsindex.is_settled(1000, 1000 + jnsindex.RACY_NS))
+        self.assertFalse(jnsindex.is_settled(1000, 1000))
+
+
+class IndexFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index_file = os.path.join(self.temp_dir, 'indexes', 'index.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_write_then_read(self):
+        index = {'version': 2, 'files': [['a', 1]]}
+        jnsindex.write_index(self.index_file, index)
+
+        self.assertEqual(jnsindex.read_index(self.index_file, 2), index)
+        self.assertEqual(os.listdir(os.path.dirname(self.index_file)), ['index.json'])
+
+    def test_other_version_is_not_read(self):
+        jnsindex.write_index(self.index_file, {'version': 1})
+
+        self.assertIsNone(jnsindex.read_index(self.index_file, 2))
+
+    def test_missing_or_damaged_index(self):
+        self.assertIsNone(jnsindex.read_index(self.index_file, 1))
+
+        os.makedirs(os.path.dirname(self.index_file))
+
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            f.write('{"version": 1, "fil')
+
+        self.assertIsNone(jnsindex.read_index(self.index_file, 1))
+
+    def test_failed_write_keeps_old(self):
+        jnsindex.write_index(self.index_file, {'version': 1, 'value': 'old'})
+
+        with self.assertRaises(TypeError):
+            jnsindex.write_index(self.index_file, {'version': 1, 'value': object()})
+
+        self.assertEqual(jnsindex.read_index(self.index_file, 1), {'version': 1, 'value': 'old'})
+        self.assertEqual(os.listdir(os.path.dirname(self.index_file)), ['index.json'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,23 +1,42 @@
 #!/usr/bin/env python3
 
 import argparse
+import concurrent.futures
+import heapq
 import itertools
 import os
 import os.path
+import re
 import shlex
+import shutil
+import stat
 import subprocess
 import sys
+import time
 
 from jnscommons import jnsos
 from jnscommons import jnsvalid
 
+from openlatestlib import dirindex
+from openlatestlib import filters
+from openlatestlib import inotify
+
 
 # The index in the output of the Windows `attrib' command that will contain an 'H' if a file is hidden.
 WIN_HIDDEN_ATTR_INDEX = 4
 
+# Whether a file is hidden just because its name starts with a `.'
+HIDDEN_BY_NAME = not (jnsos.is_windows() or jnsos.is_cygwin())
+
 KEY_BY_MOD_TIME = 'latest-by-mod-time'
 KEY_BY_NAME = 'latest-by-name'
 
+INDEX_DIR = os.path.join(os.path.expanduser('~'), '.jns', 'openlatest', 'index')
+
+# The default number of threads that scan directories at once.  Scanning is mostly waiting on the file system,
+# especially network file systems, and the waiting is done without holding the GIL.
+DEFAULT_JOBS = min(32, (os.cpu_count() or 1) + 4)
+
 OPEN_COMMANDS = {
     jnsos.OS_PREFIX_LINUX: ['xdg-open'],
     jnsos.OS_PREFIX_CYGWIN: ['cygstart'],
@@ -25,16 +44,61 @@ OPEN_COMMANDS = {
     jnsos.OS_PREFIX_WINDOWS: ['start', '/b']
 }
 
+# The commands that can open many files at once.  On the operating systems that are not listed here, or when the
+# command is not installed (`gio' comes with GLib, which not every Linux system has), the files are opened one at a time
+# with the command in `OPEN_COMMANDS'.
+BATCH_OPEN_COMMANDS = {
+    jnsos.OS_PREFIX_LINUX: ['gio', 'open'],
+    jnsos.OS_PREFIX_DARWIN: ['open'],
+}
+
+# The inotify events that are watched for in each directory.  A file is complete once it has been closed after being
+# written, or once it has been renamed into the directory.  New directories are watched too when looking recursively.
+WATCH_EVENTS = inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO | inotify.IN_CREATE | inotify.IN_ONLYDIR
+
+# The minimum/maximum number of seconds between polls when inotify is not available.  The interval grows while nothing
+# changes, and it is never shorter than `POLL_SCAN_COST_FACTOR' times how long the last scan took so that polling a big
+# tree does not keep a core busy.
+POLL_MIN_INTERVAL = 0.25
+POLL_MAX_INTERVAL = 5.0
+POLL_SCAN_COST_FACTOR = 10
+
 
 def main():
     opts = parse_args()
     validate_opts(opts)
-    latest = get_latest_file(opts.directories, opts.include_hidden, opts.key)
-    
-    if latest is None:
+
+    if opts.watch:
+        try:
+            watch_latest_file(opts, lambda latest_file: report_latest_files(opts, [latest_file]))
+        except KeyboardInterrupt:
+            pass
+    else:
+        open_latest_files(opts)
+
+
+def open_latest_files(opts):
+    index = dirindex.DirectoryIndex(INDEX_DIR) if opts.index else None
+
+    try:
+        latest = get_latest_files(opts.directories, opts.include_hidden, opts.key, opts.count,
+                                  max_depth=opts.max_depth, prune_patterns=opts.prune_patterns, jobs=opts.jobs,
+                                  index=index, file_filter=create_file_filter(opts))
+    finally:
+        if index is not None:
+            index.close()
+
+    if not latest:
         print('No latest file.', file=sys.stderr)
     else:
-        open_file(opts, latest)
+        report_latest_files(opts, latest)
+
+
+def report_latest_files(opts, latest):
+    if opts.print_only:
+        print('\n'.join(latest), flush=True)
+    else:
+        open_files(opts, latest)
 
 
 def parse_args():
@@ -45,58 +109,509 @@ def parse_args():
                         help='Directory to look in for the most recent file (default: .)')
 
     # optional arguments
+    parser.add_argument('-c', '--count', action='store', type=int, default=1, metavar='N', dest='count',
+                        help='Open the N latest files, latest first, with a single command when the OS has one that ' +
+                        'can open many files (default:  %(default)s)')
     parser.add_argument('--dry-run', action='store_true', default=False, dest='dry_run',
                         help='Just output what actions will be peformed without actually performing them ' +
                         '(default:  %(default)s)')
+    parser.add_argument('-d', '--max-depth', action='store', type=int, default=None, metavar='N', dest='max_depth',
+                        help='Look no more than N directories below each directory.  Implies --recursive ' +
+                        '(default: no limit)')
+    parser.add_argument('-e', '--ext', action='append', default=None, metavar='EXT', dest='extensions',
+                        help='Only look at files with the extension EXT (case insensitive).  Can be given more than ' +
+                        'once (default:  %(default)s)')
+    parser.add_argument('--exclude', action='append', default=None, metavar='GLOB', dest='exclude_globs',
+                        help='Do not look at files whose names match GLOB.  Can be given more than once ' +
+                        '(default:  %(default)s)')
+    parser.add_argument('--exclude-regex', action='append', type=regex_arg, default=None, metavar='REGEX',
+                        dest='exclude_regexes', help='Do not look at files whose names contain a match for REGEX.  ' +
+                        'Can be given more than once (default:  %(default)s)')
+    parser.add_argument('-g', '--include', action='append', default=None, metavar='GLOB', dest='include_globs',
+                        help='Only look at files whose names match GLOB or one of the --include-regex expressions.  ' +
+                        'Can be given more than once (default:  %(default)s)')
+    parser.add_argument('--include-regex', action='append', type=regex_arg, default=None, metavar='REGEX',
+                        dest='include_regexes', help='Only look at files whose names contain a match for REGEX or ' +
+                        'match one of the --include globs.  Can be given more than once (default:  %(default)s)')
     parser.add_argument('-H', '--include-hidden', action='store_true', default=False, dest='include_hidden',
                         help='Include hidden files when looking for the last modified one (default:  %(default)s)')
+    parser.add_argument('-i', '--index', action='store_true', default=False, dest='index',
+                        help='Remember the files in each directory in {} and answer from there when the '.format(
+                            INDEX_DIR) + 'directory has not changed.  Files that are written in place, instead of ' +
+                        'being created or renamed into place, may be missed (default:  %(default)s)')
+    parser.add_argument('-j', '--jobs', action='store', type=int, default=DEFAULT_JOBS, metavar='N', dest='jobs',
+                        help='The number of directories to scan at once (default:  %(default)s)')
+    parser.add_argument('--max-age', action='store', type=unit_arg(filters.parse_age), default=None, metavar='AGE',
+                        dest='max_age', help='Only look at files modified in the last AGE, like 90s, 30m, 12h, 2d or ' +
+                        '1w (default:  %(default)s)')
+    parser.add_argument('--max-size', action='store', type=unit_arg(filters.parse_size), default=None, metavar='SIZE',
+                        dest='max_size', help='Only look at files no bigger than SIZE, like 512, 10K, 1.5M or 2G ' +
+                        '(default:  %(default)s)')
+    parser.add_argument('--min-size', action='store', type=unit_arg(filters.parse_size), default=None, metavar='SIZE',
+                        dest='min_size', help='Only look at files at least SIZE big (default:  %(default)s)')
     parser.add_argument('-m', '--mtime', action='store_const', const=KEY_BY_MOD_TIME, dest='key',
                         help="find the latest using each file's modification time (default)")
     parser.add_argument('-n', '--name', action='store_const', const=KEY_BY_NAME, dest='key',
                         help="find the latest using each file's basename (case insensitive)")
+    parser.add_argument('--print', action='store_true', default=False, dest='print_only',
+                        help='Print the latest files, one per line, instead of opening them (default:  %(default)s)')
+    parser.add_argument('-p', '--prune', action='append', default=None, metavar='PATTERN', dest='prune_patterns',
+                        help='Do not look in directories whose names match the glob PATTERN.  Can be given more than ' +
+                        'once (default:  %(default)s)')
+    parser.add_argument('-r', '--recursive', action='store_true', default=False, dest='recursive',
+                        help='Look in every directory below each directory too (default:  %(default)s)')
+    parser.add_argument('-w', '--watch', action='store_true', default=False, dest='watch',
+                        help='Keep running and open (or print) each file that becomes the latest as soon as it has ' +
+                        'been written, until interrupted.  Uses inotify when it is available, and polls otherwise ' +
+                        '(default:  %(default)s)')
     parser.add_argument('-o', '--os', action='store', default=get_default_os(), metavar='OS', dest='os',
                         help='Specify the operating system.  Can only be used during dry runs. (default:  %(default)s)')
     
     opts = parser.parse_args()
     opts.directories = set([os.getcwd()]) if not opts.directories else set(opts.directories)
     opts.key = KEY_BY_MOD_TIME if not opts.key else opts.key
+    opts.recursive = opts.recursive or opts.max_depth is not None
+
+    # Without --recursive, only the given directories themselves are scanned
+    if not opts.recursive:
+        opts.max_depth = 0
     
     return opts
 
 
+def regex_arg(value):
+    try:
+        re.compile(value)
+    except re.error as e:
+        raise argparse.ArgumentTypeError('Invalid regular expression: {}: {}'.format(value, e))
+
+    return value
+
+
+def unit_arg(parse_fn):
+    def parse_arg(value):
+        try:
+            return parse_fn(value)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+
+    return parse_arg
+
+
 def validate_opts(opts):
     jnsvalid.validate_is_directories(opts.directories)
     
     if not opts.dry_run and opts.os and opts.os.lower() != get_default_os().lower():
         raise NotDryRunError('Cannot specify an OS unless performing a dry run.')
 
+    if opts.max_depth is not None and opts.max_depth < 0:
+        raise InvalidOptionError('The maximum depth cannot be negative: {}'.format(opts.max_depth))
+
+    if opts.count < 1:
+        raise InvalidOptionError('The number of files must be at least 1: {}'.format(opts.count))
+
+    if opts.jobs < 1:
+        raise InvalidOptionError('The number of jobs must be at least 1: {}'.format(opts.jobs))
+
+    if opts.watch and opts.count != 1:
+        raise InvalidOptionError('Files are reported one at a time while watching, so --count cannot be used.')
+
+
+def create_file_filter(opts):
+    """Creates the `FileFilter' for the filter options, or returns None if none of them were given."""
+    filter_args = {
+        'include_globs': opts.include_globs,
+        'exclude_globs': opts.exclude_globs,
+        'include_regexes': opts.include_regexes,
+        'exclude_regexes': opts.exclude_regexes,
+        'extensions': opts.extensions,
+        'min_size': opts.min_size,
+        'max_size': opts.max_size,
+        'max_age': opts.max_age,
+    }
+
+    return filters.FileFilter(**filter_args) if any(value is not None for value in filter_args.values()) else None
+
+
+def get_latest_file(directories, include_hidden, key, max_depth=0, prune_patterns=None, jobs=DEFAULT_JOBS, index=None,
+                    file_filter=None):
+    """Finds the latest file in the given directories.  See `get_latest_files'.
+
+    Returns:
+        Returns the path of the latest file, or None if there are no files.
+    """
+    latest = get_latest_files(directories, include_hidden, key, 1, max_depth=max_depth, prune_patterns=prune_patterns,
+                              jobs=jobs, index=index, file_filter=file_filter)
+    return latest[0] if latest else None
+
+
+def get_latest_files(directories, include_hidden, key, count, max_depth=0, prune_patterns=None, jobs=DEFAULT_JOBS,
+                     index=None, file_filter=None):
+    """Finds the `count' latest files in the given directories.
+
+    Each directory is scanned by a worker on a thread pool.  A worker keeps only the `count' latest files it has seen
+    so far, in a heap, and hands back the subdirectories it found, which are then scanned by other workers.  So finding
+    the latest files takes O(files * log(count)) time and the files are never all held in memory at once.
+
+    Args:
+        directories (iterable): the directories to look in.
+        include_hidden (bool): whether hidden files and directories should be included.
+        key (str): `KEY_BY_MOD_TIME' or `KEY_BY_NAME'.
+        count (int): the number of files to find.
+        max_depth (int): the number of directories below each directory to look in.  None means there is no limit.
+        prune_patterns (list): globs matching the names of directories that should not be looked in.
+        jobs (int): the number of directories to scan at once.
+        index (DirectoryIndex): the index to list the directories through, or None to always list them directly.
+        file_filter (FileFilter): decides which files to look at, or None to look at every file.
+
+    Returns:
+        Returns a list of the paths of the latest files, latest first.
+    """
+    scan = DirectoryScan(get_key_fn(key), count, include_hidden, max_depth, filters.compile_globs(prune_patterns),
+                         index=index, file_filter=file_filter)
+    return find_latest_files(scan, directories, jobs).paths()
+
+
+def find_latest_files(scan, directories, jobs):
+    """Scans directories on a thread pool of `jobs' threads.  Returns the `LatestFiles' of all of them."""
+    latest = LatestFiles(scan.count)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending = {executor.submit(scan.scan_directory, directory, 0) for directory in directories}
 
-def get_latest_file(directories, include_hidden, key):
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done:
+                directory_latest, subdirectories = future.result()
+                latest.merge(directory_latest)
+                pending.update(executor.submit(scan.scan_directory, subdirectory, depth)
+                               for subdirectory, depth in subdirectories)
+
+    return latest
+
+
+def get_key_fn(key):
     if key == KEY_BY_MOD_TIME:
-        key_fn = os.path.getmtime
+        key_fn = get_entry_mtime
     elif key == KEY_BY_NAME:
-        key_fn = get_lower_basename
+        key_fn = get_lower_entry_name
     else:
         raise UnsupportedKeyError('Could not the latest file for unsupported key: {}'.format(key))
-    
-    return max(get_files_in_directories(directories, include_hidden), key=key_fn, default=None)
 
+    return key_fn
+
+
+class LatestFiles:
+    """Keeps the `count' latest files that it is given in a min-heap of (key, path) tuples.
+
+    The earliest of the kept files is always at the top of the heap, so each new file is compared against it and only
+    replaces it when the new file is later.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.heap = []
+
+    def add(self, key, path):
+        """Adds a file.  Returns true if it is one of the latest files and was kept."""
+        kept = True
+
+        if len(self.heap) < self.count:
+            heapq.heappush(self.heap, (key, path))
+        elif key > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (key, path))
+        else:
+            kept = False
+
+        return kept
 
-def get_files_in_directories(directories, include_hidden):
-    for directory in directories:
-        for file_name in os.listdir(path=directory):
-            file_name = os.path.join(directory, file_name)
-            
-            if should_check_file(file_name, include_hidden):
-                yield file_name
+    def add_entry(self, key, entry):
+        # Only build the path of an entry that is kept
+        if len(self.heap) < self.count or key > self.heap[0][0]:
+            self.add(key, entry.path)
+
+    def remove(self, path):
+        self.heap = [(key, kept_path) for key, kept_path in self.heap if kept_path != path]
+        heapq.heapify(self.heap)
+
+    def merge(self, other):
+        for key, path in other.heap:
+            self.add(key, path)
+
+    def paths(self):
+        return [path for _, path in sorted(self.heap, reverse=True)]
+
+
+class DirectoryScan:
+    """Scans directories for the latest file.
+
+    The files are found with `os.scandir', which gets the type of each file from the directory listing itself on most
+    file systems.  The `os.DirEntry' objects it yields also cache the result of `stat', so each file is stat'd at most
+    once no matter how many times its type or modification time is needed.  When there is a `DirectoryIndex', the
+    directories are listed through it instead.
+    """
+
+    def __init__(self, key_fn, count, include_hidden, max_depth, prune_re, index=None, file_filter=None):
+        self.key_fn = key_fn
+        self.count = count
+        self.include_hidden = include_hidden
+        self.max_depth = max_depth
+        self.prune_re = prune_re
+        self.index = index
+        self.file_filter = file_filter
+
+    def scan_directory(self, directory, depth):
+        """Scans a single directory.
+
+        Returns:
+            Returns a tuple of the `LatestFiles' of the directory and a list of (subdirectory, depth) tuples for the
+            subdirectories that should be scanned next.
+        """
+        descend = self.descends_below(depth)
+        latest = LatestFiles(self.count)
+        subdirectories = []
+
+        try:
+            for entry in self.list_directory(directory):
+                if not self.add_file(latest, entry) and descend and self.should_descend(entry):
+                    subdirectories.append((entry.path, depth + 1))
+        except OSError as e:
+            # The directories that were asked for have already been validated, so this is a subdirectory that cannot be
+            # read or that was removed while it was being scanned.
+            print('Could not scan directory: {}: {}'.format(directory, e.strerror), file=sys.stderr)
+
+        return latest, subdirectories
+
+    def check_file(self, entry):
+        """Checks a single file.  Returns a `LatestFiles' that holds the file if it should be checked."""
+        latest = LatestFiles(self.count)
+        self.add_file(latest, entry)
+        return latest
+
+    def add_file(self, latest, entry):
+        """Adds an entry to `latest' if it is a file that should be checked.  Returns whether it was added.
+
+        An entry that was removed after its directory was listed is skipped without affecting the rest of the directory.
+        """
+        added = False
+
+        try:
+            if should_check_file(entry, self.include_hidden, self.file_filter):
+                latest.add_entry(self.key_fn(entry), entry)
+                added = True
+        except OSError:
+            added = False  # The file was removed before it could be checked
+
+        return added
+
+    def descends_below(self, depth):
+        return self.max_depth is None or depth < self.max_depth
+
+    def list_directory(self, directory):
+        if self.index is not None:
+            yield from self.index.list_directory(directory)
+        else:
+            with os.scandir(directory) as entries:
+                yield from entries
+
+    def should_descend(self, entry):
+        # Symbolic links to directories are not followed so that a link cannot lead back up the tree
+        descend = entry.is_dir(follow_symlinks=False)
+        descend = descend and (self.include_hidden or not is_entry_hidden(entry))
+        descend = descend and (self.prune_re is None or not self.prune_re.match(entry.name))
+        return descend
+
+
+class PathEntry:
+    """A file that was found by its path instead of by listing its directory.  It has the parts of `os.DirEntry' that
+    openlatest uses, and like `os.DirEntry', it stat's the file at most once."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        self._stat = None
+        self._lstat = None
+
+    def stat(self):
+        if self._stat is None:
+            self._stat = os.stat(self.path)
+
+        return self._stat
+
+    def is_file(self):
+        try:
+            is_file = stat.S_ISREG(self.stat().st_mode)
+        except OSError:
+            is_file = False
+
+        return is_file
+
+    def is_dir(self, follow_symlinks=True):
+        try:
+            if follow_symlinks:
+                is_dir = stat.S_ISDIR(self.stat().st_mode)
+            else:
+                if self._lstat is None:
+                    self._lstat = os.lstat(self.path)
+
+                is_dir = stat.S_ISDIR(self._lstat.st_mode)
+        except OSError:
+            is_dir = False
+
+        return is_dir
+
+
+def watch_latest_file(opts, latest_fn):
+    """Calls `latest_fn' with the path of each file that becomes the latest file, until interrupted.
+
+    The files that are already in the directories are only used to know which new files are later than them.
+    """
+    scan = DirectoryScan(get_key_fn(opts.key), 1, opts.include_hidden, opts.max_depth,
+                         filters.compile_globs(opts.prune_patterns), file_filter=create_file_filter(opts))
+
+    try:
+        notifier = inotify.Inotify()
+    except inotify.InotifyUnavailableError:
+        notifier = None
+
+    if notifier is None:
+        poll_latest_file(scan, opts.directories, opts.jobs, latest_fn)
+    else:
+        with notifier:
+            watch_latest_file_with_inotify(scan, opts.directories, notifier, latest_fn)
+
+
+def watch_latest_file_with_inotify(scan, directories, notifier, latest_fn):
+    """Waits for inotify events, which uses no CPU while idle, and checks only the files that they name."""
+    watches = {}
+    latest = watch_directories(scan, notifier, watches, [(directory, 0) for directory in directories])
+
+    while True:
+        for event in notifier.read_events():
+            if event.mask & inotify.IN_Q_OVERFLOW:
+                # Events were lost, so look at everything again
+                found = watch_directories(scan, notifier, watches, [(directory, 0) for directory in directories])
+                report_if_latest(latest, found, latest_fn)
+            elif event.mask & inotify.IN_IGNORED:
+                watches.pop(event.watch_desc, None)
+            elif event.watch_desc in watches:
+                directory, depth = watches[event.watch_desc]
+                entry = PathEntry(os.path.join(directory, event.name))
+
+                if event.mask & inotify.IN_ISDIR:
+                    if scan.descends_below(depth) and scan.should_descend(entry):
+                        # The directory may have been moved here with files already in it
+                        found = watch_directories(scan, notifier, watches, [(entry.path, depth + 1)])
+                        report_if_latest(latest, found, latest_fn)
+                elif event.mask & (inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO):
+                    found = scan.check_file(entry)
+
+                    if event.mask & inotify.IN_MOVED_TO:
+                        forget_renamed_latest(latest, found)
+
+                    report_if_latest(latest, found, latest_fn)
+
+
+def forget_renamed_latest(latest, found):
+    """Forgets the latest file if it no longer exists and the file that was renamed into place has the same key.
+
+    A file that is written and then renamed into place is reported under its first name when it is closed.  Renaming
+    it does not change its key, so without this, its new name would not be later than its old one and would never be
+    reported.
+    """
+    if found.heap and latest.heap and found.heap[0][0] == latest.heap[0][0] and not os.path.lexists(latest.heap[0][1]):
+        latest.remove(latest.heap[0][1])
 
 
-def should_check_file(file_name, include_hidden):
-    check = True if include_hidden else not is_file_hidden(file_name)
-    check = check and os.path.isfile(file_name)
+def watch_directories(scan, notifier, watches, directories):
+    """Watches directories, and the directories below them that `scan' looks in, and finds their latest file.
+
+    Each directory is watched before it is scanned so that no file written in between can be missed.
+    """
+    latest = LatestFiles(1)
+    pending = list(directories)
+
+    while pending:
+        directory, depth = pending.pop()
+
+        try:
+            watches[notifier.add_watch(directory, WATCH_EVENTS)] = (directory, depth)
+        except OSError as e:
+            print('Could not watch directory: {}: {}'.format(directory, e.strerror), file=sys.stderr)
+            continue
+
+        directory_latest, subdirectories = scan.scan_directory(directory, depth)
+        latest.merge(directory_latest)
+        pending.extend(subdirectories)
+
+    return latest
+
+
+def report_if_latest(latest, found, latest_fn):
+    for key, path in found.heap:
+        if latest.add(key, path):
+            latest_fn(path)
+
+
+def poll_latest_file(scan, directories, jobs, latest_fn):
+    """Scans the directories over and over, waiting longer between scans while nothing changes.
+
+    A new latest file is only reported once its size and key have stayed the same between two scans, so that a file is
+    not reported while it is still being written.
+    """
+    latest = find_latest_files(scan, directories, jobs)
+    pending = None
+    interval = POLL_MIN_INTERVAL
+
+    while True:
+        time.sleep(interval)
+        start = time.monotonic()
+        found = find_latest_files(scan, directories, jobs)
+        scan_seconds = time.monotonic() - start
+        candidate = found.heap[0] if found.heap and (not latest.heap or found.heap[0][0] > latest.heap[0][0]) else None
+
+        if candidate is None:
+            pending = None
+            interval = min(interval * 2, POLL_MAX_INTERVAL)
+        else:
+            candidate = candidate + (get_file_size(candidate[1]),)
+
+            if candidate == pending:
+                report_if_latest(latest, found, latest_fn)
+                pending = None
+            else:
+                pending = candidate
+
+            interval = POLL_MIN_INTERVAL
+
+        interval = max(interval, scan_seconds * POLL_SCAN_COST_FACTOR)
+
+
+def get_file_size(file_name):
+    try:
+        size = os.stat(file_name).st_size
+    except OSError:
+        size = None
+
+    return size
+
+
+def should_check_file(entry, include_hidden, file_filter=None):
+    # Check everything that only needs the file's name first, then its type, which usually comes from the directory
+    # listing, and last of all anything that needs a stat.
+    check = True if include_hidden else not is_entry_hidden(entry)
+    check = check and (file_filter is None or file_filter.matches_name(entry.name))
+    check = check and entry.is_file()
+    check = check and (file_filter is None or not file_filter.checks_stat or file_filter.matches_stat(entry.stat()))
     return check
 
 
+def is_entry_hidden(entry):
+    # Everywhere but Windows and Cygwin, only the name is needed, so the path does not have to be built
+    return entry.name.startswith('.') if HIDDEN_BY_NAME else is_file_hidden(entry.path)
+
+
 def is_file_hidden(file_name):
     if jnsos.is_windows():
         hidden = is_file_hidden_windows(file_name)
@@ -149,8 +664,12 @@ def is_file_hidden_windows(file_name):
     return output[WIN_HIDDEN_ATTR_INDEX] == 'H'
 
 
-def get_lower_basename(file):
-    return os.path.basename(file).lower()
+def get_entry_mtime(entry):
+    return entry.stat().st_mtime
+
+
+def get_lower_entry_name(entry):
+    return entry.name.lower()
 
 
 def get_os(opts):
@@ -162,22 +681,40 @@ def get_default_os():
 
 
 def open_file(opts, file_name):
+    open_files(opts, [file_name])
+
+
+def open_files(opts, file_names):
+    """Opens files with a single command if the OS has one that can open many files, or one at a time otherwise."""
     op_sys = get_os(opts)
     open_cmd = get_open_command(op_sys)
+    batch_open_cmd = get_batch_open_command(op_sys) if len(file_names) > 1 else None
     
     if open_cmd is None:
         raise UnsupportedOSError('Could not determine how to open a file for unsupported OS: {}'.format(op_sys))
+    elif batch_open_cmd is not None:
+        start_open_file_subprocess(opts, batch_open_cmd, file_names)
     else:
-        start_open_file_subprocess(opts, open_cmd, file_name)
+        for file_name in file_names:
+            start_open_file_subprocess(opts, open_cmd, [file_name])
     
 
 def get_open_command(op_sys):
-    key = next((k for k in OPEN_COMMANDS.keys() if jnsos.is_os(k, os=op_sys)), None)
-    return None if key is None else OPEN_COMMANDS[key]
+    return get_command_for_os(OPEN_COMMANDS, op_sys)
+
 
+def get_batch_open_command(op_sys):
+    cmd = get_command_for_os(BATCH_OPEN_COMMANDS, op_sys)
+    return cmd if cmd is not None and shutil.which(cmd[0]) is not None else None
 
-def start_open_file_subprocess(opts, cmd, file_name):
-    cmds = list(itertools.chain(cmd, [file_name]))
+
+def get_command_for_os(commands, op_sys):
+    key = next((k for k in commands.keys() if jnsos.is_os(k, os=op_sys)), None)
+    return None if key is None else commands[key]
+
+
+def start_open_file_subprocess(opts, cmd, file_names):
+    cmds = list(itertools.chain(cmd, file_names))
     
     print(get_shell_command(cmds))
     
@@ -205,5 +742,9 @@ class NotDryRunError(Exception):
     pass
 
 
+class InvalidOptionError(Exception):
+    pass
+
+
 if __name__ == '__main__':
     main()
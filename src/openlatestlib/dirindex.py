@@ -0,0 +1,219 @@
+import hashlib
+import os
+import os.path
+import threading
+
+from jnscommons import jnsindex
+
+
+INDEX_VERSION = 3
+INDEX_FILE_SUFFIX = '.json'
+
+# The most directories that are indexed at once.  When there are more, the directories that were used the longest ago
+# are forgotten.
+DEFAULT_MAX_DIRECTORIES = 4096
+
+# How many index files are written between removals of the least recently used ones.  Removing them means stat'ing
+# every index file, so it is not done after every write.
+_EVICT_INTERVAL = 256
+
+# The positions of the values in the record of a file
+_RECORD_MTIME_NS = 1
+_RECORD_INODE = 3
+
+
+class DirectoryIndex:
+    """Remembers the name, modification time and size of every file in the directories that are listed through it.
+
+    Each directory's index is kept in its own file, along with the directory's own modification and change times.  When
+    neither time has changed, the directory is answered from its index without being listed.  When either has changed,
+    the directory is listed again, and only the files whose name or inode is not in the index are stat'd.  The rest keep
+    their records from the index.
+
+    A file that is written in place keeps its inode and does not change its directory's times, so its new modification
+    time is not noticed through the index.  Files that are written and then renamed into place, or created new, are
+    always noticed.
+
+    Index files are replaced atomically, so any number of processes can share the index.  Every so many writes, and when
+    the index is closed, the least recently used index files are removed if there are more than `max_directories' of
+    them.  When an index file cannot be written, the directory is still answered from the listing that was just made.
+
+    Args:
+        index_dir (str): the directory that holds the index files.
+        max_directories (int): the most directories to keep indexes for.
+    """
+
+    def __init__(self, index_dir, max_directories=DEFAULT_MAX_DIRECTORIES):
+        self.index_dir = index_dir
+        self.max_directories = max_directories
+        self._writes_since_evict = 0
+        self._lock = threading.Lock()
+
+    def list_directory(self, directory):
+        """Lists a directory, from its index if it has not changed.
+
+        Returns:
+            Returns a list of `IndexedEntry' for the files and subdirectories of the directory.  Symbolic links to
+            directories are not included.
+        """
+        dir_stat = os.stat(directory)
+        index_file = self._get_index_file(directory)
+        index = jnsindex.read_index(index_file, INDEX_VERSION)
+
+        if index is not None and _is_index_current(index, dir_stat):
+            # Mark the index as recently used
+            _touch(index_file)
+        else:
+            index = _create_index(directory, dir_stat, index)
+
+            try:
+                self._write_index(index_file, index)
+            except OSError:
+                pass  # The directory was still listed, so it is answered the same as without an index
+
+        return _create_entries(directory, index)
+
+    def close(self):
+        """Removes the least recently used index files if any index files were written since they were last removed."""
+        with self._lock:
+            evict = self._writes_since_evict > 0
+            self._writes_since_evict = 0
+
+        if evict:
+            self._evict()
+
+    def _get_index_file(self, directory):
+        name = hashlib.sha1(os.path.realpath(directory).encode('utf-8', 'surrogateescape')).hexdigest()
+        return os.path.join(self.index_dir, name + INDEX_FILE_SUFFIX)
+
+    def _write_index(self, index_file, index):
+        jnsindex.write_index(index_file, index)
+
+        with self._lock:
+            self._writes_since_evict += 1
+            evict = self._writes_since_evict >= _EVICT_INTERVAL
+
+            if evict:
+                self._writes_since_evict = 0
+
+        if evict:
+            self._evict()
+
+    def _evict(self):
+        with os.scandir(self.index_dir) as entries:
+            index_files = [(entry.stat().st_mtime_ns, entry.path) for entry in entries
+                           if entry.name.endswith(INDEX_FILE_SUFFIX)]
+
+        if len(index_files) > self.max_directories:
+            index_files.sort()
+
+            for _, index_file in index_files[:len(index_files) - self.max_directories]:
+                _remove(index_file)
+
+
+class IndexedEntry:
+    """A file or directory from an index.  It has the parts of `os.DirEntry' that openlatest uses.
+
+    An entry is its own `stat' result, with the modification time and size of a file, or None for a directory.
+    """
+
+    __slots__ = ('name', '_prefix', 'st_mtime_ns', 'st_size')
+
+    def __init__(self, prefix, name, mtime_ns=None, size=None):
+        self.name = name
+        self._prefix = prefix
+        self.st_mtime_ns = mtime_ns
+        self.st_size = size
+
+    @property
+    def path(self):
+        # The path is only built when it is needed, which is usually just for the latest files
+        return self._prefix + self.name
+
+    @property
+    def st_mtime(self):
+        return None if self.st_mtime_ns is None else self.st_mtime_ns / 1e9
+
+    def is_file(self):
+        return self.st_mtime_ns is not None
+
+    def is_dir(self, follow_symlinks=True):
+        return self.st_mtime_ns is None
+
+    def stat(self):
+        return self
+
+
+def _is_index_current(index, dir_stat):
+    return (index.get('path_mtime_ns') == dir_stat.st_mtime_ns and index.get('path_ctime_ns') == dir_stat.st_ctime_ns
+            and jnsindex.is_settled(dir_stat.st_mtime_ns, index.get('indexed_ns', 0)))
+
+
+def _create_index(directory, dir_stat, old_index):
+    indexed_ns = jnsindex.get_indexed_ns()
+    old_records = _get_settled_records(old_index)
+    files = []
+    directories = []
+
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    files.append(_create_record(entry, old_records.get(entry.name)))
+                elif entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.name)
+            except FileNotFoundError:
+                pass  # Removed since the directory was listed
+
+    return {
+        'version': INDEX_VERSION,
+        'path_mtime_ns': dir_stat.st_mtime_ns,
+        'path_ctime_ns': dir_stat.st_ctime_ns,
+        'indexed_ns': indexed_ns,
+        'files': files,
+        'directories': directories,
+    }
+
+
+def _get_settled_records(index):
+    # A file that changed within the racy window of the old index may have changed again since, so it is stat'd again
+    records = {}
+
+    if index is not None:
+        records = {record[0]: record for record in index['files']
+                   if jnsindex.is_settled(record[_RECORD_MTIME_NS], index['indexed_ns'])}
+
+    return records
+
+
+def _create_record(entry, old_record):
+    # The inode comes from the directory listing, so a file whose name and inode are unchanged is not stat'd again
+    if old_record is not None and old_record[_RECORD_INODE] == entry.inode():
+        record = old_record
+    else:
+        stat = entry.stat()
+        record = [entry.name, stat.st_mtime_ns, stat.st_size, entry.inode()]
+
+    return record
+
+
+def _create_entries(directory, index):
+    prefix = os.path.join(directory, '')
+    entries = [IndexedEntry(prefix, name, mtime_ns, size) for name, mtime_ns, size, _ in index['files']]
+    entries.extend(IndexedEntry(prefix, name) for name in index['directories'])
+
+    return entries
+
+
+def _touch(file_name):
+    try:
+        os.utime(file_name)
+    except OSError:
+        pass  # Another process evicted it
+
+
+def _remove(file_name):
+    try:
+        os.remove(file_name)
+    except OSError:
+        pass
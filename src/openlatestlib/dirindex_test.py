@@ -0,0 +1,128 @@
+import os
+import os.path
+import shutil
+import tempfile
+import time
+import unittest
+
+from openlatestlib import dirindex
+
+
+# Old enough to be outside the racy window of an index made now
+_OLD_NS = time.time_ns() - 3600 * 1000 * 1000 * 1000
+
+
+class DirectoryIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.directory = os.path.join(self.temp_dir, 'dir')
+        self.index_dir = os.path.join(self.temp_dir, 'index')
+        os.mkdir(self.directory)
+        os.mkdir(os.path.join(self.directory, 'sub'))
+        self._write('a.txt', 'a', _OLD_NS)
+        self._write('b.txt', 'bb', _OLD_NS + 1000)
+        self.index = dirindex.DirectoryIndex(self.index_dir)
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_lists_files_and_dirs(self):
+        entries = self._list()
+
+        self.assertEqual(sorted(entries), ['a.txt', 'b.txt', 'sub'])
+        self.assertEqual((entries['a.txt'].st_mtime_ns, entries['a.txt'].st_size), (_OLD_NS, 1))
+        self.assertEqual(entries['b.txt'].path, os.path.join(self.directory, 'b.txt'))
+        self.assertTrue(entries['b.txt'].is_file())
+        self.assertTrue(entries['sub'].is_dir())
+
+    def test_unchanged_dir_from_index(self):
+        self._list()
+
+        # Changing a file's times in place changes neither the directory nor the file's inode
+        os.utime(os.path.join(self.directory, 'a.txt'), ns=(_OLD_NS + 5, _OLD_NS + 5))
+
+        self.assertEqual(self._list()['a.txt'].st_mtime_ns, _OLD_NS)
+
+    def test_only_added_file_is_stated(self):
+        self._list()
+        os.utime(os.path.join(self.directory, 'a.txt'), ns=(_OLD_NS + 5, _OLD_NS + 5))
+        self._write('c.txt', 'ccc', _OLD_NS + 2000)
+
+        entries = self._list()
+
+        self.assertEqual(sorted(entries), ['a.txt', 'b.txt', 'c.txt', 'sub'])
+        self.assertEqual(entries['c.txt'].st_size, 3)
+        self.assertEqual(entries['a.txt'].st_mtime_ns, _OLD_NS)
+
+    def test_replaced_file_is_noticed(self):
+        self._list()
+        temp_file = self._write('.a.tmp', 'aaaa', _OLD_NS + 3000)
+        os.replace(temp_file, os.path.join(self.directory, 'a.txt'))
+        self._age_directory()
+
+        entries = self._list()
+
+        self.assertEqual((entries['a.txt'].st_mtime_ns, entries['a.txt'].st_size), (_OLD_NS + 3000, 4))
+
+    def test_removed_file_is_noticed(self):
+        self._list()
+        os.remove(os.path.join(self.directory, 'b.txt'))
+
+        self.assertEqual(sorted(self._list()), ['a.txt', 'sub'])
+
+    def test_racy_files_not_trusted(self):
+        # The file and the directory may change again within the resolution of their timestamps, so both are checked
+        # again even though neither has visibly changed
+        file_name = os.path.join(self.directory, 'a.txt')
+        os.utime(file_name)
+        os.utime(self.directory)
+        self._list()
+        os.utime(file_name, ns=(_OLD_NS + 5, _OLD_NS + 5))
+
+        self.assertEqual(self._list()['a.txt'].st_mtime_ns, _OLD_NS + 5)
+
+    def test_close_evicts_least_recent(self):
+        index = dirindex.DirectoryIndex(self.index_dir, max_directories=1)
+        index.list_directory(self.directory)
+        old_index_files = os.listdir(self.index_dir)
+
+        for name in old_index_files:
+            os.utime(os.path.join(self.index_dir, name), ns=(_OLD_NS, _OLD_NS))
+
+        index.list_directory(os.path.join(self.directory, 'sub'))
+        index.close()
+        index_files = os.listdir(self.index_dir)
+
+        self.assertEqual(len(index_files), 1)
+        self.assertNotIn(index_files[0], old_index_files)
+
+    def test_unwritable_index_lists(self):
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+
+        with open(self.index_dir, 'w', encoding='utf-8'):
+            pass
+
+        self.assertEqual(sorted(self._list()), ['a.txt', 'b.txt', 'sub'])
+
+    def _write(self, name, text, mtime_ns):
+        file_name = os.path.join(self.directory, name)
+
+        with open(file_name, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        os.utime(file_name, ns=(mtime_ns, mtime_ns))
+        self._age_directory()
+
+        return file_name
+
+    def _age_directory(self):
+        os.utime(self.directory, ns=(_OLD_NS, _OLD_NS))
+
+    def _list(self):
+        return {entry.name: entry for entry in self.index.list_directory(self.directory)}
+
+
+if __name__ == '__main__':
+    unittest.main()
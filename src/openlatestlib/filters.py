@@ -0,0 +1,100 @@
+import fnmatch
+import re
+import time
+
+
+# The suffixes that sizes and ages can be given with, and what each one multiplies the number by
+SIZE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+AGE_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60, 'w': 7 * 24 * 60 * 60}
+
+
+class FileFilter:
+    """Decides which files to look at.
+
+    The filters on a file's name are compiled when the filter is created: all of the globs into a single regular
+    expression, and each regular expression on its own, so that its flags and groups mean what they meant when it was
+    given.  They are checked before anything that needs to stat the file.  Only the size and age filters stat a file,
+    and only for files whose names passed.
+
+    Args:
+        include_globs (list): if given, a file's name must match one of these globs or one of `include_regexes'.
+        exclude_globs (list): a file's name must not match any of these globs.
+        include_regexes (list): if given, a file's name must contain a match for one of these regular expressions or
+            match one of `include_globs'.
+        exclude_regexes (list): a file's name must not contain a match for any of these regular expressions.
+        extensions (list): if given, a file's name must end with one of these extensions (case insensitive).
+        min_size (int): the smallest size a file can be, in bytes.
+        max_size (int): the largest size a file can be, in bytes.
+        max_age (float): the most seconds since a file could have been modified.
+    """
+
+    def __init__(self, include_globs=None, exclude_globs=None, include_regexes=None, exclude_regexes=None,
+                 extensions=None, min_size=None, max_size=None, max_age=None):
+        self.include_res = _compile_all(include_globs, include_regexes)
+        self.exclude_res = _compile_all(exclude_globs, exclude_regexes)
+        self.extensions = tuple('.' + ext.lstrip('.').lower() for ext in extensions) if extensions else None
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_age = max_age
+        self.checks_stat = min_size is not None or max_size is not None or max_age is not None
+
+        # Ages are measured from when the filter was created so that every file is held to the same cutoff
+        self.min_mtime = None if max_age is None else time.time() - max_age
+
+    def matches_name(self, name):
+        matches = not self.include_res or _search_any(self.include_res, name)
+        matches = matches and not _search_any(self.exclude_res, name)
+        matches = matches and (self.extensions is None or name.lower().endswith(self.extensions))
+        return matches
+
+    def matches_stat(self, stat):
+        matches = self.min_size is None or stat.st_size >= self.min_size
+        matches = matches and (self.max_size is None or stat.st_size <= self.max_size)
+        matches = matches and (self.min_mtime is None or stat.st_mtime >= self.min_mtime)
+        return matches
+
+
+def compile_globs(patterns):
+    """Compiles glob patterns into a single regular expression, or returns None if there are no patterns."""
+    return _compile_globs(patterns)
+
+
+def parse_size(value):
+    """Reads a size like `512', `10K' or `1.5G'.  Returns the number of bytes."""
+    return round(_parse_with_units(value.upper(), SIZE_UNITS))
+
+
+def parse_age(value):
+    """Reads an age like `90', `30m', `12h' or `2d'.  Returns the number of seconds."""
+    return _parse_with_units(value, AGE_UNITS)
+
+
+def _compile_all(globs, regexes):
+    compiled = [re.compile(regex) for regex in regexes or []]
+    globs_re = _compile_globs(globs)
+
+    if globs_re is not None:
+        compiled.insert(0, globs_re)
+
+    return compiled
+
+
+def _compile_globs(globs):
+    # The translated globs already end at the end of the name.  Anchoring them at the start too means searching for them
+    # works the same as matching them.  Their flags are scoped to their own groups, so they can be joined safely.
+    patterns = [r'\A' + fnmatch.translate(glob) for glob in globs or []]
+
+    return re.compile('|'.join('(?:{})'.format(pattern) for pattern in patterns)) if patterns else None
+
+
+def _search_any(compiled, name):
+    return any(regex.search(name) is not None for regex in compiled)
+
+
+def _parse_with_units(value, units):
+    match = re.match(r'^\s*(\d+(?:\.\d*)?)\s*([A-Za-z]?)\s*$', value)
+
+    if not match or match.group(2) not in units:
+        raise ValueError('Not a number with one of the units {}: {}'.format(', '.join(u for u in units if u), value))
+
+    return float(match.group(1)) * units[match.group(2)]
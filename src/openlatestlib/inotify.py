@@ -0,0 +1,115 @@
+import collections
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+
+
+# The event masks from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+IN_CLOEXEC = 0o2000000
+
+# The fixed part of each event: the watch descriptor, the mask, the cookie that pairs up the two halves of a rename,
+# and the length of the name that follows it
+_EVENT_HEADER = struct.Struct('iIII')
+
+# Enough for many events at once.  A single event is never bigger than its header plus NAME_MAX + 1 bytes.
+_READ_SIZE = 64 * 1024
+
+
+Event = collections.namedtuple('Event', ['watch_desc', 'mask', 'cookie', 'name'])
+
+
+class Inotify:
+    """A thin wrapper around the Linux inotify API, called through ctypes.
+
+    Raises:
+        InotifyUnavailableError: if inotify is not available on this system.
+    """
+
+    def __init__(self):
+        self._libc = _load_libc()
+        self.file_desc = self._libc.inotify_init1(IN_CLOEXEC)
+
+        if self.file_desc < 0:
+            errno = ctypes.get_errno()
+            raise InotifyUnavailableError('Could not start inotify: {}'.format(os.strerror(errno)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_watch(self, path, mask):
+        """Watches a path for the events in `mask'.  Returns the watch descriptor that its events will have."""
+        watch_desc = self._libc.inotify_add_watch(self.file_desc, os.fsencode(path), mask)
+
+        if watch_desc < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+
+        return watch_desc
+
+    def read_events(self, timeout=None):
+        """Waits for events without using any CPU while idle.
+
+        Args:
+            timeout (float): the most seconds to wait, or None to wait forever.
+
+        Returns:
+            Returns a list of `Event', which is empty if the timeout passed first.
+        """
+        readable, _, _ = select.select([self.file_desc], [], [], timeout)
+        return _parse_events(os.read(self.file_desc, _READ_SIZE)) if readable else []
+
+    def close(self):
+        if self.file_desc >= 0:
+            os.close(self.file_desc)
+            self.file_desc = -1
+
+
+def _load_libc():
+    if not sys.platform.startswith('linux'):
+        raise InotifyUnavailableError('inotify is not available on this system.')
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError) as e:
+        raise InotifyUnavailableError('inotify is not available on this system: {}'.format(e)) from e
+
+    return libc
+
+
+def _parse_events(data):
+    events = []
+    offset = 0
+
+    while offset + _EVENT_HEADER.size <= len(data):
+        watch_desc, mask, cookie, name_length = _EVENT_HEADER.unpack_from(data, offset)
+        offset += _EVENT_HEADER.size
+        name = data[offset:offset + name_length].rstrip(b'\0')
+        offset += name_length
+        events.append(Event(watch_desc=watch_desc, mask=mask, cookie=cookie, name=os.fsdecode(name)))
+
+    return events
+
+
+##########
+# Errors #
+##########
+
+
+class InotifyUnavailableError(Exception):
+    pass
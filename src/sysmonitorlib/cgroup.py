@@ -0,0 +1,140 @@
+import collections
+import os.path
+
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+PROC_SELF_CGROUP_FILE = '/proc/self/cgroup'
+
+# The value cgroup v2 uses for "no limit"
+_NO_LIMIT = 'max'
+
+# The counters kept for each CPU reading.  These are the fields of cpu.stat with the same names.
+CPU_COUNTER_NAMES = ['usage_usec', 'nr_periods', 'nr_throttled', 'throttled_usec']
+
+# The number of values calculated from each pair of CPU readings: the CPU usage percentage, the percentage of
+# enforcement periods that were throttled, and the milliseconds spent throttled per second.
+CPU_RESULT_COUNT = 3
+
+
+# The limits of a cgroup.  Limits that are not set are None.
+CgroupLimits = collections.namedtuple('CgroupLimits', ['memory_max', 'cpu_quota_usec', 'cpu_period_usec'])
+
+
+def find_cgroup_dir(cgroup_root=CGROUP_ROOT, proc_self_cgroup_file=PROC_SELF_CGROUP_FILE):
+    """Finds the cgroup v2 directory of the current process.
+
+    Returns:
+        Returns the directory, or None if the system does not have a unified (cgroup v2 only) hierarchy mounted at
+        `cgroup_root'.  Hybrid systems, where the controllers are still mounted as cgroup v1, return None because their
+        v2 hierarchy does not hold the memory and CPU controllers.
+    """
+    cgroup_path = None
+    cgroup_dir = None
+
+    if os.path.exists(os.path.join(cgroup_root, 'cgroup.controllers')):
+        for line in (_read_file(proc_self_cgroup_file) or '').splitlines():
+            if line.startswith('0::'):
+                cgroup_path = line[3:].strip()
+
+    if cgroup_path is not None:
+        # Inside a cgroup namespace, the process's own cgroup is mounted as the root and its path is just `/'
+        cgroup_dir = os.path.join(cgroup_root, cgroup_path.lstrip('/'))
+        cgroup_dir = cgroup_dir if os.path.isdir(cgroup_dir) else cgroup_root
+
+    return cgroup_dir
+
+
+def read_limits(cgroup_dir):
+    memory_max = _parse_limit(_read_file(os.path.join(cgroup_dir, 'memory.max')))
+    cpu_quota_usec, cpu_period_usec = _parse_cpu_max(_read_file(os.path.join(cgroup_dir, 'cpu.max')))
+
+    return CgroupLimits(memory_max=memory_max, cpu_quota_usec=cpu_quota_usec, cpu_period_usec=cpu_period_usec)
+
+
+def get_cpu_limit(limits):
+    """Returns the number of CPU cores the cgroup may use, or None if it is not limited."""
+    limited = limits.cpu_quota_usec is not None and limits.cpu_period_usec
+    return limits.cpu_quota_usec / limits.cpu_period_usec if limited else None
+
+
+def read_memory_usage(cgroup_dir, memory_limit):
+    """Calculates the memory usage of the cgroup as a percentage of `memory_limit' bytes.
+
+    Like `docker stats', inactive file-backed pages are not counted as used because the kernel reclaims them before it
+    resorts to the OOM killer.
+
+    Returns:
+        Returns the percentage, or None if the usage could not be read.
+    """
+    current = _parse_limit(_read_file(os.path.join(cgroup_dir, 'memory.current')))
+    memory_stat = _parse_keyed(_read_file(os.path.join(cgroup_dir, 'memory.stat')))
+
+    usage = None
+
+    if current is not None and memory_limit:
+        usage = max(0, current - memory_stat.get('inactive_file', 0)) / memory_limit * 100
+
+    return usage
+
+
+def read_cpu_counters(cgroup_dir):
+    """Reads the counters of cpu.stat named in `CPU_COUNTER_NAMES', or returns None if cpu.stat cannot be read."""
+    cpu_stat = _parse_keyed(_read_file(os.path.join(cgroup_dir, 'cpu.stat')))
+
+    # nr_periods and the throttling counters only exist when the cpu controller is enabled for the cgroup
+    return [cpu_stat.get(name, 0) for name in CPU_COUNTER_NAMES] if 'usage_usec' in cpu_stat else None
+
+
+def create_cpu_calculate_fn(cpu_limit):
+    """Creates a function for a `CounterDelta' that calculates the CPU results of a cgroup allowed `cpu_limit' cores."""
+
+    def calculate_fn(counters_old, counters_new, seconds):
+        usage_usec, periods, throttled, throttled_usec = [new - old for old, new in zip(counters_old, counters_new)]
+        results = None
+
+        # The counters are reset when the cgroup is recreated
+        if seconds > 0 and min(usage_usec, periods, throttled, throttled_usec) >= 0:
+            results = (
+                min(100.0, usage_usec / (seconds * 1000000 * cpu_limit) * 100),
+                throttled / periods * 100 if periods > 0 else 0.0,
+                throttled_usec / 1000 / seconds,
+            )
+
+        return results
+
+    return calculate_fn
+
+
+def _parse_limit(value):
+    value = (value or '').strip()
+    return int(value) if value and value != _NO_LIMIT else None
+
+
+def _parse_cpu_max(value):
+    parts = (value or '').split()
+    quota = _parse_limit(parts[0]) if parts else None
+    period = int(parts[1]) if len(parts) > 1 else None
+
+    return quota, period
+
+
+def _parse_keyed(value):
+    keyed = {}
+
+    for line in (value or '').splitlines():
+        parts = line.split()
+
+        if len(parts) == 2:
+            keyed[parts[0]] = int(parts[1])
+
+    return keyed
+
+
+def _read_file(file_name):
+    try:
+        with open(file_name, 'r') as f:
+            contents = f.read()
+    except OSError:
+        contents = None
+
+    return contents
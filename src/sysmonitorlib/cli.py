@@ -0,0 +1,586 @@
+import argparse
+import heapq
+import math
+import os
+import os.path
+import shutil
+import sys
+import time
+
+from jnscommons import jnsos
+from jnscommons import jnsstr
+
+from . import daemon
+from . import history
+from . import meminfo
+from . import percpu
+from . import pressure
+from . import procscan
+from . import samplering
+from . import sampling
+from . import watch
+
+# The default number of seconds between samples when running as a daemon.
+DEFAULT_DAEMON_INTERVAL = 2.0
+
+BYTE_UNITS = ['B', 'K', 'M', 'G', 'T']
+
+# The default number of seconds `--top' measures the CPU usage of each process over
+DEFAULT_TOP_DELAY = 1.0
+
+TOP_SORT_CPU = 'cpu'
+TOP_SORT_MEM = 'mem'
+
+# Each history sample is the CPU usage and the memory usage (NaN for either one that could not be calculated).  A sample
+# is recorded at most once every `HISTORY_MIN_INTERVAL' seconds no matter how many sysmonitors are running.
+HISTORY_RING_FILE = 'history.ring'
+HISTORY_RING_FORMAT = 'dd'
+HISTORY_RING_SLOTS = 360
+HISTORY_MIN_INTERVAL = 5.0
+
+# The number of samples each of the exponential moving averages is taken over
+HISTORY_EMA_SPANS = [1, 5, 15]
+
+HISTORY_METRIC_CPU = 'cpu'
+HISTORY_METRIC_MEM = 'mem'
+HISTORY_METRICS = {
+    HISTORY_METRIC_CPU: ('CPU', 0),
+    HISTORY_METRIC_MEM: ('Mem', 1),
+}
+
+# The default number of bytes a `--watch-file' may grow to before it is rotated, and the number of rotated files kept
+DEFAULT_WATCH_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_WATCH_BACKUPS = 3
+
+# The most CPU time, as a percentage of one core, that `--watch' may use at its default interval of one second.  A
+# counted watch (`--watch-count') reports its overhead when it finishes and fails if it went over the budget.
+DEFAULT_WATCH_CPU_BUDGET = 0.5
+
+# The options that change what sysmonitor prints.  Each combination of them is served by a separate daemon.
+OUTPUT_OPTIONS = [
+    'alerts', 'busiest', 'core_bar', 'dirty', 'disk', 'disk_devices', 'ema', 'history_metric', 'loadavg', 'max_core',
+    'meminfo_fields', 'net', 'net_interfaces', 'pressure', 'range', 'sparkline', 'swap', 'view',
+]
+
+
+def main(ask_daemon=True):
+    """Runs sysmonitor with the options in `sys.argv'.
+
+    Args:
+        ask_daemon (bool): whether to ask a running daemon for the status line before sampling directly.  It is False
+            when the daemon has already been asked.
+    """
+    opts = _parse_args()
+    _validate_os()
+
+    if opts.top:
+        _run_top(opts)
+    elif opts.watch:
+        _run_watch(opts)
+    elif opts.daemon:
+        _run_daemon(opts)
+    else:
+        line = None
+
+        if ask_daemon and not opts.no_daemon:
+            line = daemon.query(_get_daemon_socket_file(opts), daemon.QUERY_TIMEOUT)
+
+        if line is None:
+            line = _create_status_line(opts, sampling.OneShotSampler(opts.view, opts.meminfo_fields or ()))
+
+        print(line)
+
+
+def _parse_args():
+    parser = argparse.ArgumentParser(description='Print the current memory and CPU usage.',
+                                     epilog=_create_help_epilog(), formatter_class=argparse.RawDescriptionHelpFormatter)
+
+    # output options
+    parser.add_argument('--busiest', action='store', type=int, default=0, metavar='N', dest='busiest',
+                        help='Also print the usage of the N busiest CPU cores (default: %(default)s)')
+    parser.add_argument('--core-bar', action='store_true', default=False, dest='core_bar',
+                        help='Also print a bar showing the usage of every CPU core (default: %(default)s)')
+    parser.add_argument('--disk', action='store_true', default=False, dest='disk',
+                        help='Also print the disk throughput, IOPS and the utilization of the busiest disk ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--disk-device', action='append', default=None, metavar='DEVICE', dest='disk_devices',
+                        help='A disk to include in the disk throughput.  Implies --disk.  Can be given more than ' +
+                        'once. ' +
+                        '(default: every whole disk)')
+    parser.add_argument('--dirty', action='store_true', default=False, dest='dirty',
+                        help='Print the dirty pages waiting to be written back and the pages being written back ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--loadavg', action='store_true', default=False, dest='loadavg',
+                        help='Also print the 1, 5 and 15 minute load averages (default: %(default)s)')
+    parser.add_argument('--max-core', action='store_true', default=False, dest='max_core',
+                        help='Also print the usage of the busiest CPU core (default: %(default)s)')
+    parser.add_argument('--meminfo', action='append', default=None, metavar='FIELD', dest='meminfo_fields',
+                        help='Print a field of /proc/meminfo, like Cached or Slab.  Can be given more than once ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--net', action='store_true', default=False, dest='net',
+                        help='Also print the bytes received and transmitted per second by each network interface ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--net-interface', action='append', default=None, metavar='INTERFACE', dest='net_interfaces',
+                        help='A network interface to print.  Implies --net.  Can be given more than once. ' +
+                        '(default: every interface except loopback)')
+    parser.add_argument('--swap', action='store_true', default=False, dest='swap',
+                        help='Print the swap usage (default: %(default)s)')
+    parser.add_argument('--view', action='store', default=None, dest='view',
+                        choices=[sampling.VIEW_AUTO, sampling.VIEW_HOST, sampling.VIEW_CONTAINER],
+                        help='Whether the memory and CPU usage are of the whole machine or of the cgroup sysmonitor ' +
+                        'runs in (default: {})'.format(sampling.VIEW_AUTO))
+    parser.add_argument('--pressure', action='store_true', default=False, dest='pressure',
+                        help='Also print the Pressure Stall Information averages over 10 and 60 seconds ' +
+                        '(default: %(default)s)')
+
+    # top options
+    parser.add_argument('--top', action='store', type=int, default=0, metavar='N', dest='top',
+                        help='Instead of the usage line, print the N processes using the most CPU or memory ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--top-delay', action='store', type=float, default=DEFAULT_TOP_DELAY, metavar='SECONDS',
+                        dest='top_delay',
+                        help='Seconds to measure the CPU usage of each process over (default: %(default)s)')
+    parser.add_argument('--top-sort', action='store', choices=[TOP_SORT_CPU, TOP_SORT_MEM], default=TOP_SORT_CPU,
+                        dest='top_sort', help='What to rank the processes by (default: %(default)s)')
+
+    # alert options
+    parser.add_argument('--alert', action='append', type=_parse_alert, default=None, metavar='METRIC=LIMIT',
+                        dest='alerts',
+                        help='Start the line with an alert when METRIC goes above LIMIT.  Can be given more than ' +
+                        'once.  See ALERTS below.')
+
+    # history options
+    parser.add_argument('--ema', action='store_true', default=False, dest='ema',
+                        help='Also print the {} sample exponential moving averages of the history metric '.format(
+                            '/'.join(str(span) for span in HISTORY_EMA_SPANS)) + '(default: %(default)s)')
+    parser.add_argument('--history-metric', action='store', choices=sorted(HISTORY_METRICS.keys()), default=None,
+                        dest='history_metric',
+                        help='The usage that the history options describe (default: {})'.format(HISTORY_METRIC_CPU))
+    parser.add_argument('--range', action='store', type=int, default=0, metavar='N', dest='range',
+                        help='Also print the minimum and maximum of the history metric over the last N samples ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--sparkline', action='store', type=int, default=0, metavar='N', dest='sparkline',
+                        help='Also print a sparkline of the history metric over the last N samples ' +
+                        '(default: %(default)s)')
+
+    # watch options
+    parser.add_argument('--watch', action='store', type=float, default=0, metavar='SECONDS', dest='watch',
+                        help='Keep running and write a record of the usage every SECONDS seconds ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--watch-budget', action='store', type=float, default=DEFAULT_WATCH_CPU_BUDGET,
+                        metavar='PERCENT', dest='watch_budget',
+                        help='The CPU overhead, as a percentage of one core, a counted watch may use ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--watch-count', action='store', type=int, default=0, metavar='N', dest='watch_count',
+                        help='Stop watching after N records, 0 for never (default: %(default)s)')
+    parser.add_argument('--watch-file', action='store', default=None, metavar='FILE', dest='watch_file',
+                        help='Append the records to FILE instead of stdout (default: %(default)s)')
+    parser.add_argument('--watch-format', action='store', choices=[watch.FORMAT_CSV, watch.FORMAT_JSON],
+                        default=watch.FORMAT_CSV, dest='watch_format',
+                        help='Write the records as CSV or as JSON lines (default: %(default)s)')
+    parser.add_argument('--watch-max-bytes', action='store', type=int, default=DEFAULT_WATCH_MAX_BYTES, metavar='N',
+                        dest='watch_max_bytes',
+                        help='Rotate the watch file when it would grow past N bytes, 0 for never ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--watch-backups', action='store', type=int, default=DEFAULT_WATCH_BACKUPS, metavar='N',
+                        dest='watch_backups', help='The number of rotated watch files to keep (default: %(default)s)')
+
+    # daemon options
+    parser.add_argument('--daemon', action='store_true', default=False, dest='daemon',
+                        help='Keep running and serve the latest usage to other sysmonitor invocations ' +
+                        '(default: %(default)s)')
+    parser.add_argument('--interval', action='store', type=float, default=DEFAULT_DAEMON_INTERVAL, metavar='SECONDS',
+                        dest='interval', help='Seconds between samples when running as a daemon (default: %(default)s)')
+    parser.add_argument('--no-daemon', action='store_true', default=False, dest='no_daemon',
+                        help='Do not ask a running daemon for the usage, always sample directly ' +
+                        '(default: %(default)s)')
+
+    opts = parser.parse_args()
+
+    if opts.interval <= 0:
+        parser.error('The interval must be greater than zero: {}'.format(opts.interval))
+    if opts.watch < 0:
+        parser.error('The watch interval cannot be negative: {}'.format(opts.watch))
+    if opts.watch_count < 0 or opts.watch_max_bytes < 0 or opts.watch_backups < 0:
+        parser.error('The watch count, maximum bytes and backups cannot be negative.')
+    if opts.top < 0:
+        parser.error('The number of top processes cannot be negative: {}'.format(opts.top))
+    if opts.top_delay < 0:
+        parser.error('The top delay cannot be negative: {}'.format(opts.top_delay))
+    if opts.busiest < 0:
+        parser.error('The number of busiest cores cannot be negative: {}'.format(opts.busiest))
+    if opts.range < 0 or opts.sparkline < 0:
+        parser.error('The number of history samples cannot be negative.')
+
+    opts.disk = opts.disk or bool(opts.disk_devices)
+    opts.net = opts.net or bool(opts.net_interfaces)
+
+    return opts
+
+
+def _create_help_epilog():
+    return jnsstr.wrap_str_array([
+        'DAEMON',
+        'When a daemon started with --daemon is running, sysmonitor prints the line the daemon last sampled instead of '
+        'reading /proc itself.  If the daemon is not running, or does not answer quickly, sysmonitor samples directly.',
+        '',
+        'Each combination of output options is served by its own daemon, so the daemon must be started with the same '
+        'output options that the status line uses.  The daemons listen on sockets in:',
+        '  {}'.format(daemon.SOCKET_DIR),
+        '',
+        'HISTORY',
+        'Every sysmonitor, including the daemon, records the CPU and memory usage in a shared history at most once '
+        'every {:g} seconds.  The last {} samples are kept.  --ema, --range and --sparkline describe that '
+        'history.'.format(HISTORY_MIN_INTERVAL, HISTORY_RING_SLOTS),
+        '',
+        'MEMORY',
+        '--swap prints the percentage of swap in use, or -- without swap.  --dirty prints the dirty pages waiting to '
+        'be written back (a growing backlog comes before writes stall) and the pages being written back (WB).  '
+        '--meminfo prints any other /proc/meminfo field.  /proc/meminfo is read once per sample for all of them.',
+        '',
+        'CONTAINERS',
+        'On systems with a unified cgroup v2 hierarchy, sysmonitor can describe the cgroup it runs in instead of the '
+        'whole machine.  The memory usage is then a percentage of memory.max and the CPU usage is a percentage of the '
+        'cores allowed by cpu.max.  A "Throttled" field shows how many of the CPU quota periods were throttled and how '
+        'many milliseconds per second the cgroup spent throttled.  By default (--view {}), the cgroup is only used for '
+        'the resources it limits.'.format(sampling.VIEW_AUTO),
+        '',
+        'WATCH',
+        '--watch writes a timestamped record of the usage every SECONDS seconds until it is interrupted, or until '
+        '--watch-count records have been written.  The records hold the memory and CPU usage and the values of any of '
+        '--disk, --net, --pressure and --loadavg that were given.  Empty CSV values (or JSON nulls) could not be '
+        'calculated.  When a counted watch finishes, it prints its own CPU overhead to stderr and exits with a status '
+        'of 1 if the overhead was over --watch-budget percent of a core, scaled by the interval.',
+        '',
+        'PRESSURE',
+        'Pressure Stall Information is printed as the percentage of time that some (s) or all (f, for full) tasks were '
+        'stalled on a resource, averaged over 10 and 60 seconds.  Kernels without PSI print --.',
+        '',
+        'ALERTS',
+        'An alert metric is either RESOURCE.KIND.WINDOW, where RESOURCE is cpu, mem or io, KIND is some or full, and '
+        'WINDOW is avg10, avg60 or avg300, or it is load.1, load.5 or load.15.  For example, --alert mem.full.avg10=5 '
+        'starts the line with "ALERT: mem.full.avg10=12.3" while more than 5% of the last 10 seconds were spent with '
+        'every task stalled on memory.  Metrics that the kernel does not report never alert.',
+    ])
+
+
+def _parse_alert(value):
+    name, sep, limit = value.partition('=')
+
+    if not sep or name not in pressure.get_metric_names():
+        raise argparse.ArgumentTypeError('Alerts must look like METRIC=LIMIT with one of the metrics: {}'.format(
+            ', '.join(pressure.get_metric_names())))
+
+    try:
+        return name, float(limit)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError('The alert limit is not a number: {}'.format(limit)) from e
+
+
+########################
+# Formatting Functions #
+########################
+
+
+def _create_status_line(opts, sampler):
+    mem_usage = sampler.memory_usage()
+    cpu_usage = sampler.cpu_usage()
+    fields = [
+        'Mem: ' + _format_percent(mem_usage),
+        'CPU: ' + _format_percent(cpu_usage),
+    ]
+
+    throttling = sampler.cpu_throttling()
+
+    if throttling is not None:
+        fields.append('Throttled: {} {:.0f}ms/s'.format(_format_percent(throttling[0]), throttling[1]))
+
+    if opts.swap or opts.dirty or opts.meminfo_fields:
+        fields.extend(_create_meminfo_fields(opts, sampler.memory_info()))
+
+    if opts.max_core or opts.busiest or opts.core_bar:
+        fields.extend(_create_per_cpu_fields(opts, sampler.per_cpu_usages()))
+
+    if opts.disk:
+        fields.append(_create_disk_field(sampler.disk_rates(opts.disk_devices)))
+
+    if opts.net:
+        fields.append(_create_net_field(sampler.net_rates(opts.net_interfaces)))
+
+    if opts.pressure:
+        fields.append(_create_pressure_field(sampler.pressures()))
+
+    if opts.loadavg:
+        fields.append('Load: ' + (' '.join('{:.2f}'.format(load) for load in sampler.load_average() or []) or '--'))
+
+    if opts.alerts:
+        fields[:0] = _create_alert_fields(opts, sampler)
+
+    with _open_history_ring() as ring:
+        _record_history(ring, cpu_usage, mem_usage)
+
+        if opts.ema or opts.range or opts.sparkline:
+            fields.extend(_create_history_fields(opts, ring.samples()))
+
+    return ', '.join(fields)
+
+
+def _create_meminfo_fields(opts, info):
+    fields = []
+
+    if opts.swap:
+        fields.append('Swap: ' + _format_percent(meminfo.get_swap_usage(info)))
+
+    if opts.dirty:
+        dirty, writeback = meminfo.get_dirty_backlog(info)
+        fields.append('Dirty: {} WB {}'.format(_format_meminfo_value('Dirty', dirty),
+                                               _format_meminfo_value('Writeback', writeback)))
+
+    for field in opts.meminfo_fields or []:
+        fields.append('{}: {}'.format(field, _format_meminfo_value(field, info.get(field))))
+
+    return fields
+
+
+def _create_per_cpu_fields(opts, per_cpu_usages):
+    cpu_ids, usages = per_cpu_usages if per_cpu_usages else (None, None)
+    fields = []
+
+    if opts.max_core:
+        fields.append('Max Core: ' + _format_percent(max(usages) if usages else None))
+
+    if opts.busiest:
+        busiest = percpu.busiest(cpu_ids, usages, opts.busiest) if usages else []
+        fields.append('Busiest: ' + (' '.join('{}:{}'.format(cpu_id, _format_percent(usage))
+                                              for cpu_id, usage in busiest) or '--'))
+
+    if opts.core_bar:
+        fields.append('Cores: ' + (percpu.format_bar(usages) if usages else '--'))
+
+    return fields
+
+
+def _create_history_fields(opts, samples):
+    label, index = HISTORY_METRICS[opts.history_metric or HISTORY_METRIC_CPU]
+    values = [_nan_to_none(sample.record[index]) for sample in samples]
+    fields = []
+
+    if opts.ema:
+        averages = [history.ema(values, span) for span in HISTORY_EMA_SPANS]
+        fields.append('{} EMA: {}'.format(label, '/'.join(_format_percent(average) for average in averages)))
+
+    if opts.range:
+        value_range = history.window_range(values[-opts.range:])
+        fields.append('{} Range: {}'.format(
+            label, '--' if value_range is None else '{}-{}'.format(*[_format_percent(value) for value in value_range])))
+
+    if opts.sparkline:
+        window = values[-opts.sparkline:]
+        fields.append('{} Trend: {}'.format(
+            label, history.sparkline(window) if any(value is not None for value in window) else '--'))
+
+    return fields
+
+
+def _create_disk_field(disk_rates):
+    value = '--'
+
+    if disk_rates is not None:
+        read_rate, write_rate, iops, utilization = disk_rates
+        value = 'R {} W {} {} IOPS {}'.format(_format_rate(read_rate), _format_rate(write_rate), round(iops),
+                                               _format_percent(utilization))
+
+    return 'Disk: ' + value
+
+
+def _create_net_field(net_rates):
+    value = '--'
+
+    if net_rates is not None:
+        names, rates = net_rates
+        value = ' '.join('{} rx {} tx {}'.format(name, _format_rate(rates[i * 2]), _format_rate(rates[i * 2 + 1]))
+                         for i, name in enumerate(names))
+
+    return 'Net: ' + value
+
+
+def _create_pressure_field(pressures):
+    resources = []
+
+    for resource, stalls in pressures.items():
+        if stalls:
+            resources.append(resource)
+            resources.extend('{}{}/{}'.format(kind[0], _format_pressure(stalls[kind].get('avg10')),
+                                              _format_pressure(stalls[kind].get('avg60')))
+                             for kind in pressure.KINDS if kind in stalls)
+
+    return 'PSI: ' + (' '.join(resources) or '--')
+
+
+def _create_alert_fields(opts, sampler):
+    pressures = sampler.pressures() if any(not name.startswith('load.') for name, _ in opts.alerts) else {}
+    load_average = sampler.load_average() if any(name.startswith('load.') for name, _ in opts.alerts) else None
+    alerts = []
+
+    for name, limit in opts.alerts:
+        value = pressure.get_metric(name, pressures, load_average)
+
+        if value is not None and value > limit:
+            alerts.append('{}={:g}'.format(name, value))
+
+    return ['ALERT: ' + ' '.join(alerts)] if alerts else []
+
+
+def _format_pressure(percent):
+    return '--' if percent is None else '{:.1f}'.format(percent)
+
+
+def _format_percent(usage):
+    return '--' if usage is None else str(round(usage)) + '%'
+
+
+def _format_rate(bytes_per_second):
+    return _format_bytes(bytes_per_second) + '/s'
+
+
+def _format_meminfo_value(field, value):
+    if value is None:
+        formatted = '--'
+    else:
+        formatted = str(value) if meminfo.is_page_count(field) else _format_bytes(value)
+
+    return formatted
+
+
+def _format_bytes(byte_count):
+    value = byte_count
+    unit_index = 0
+
+    while value >= 1024 and unit_index < len(BYTE_UNITS) - 1:
+        value /= 1024
+        unit_index += 1
+
+    return '{:.{}f}{}'.format(value, 1 if 0 < unit_index and value < 10 else 0, BYTE_UNITS[unit_index])
+
+
+########################
+# Validation Functions #
+########################
+
+
+def _validate_os():
+    if not (jnsos.is_linux() or jnsos.is_cygwin()):
+        raise OSError('Unsupported operating system: {}.  Only Linux and Cygwin are supported.')
+
+
+#####################
+# History Functions #
+#####################
+
+
+def _open_history_ring():
+    sampling.make_config_dir()
+    return samplering.SampleRing(os.path.join(sampling.CONFIG_DIR, HISTORY_RING_FILE), HISTORY_RING_FORMAT,
+                                 HISTORY_RING_SLOTS)
+
+
+def _record_history(ring, cpu_usage, mem_usage):
+    now = time.time()
+    last_sample = ring.latest()
+
+    if last_sample is None or not 0 <= now - last_sample.timestamp < HISTORY_MIN_INTERVAL:
+        ring.append(now, (_none_to_nan(cpu_usage), _none_to_nan(mem_usage)),
+                    expected_head_seq=0 if last_sample is None else last_sample.seq)
+
+
+#################
+# Top Functions #
+#################
+
+
+def _run_top(opts):
+    scanner = procscan.ProcessScanner()
+
+    # The first scan only gives the second one something to compare against
+    if opts.top_sort == TOP_SORT_CPU:
+        scanner.scan(time.monotonic())
+        time.sleep(opts.top_delay)
+
+    usages = scanner.scan(time.monotonic())
+
+    if opts.top_sort == TOP_SORT_CPU:
+        top = heapq.nlargest(opts.top, usages, key=lambda usage: usage.cpu_percent or 0)
+    else:
+        top = heapq.nlargest(opts.top, usages, key=lambda usage: usage.rss_bytes)
+
+    print(_format_top_line('PID', 'CPU%', 'RSS', 'COMMAND'))
+
+    for usage in top:
+        print(_format_top_line(usage.key.pid, _format_top_cpu_percent(usage.cpu_percent),
+                               _format_bytes(usage.rss_bytes), scanner.get_cmdline(usage)))
+
+
+def _format_top_line(pid, cpu_percent, rss, command):
+    line = '{:>7} {:>6} {:>6}  {}'.format(pid, cpu_percent, rss, command)
+    return line[:shutil.get_terminal_size().columns]
+
+
+def _format_top_cpu_percent(cpu_percent):
+    return '--' if cpu_percent is None else '{:.1f}'.format(cpu_percent)
+
+
+###################
+# Watch Functions #
+###################
+
+
+def _run_watch(opts):
+    sampler = sampling.WatchSampler(opts.view, opts.meminfo_fields or ())
+    columns = watch.get_columns(opts)
+    writer = watch.RecordWriter(columns, opts.watch_format, file_name=opts.watch_file,
+                                max_bytes=opts.watch_max_bytes, backup_count=opts.watch_backups)
+
+    try:
+        with writer:
+            records, cpu_seconds, wall_seconds = watch.run(
+                opts.watch, lambda: watch.create_record(opts, sampler.tick()), writer, count=opts.watch_count)
+    except (KeyboardInterrupt, BrokenPipeError):
+        return
+    finally:
+        sampler.close()
+
+    if opts.watch_count and not watch.check_overhead(records, cpu_seconds, wall_seconds, opts.watch_budget, opts.watch):
+        sys.exit(1)
+
+
+####################
+# Daemon Functions #
+####################
+
+
+def _run_daemon(opts):
+    sampler = sampling.DaemonSampler(opts.view, opts.meminfo_fields or ())
+
+    try:
+        daemon.serve(_get_daemon_socket_file(opts), opts.interval, lambda: _create_status_line(opts, sampler.tick()))
+    except daemon.DaemonAlreadyRunningError as e:
+        print(str(e), file=sys.stderr, flush=True)
+        sys.exit(1)
+
+
+def _get_daemon_socket_file(opts):
+    output_opts = ','.join('{}={}'.format(dest, getattr(opts, dest)) for dest in OUTPUT_OPTIONS if getattr(opts, dest))
+    return daemon.get_socket_file(output_opts)
+
+
+#####################
+# Utility Functions #
+#####################
+
+
+def _none_to_nan(value):
+    return math.nan if value is None else value
+
+
+def _nan_to_none(value):
+    return None if math.isnan(value) else value
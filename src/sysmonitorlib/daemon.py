@@ -0,0 +1,212 @@
+import contextlib
+import fcntl
+import os
+import os.path
+import select
+import signal
+import socket
+import time
+import zlib
+
+
+# The directory that the daemons listen in.  Each combination of output options is served by its own daemon, whose
+# socket is named after a checksum of the options.
+SOCKET_DIR = os.path.join(os.path.expanduser('~'), '.jns/sysmonitor')
+SOCKET_FILE_PREFIX = 'sysmonitor'
+SOCKET_FILE_SUFFIX = '.sock'
+
+# How long a client will wait on the daemon before falling back to sampling by itself.  A healthy daemon answers in well
+# under a millisecond, so this only matters when the daemon is wedged.
+QUERY_TIMEOUT = 0.05
+
+# The most bytes a client will read from the daemon.  The status line is much shorter than this.
+MAX_LINE_LENGTH = 4096
+
+# How many clients may be waiting to be accepted at once.  Every tmux session refreshes its status line independently,
+# so this should comfortably exceed the number of sessions that are likely to be open.
+_LISTEN_BACKLOG = 64
+
+# How long the daemon will wait for a single client to accept its line before giving up on that client.
+_CLIENT_SEND_TIMEOUT = 0.1
+
+
+####################
+# Client Functions #
+####################
+
+
+def get_socket_file(output_options=''):
+    """Returns the path of the socket of the daemon that serves a combination of output options.
+
+    Args:
+        output_options (str): the output options, as a string that is the same every time the same options are given.
+            The daemon for the default options is given an empty string.
+    """
+    name = SOCKET_FILE_PREFIX
+
+    if output_options:
+        name += '-{:08x}'.format(zlib.crc32(output_options.encode('utf-8')))
+
+    return os.path.join(SOCKET_DIR, name + SOCKET_FILE_SUFFIX)
+
+
+def query(socket_path, timeout):
+    """Reads the latest status line from a running daemon.
+
+    Args:
+        socket_path (str): the path of the daemon's Unix socket.
+        timeout (float): the most seconds to wait for the daemon to connect and answer.
+
+    Returns:
+        Returns the status line, or None if the daemon is not running or did not answer in time.
+    """
+    line = None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            line = _recv_line(sock)
+    except OSError:
+        line = None
+
+    return line
+
+
+def _recv_line(sock):
+    chunks = []
+    size = 0
+    chunk = sock.recv(MAX_LINE_LENGTH)
+
+    while chunk and size < MAX_LINE_LENGTH:
+        chunks.append(chunk)
+        size += len(chunk)
+        chunk = sock.recv(MAX_LINE_LENGTH - size) if size < MAX_LINE_LENGTH else b''
+
+    line = b''.join(chunks).decode('utf-8').strip()
+
+    return line if line else None
+
+
+####################
+# Daemon Functions #
+####################
+
+
+def serve(socket_path, interval, sample_fn):
+    """Samples on a fixed schedule and answers every connection on the socket with the most recent sample.
+
+    This function does not return until the daemon is terminated.
+
+    Args:
+        socket_path (str): the path of the Unix socket to listen on.
+        interval (float): the number of seconds between samples.
+        sample_fn (callable): a function that takes no arguments and returns the status line to be served.
+    """
+    with _claim_socket_path(socket_path):
+        _install_signal_handlers()
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+        try:
+            server.bind(socket_path)
+            server.listen(_LISTEN_BACKLOG)
+            server.setblocking(False)
+            _serve_forever(server, interval, sample_fn)
+        finally:
+            server.close()
+            _remove_socket(socket_path)
+
+
+def _serve_forever(server, interval, sample_fn):
+    line = _encode_line(sample_fn())
+    next_sample_time = time.monotonic() + interval
+
+    while True:
+        timeout = max(0, next_sample_time - time.monotonic())
+        readable, _, _ = select.select([server], [], [], timeout)
+
+        if readable:
+            _answer_clients(server, line)
+
+        now = time.monotonic()
+
+        if now >= next_sample_time:
+            line = _encode_line(sample_fn())
+
+            # If sampling fell behind (e.g. the machine was suspended), start the schedule over instead of sampling
+            # repeatedly to catch up.
+            next_sample_time += interval
+            if next_sample_time <= now:
+                next_sample_time = now + interval
+
+
+def _answer_clients(server, line):
+    while True:
+        try:
+            conn, _ = server.accept()
+        except (BlockingIOError, InterruptedError):
+            break
+
+        with conn:
+            try:
+                conn.settimeout(_CLIENT_SEND_TIMEOUT)
+                conn.sendall(line)
+            except OSError:
+                # The client went away or is not reading.  Either way, it is the client's problem.
+                pass
+
+
+def _encode_line(line):
+    return (line + '\n').encode('utf-8')
+
+
+@contextlib.contextmanager
+def _claim_socket_path(socket_path):
+    """Takes an exclusive lock that is held until the returned context manager exits.
+
+    Only the daemon holding the lock may touch the socket file, so two daemons started at the same time cannot unlink
+    each other's sockets.
+    """
+    socket_dir = os.path.dirname(socket_path)
+    if socket_dir and not os.path.isdir(socket_dir):
+        os.makedirs(socket_dir)
+
+    with open(socket_path + '.lock', 'w', encoding='utf-8') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as e:
+            raise DaemonAlreadyRunningError(
+                'A sysmonitor daemon is already listening on: {}'.format(socket_path)) from e
+
+        # Nothing else holds the lock, so any socket file left behind belongs to a daemon that did not shut down
+        # cleanly.
+        _remove_socket(socket_path)
+
+        yield lock_file
+
+
+def _remove_socket(socket_path):
+    try:
+        os.unlink(socket_path)
+    except FileNotFoundError:
+        pass
+
+
+def _install_signal_handlers():
+    # Exit through the normal path so the socket file gets removed.
+    for signum in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, _exit_on_signal)
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+##########
+# Errors #
+##########
+
+
+class DaemonAlreadyRunningError(Exception):
+    pass
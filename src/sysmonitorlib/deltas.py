@@ -0,0 +1,136 @@
+import math
+import zlib
+
+from . import samplering
+
+
+def checksum_names(names):
+    """Returns a checksum of a list of names, such as the devices that a reading has counters for.
+
+    A reading that starts with this checksum can be checked with `get_named_deltas' against a reading of other names.
+    """
+    return zlib.crc32('\0'.join(names).encode('utf-8'))
+
+
+def get_named_deltas(counters_old, counters_new, seconds):
+    """Returns the change in each counter between two readings whose first counter is a `checksum_names' checksum.
+
+    Returns:
+        Returns the changes of the counters after the checksum, or None if the readings are of different names, no time
+        passed between them or a counter went backwards because it was reset.
+    """
+    counter_deltas = [new - old for old, new in zip(counters_old[1:], counters_new[1:])]
+    return counter_deltas if counters_old[0] == counters_new[0] and seconds > 0 and min(counter_deltas) >= 0 else None
+
+
+def elapsed_seconds(counters_old, counters_new, seconds):
+    """The default interval function.  The interval between two readings is just the time between them."""
+    return seconds
+
+
+class CounterDelta:
+    """Calculates values from the change in a set of ever increasing counters between two readings.
+
+    Every reading is stored, along with the values calculated from it, in a sample store (a `SampleRing' or a
+    `MemoryStore').  A new reading is compared against the newest stored reading:
+
+     * If there is no stored reading, the new reading is stored and no values are calculated.
+     * If the interval between the readings is less than the minimum, the values calculated for the stored reading are
+       reused.  The new reading is thrown away so that the next reading is compared against the stored one.
+     * If the interval is greater than the maximum, the stored reading is too stale to be meaningful.  The new reading
+       replaces it and no values are calculated.
+     * Otherwise, the values are calculated from the two readings and stored with the new reading.
+
+    Args:
+        counter_count (int): the number of counters in every reading.
+        result_count (int): the number of values calculated from each pair of readings.
+        calculate_fn (callable): calculates the values.  It is given the old counters, the new counters and the seconds
+            between them and returns a sequence of `result_count' values, or None if the values cannot be calculated.
+        min_interval (float): the minimum interval between readings.
+        max_interval (float): the maximum interval between readings.
+        interval_fn (callable): measures the interval between readings.  It is given the same arguments as
+            `calculate_fn'.  By default, the interval is the number of seconds between the readings.
+    """
+
+    def __init__(self, counter_count, result_count, calculate_fn, min_interval, max_interval,
+                 interval_fn=elapsed_seconds):
+        self.counter_count = counter_count
+        self.result_count = result_count
+        self.record_format = '{}Q{}d'.format(counter_count, result_count)
+        self._calculate_fn = calculate_fn
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._interval_fn = interval_fn
+
+    def update(self, store, counters, now, check_interval=True):
+        """Compares a new reading with the newest stored reading.
+
+        Args:
+            store: the `SampleRing' or `MemoryStore' that holds the readings.
+            counters (sequence): the new reading.
+            now (float): the time of the new reading.
+            check_interval (bool): whether to apply the minimum and maximum interval.  A caller that reads the counters
+                on its own fixed schedule does not need them.
+
+        Returns:
+            Returns the calculated values, or None if they could not be calculated.
+        """
+        last_sample = store.latest()
+        results = None
+
+        if last_sample is None:
+            self._append(store, last_sample, now, counters, None)
+        else:
+            counters_old = last_sample.record[:self.counter_count]
+            seconds = now - last_sample.timestamp
+            interval = self._interval_fn(counters_old, counters, seconds)
+
+            # The clock went backwards or the counters were reset, so the stored reading is useless
+            if seconds < 0 or interval < 0:
+                self._append(store, last_sample, now, counters, None)
+            # Too little time has passed between readings
+            elif check_interval and interval < self._min_interval:
+                results = self._get_results(last_sample)
+            # Too much time has passed between readings
+            elif check_interval and interval > self._max_interval:
+                self._append(store, last_sample, now, counters, None)
+            # An acceptable amount of time has passed between readings
+            else:
+                results = self._calculate_fn(counters_old, counters, seconds)
+                self._append(store, last_sample, now, counters, results)
+
+        return results
+
+    def _append(self, store, last_sample, now, counters, results):
+        if results is None:
+            results = [math.nan] * self.result_count
+
+        # If another process appended a reading since `last_sample' was read, its reading is just as good as this one.
+        store.append(now, tuple(counters) + tuple(results),
+                     expected_head_seq=0 if last_sample is None else last_sample.seq)
+
+    def _get_results(self, sample):
+        results = sample.record[self.counter_count:]
+        return None if any(math.isnan(result) for result in results) else results
+
+
+class MemoryStore:
+    """Holds the newest reading in memory.  It can be used in place of a `SampleRing' by a long running process."""
+
+    def __init__(self):
+        self._latest = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def latest(self):
+        return self._latest
+
+    def append(self, timestamp, record, expected_head_seq=None):
+        seq = 1 if self._latest is None else self._latest.seq + 1
+        self._latest = samplering.Sample(seq=seq, timestamp=timestamp, record=tuple(record))
+
+        return seq
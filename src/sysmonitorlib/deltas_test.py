@@ -0,0 +1,71 @@
+import math
+import unittest
+
+from sysmonitorlib import deltas
+
+
+def _calculate_difference(counters_old, counters_new, seconds):
+    return [(counters_new[0] - counters_old[0]) / seconds]
+
+
+class GetNamedDeltasTest(unittest.TestCase):
+
+    def test_deltas_of_same_names(self):
+        checksum = deltas.checksum_names(['sda', 'sdb'])
+        self.assertEqual(deltas.get_named_deltas([checksum, 10, 20], [checksum, 15, 20], 1.0), [5, 0])
+
+    def test_different_names(self):
+        old = [deltas.checksum_names(['sda']), 10]
+        new = [deltas.checksum_names(['sdb']), 15]
+        self.assertIsNone(deltas.get_named_deltas(old, new, 1.0))
+
+    def test_no_time_passed(self):
+        checksum = deltas.checksum_names(['eth0'])
+        self.assertIsNone(deltas.get_named_deltas([checksum, 10], [checksum, 15], 0))
+
+    def test_counter_reset(self):
+        checksum = deltas.checksum_names(['eth0'])
+        self.assertIsNone(deltas.get_named_deltas([checksum, 10], [checksum, 5], 1.0))
+
+
+class CounterDeltaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.delta = deltas.CounterDelta(1, 1, _calculate_difference, min_interval=1.0, max_interval=60.0)
+        self.store = deltas.MemoryStore()
+
+    def test_first_reading(self):
+        self.assertIsNone(self.delta.update(self.store, [100], 10.0))
+        self.assertTrue(math.isnan(self.store.latest().record[1]))
+
+    def test_values_from_two_readings(self):
+        self.delta.update(self.store, [100], 10.0)
+        self.assertEqual(self.delta.update(self.store, [300], 12.0), [100.0])
+        self.assertEqual(self.store.latest().record, (300, 100.0))
+
+    def test_too_soon_reuses_values(self):
+        self.delta.update(self.store, [100], 10.0)
+        self.delta.update(self.store, [300], 12.0)
+
+        self.assertEqual(self.delta.update(self.store, [1000], 12.5), (100.0,))
+        self.assertEqual(self.store.latest().record[0], 300)
+
+    def test_stale_reading_is_replaced(self):
+        self.delta.update(self.store, [100], 10.0)
+
+        self.assertIsNone(self.delta.update(self.store, [300], 100.0))
+        self.assertEqual(self.store.latest().timestamp, 100.0)
+
+    def test_clock_going_backwards(self):
+        self.delta.update(self.store, [100], 10.0)
+
+        self.assertIsNone(self.delta.update(self.store, [300], 5.0))
+        self.assertEqual(self.store.latest().timestamp, 5.0)
+
+    def test_unchecked_interval(self):
+        self.delta.update(self.store, [100], 10.0)
+        self.assertEqual(self.delta.update(self.store, [150], 10.5, check_interval=False), [100.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
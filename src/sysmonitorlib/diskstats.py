@@ -0,0 +1,87 @@
+import os
+
+from . import deltas
+
+
+# /proc/diskstats always counts in 512 byte sectors, no matter the real sector size of the device.
+SECTOR_SIZE = 512
+
+# Block devices that are not disks, or whose I/O is already counted against the disks underneath them
+_IGNORED_DEVICE_PREFIXES = ('dm-', 'fd', 'loop', 'md', 'ram', 'sr', 'zram')
+
+# The indexes of the counters used from each line of /proc/diskstats
+_NAME_INDEX = 2
+_READS_INDEX = 3
+_SECTORS_READ_INDEX = 5
+_WRITES_INDEX = 7
+_SECTORS_WRITTEN_INDEX = 9
+_IO_MS_INDEX = 12
+
+# The counters kept for each reading are the checksum of the device names, the total reads, sectors read, writes and
+# sectors written, then the milliseconds spent doing I/O by each device.
+_TOTALS_COUNT = 5
+
+# The number of values calculated from each pair of readings
+RESULT_COUNT = 4
+
+
+def get_default_devices(sys_block_dir='/sys/block'):
+    """Returns the names of the whole disks on the system.
+
+    Partitions, loop devices, RAM disks and the like are left out so that the same I/O is not counted more than once.
+    """
+    try:
+        names = os.listdir(sys_block_dir)
+    except OSError:
+        names = []
+
+    return sorted(name for name in names if not name.startswith(_IGNORED_DEVICE_PREFIXES))
+
+
+def get_counter_count(device_count):
+    return _TOTALS_COUNT + device_count
+
+
+def parse_diskstats(diskstats, devices):
+    """Reads the counters of the given devices from the contents of /proc/diskstats.
+
+    Returns:
+        Returns a (names, counters) tuple, or None if none of the devices were found.  `names' holds the device names
+        that were found.  `counters' is meant to be given to a `CounterDelta' built with `get_counter_count' counters.
+    """
+    wanted = set(devices)
+    names = []
+    totals = [0] * (_TOTALS_COUNT - 1)
+    io_ms = []
+
+    for line in (diskstats or '').splitlines():
+        parts = line.split()
+
+        if len(parts) > _IO_MS_INDEX and parts[_NAME_INDEX] in wanted:
+            names.append(parts[_NAME_INDEX])
+            totals[0] += int(parts[_READS_INDEX])
+            totals[1] += int(parts[_SECTORS_READ_INDEX])
+            totals[2] += int(parts[_WRITES_INDEX])
+            totals[3] += int(parts[_SECTORS_WRITTEN_INDEX])
+            io_ms.append(int(parts[_IO_MS_INDEX]))
+
+    return (names, [deltas.checksum_names(names)] + totals + io_ms) if names else None
+
+
+def calculate_rates(counters_old, counters_new, seconds):
+    """Calculates the bytes read per second, bytes written per second, I/O operations per second and the utilization
+    percentage of the busiest device."""
+    counter_deltas = deltas.get_named_deltas(counters_old, counters_new, seconds)
+    rates = None
+
+    if counter_deltas is not None:
+        reads, sectors_read, writes, sectors_written = counter_deltas[:_TOTALS_COUNT - 1]
+        busiest_io_ms = max(counter_deltas[_TOTALS_COUNT - 1:])
+        rates = (
+            sectors_read * SECTOR_SIZE / seconds,
+            sectors_written * SECTOR_SIZE / seconds,
+            (reads + writes) / seconds,
+            min(100.0, busiest_io_ms / (seconds * 1000) * 100),
+        )
+
+    return rates
@@ -0,0 +1,74 @@
+import os
+import os.path
+import tempfile
+import unittest
+
+from sysmonitorlib import diskstats
+
+
+_DISKSTATS = '''\
+   8       0 sda 100 0 2000 0 50 0 1000 0 0 300 0 0 0 0 0
+   8       1 sda1 100 0 2000 0 50 0 1000 0 0 300 0 0 0 0 0
+   8      16 sdb 10 0 200 0 5 0 100 0 0 700 0 0 0 0 0
+   7       0 loop0 1 0 8 0 0 0 0 0 0 1 0 0 0 0 0
+'''
+
+
+def _parse(devices):
+    parsed = diskstats.parse_diskstats(_DISKSTATS, devices)
+    return parsed if parsed is not None else ([], [])
+
+
+class ParseDiskstatsTest(unittest.TestCase):
+
+    def test_totals_of_wanted_devices(self):
+        names, counters = _parse(['sda', 'sdb'])
+
+        self.assertEqual(names, ['sda', 'sdb'])
+        self.assertEqual(counters[1:], [110, 2200, 55, 1100, 300, 700])
+        self.assertEqual(len(counters), diskstats.get_counter_count(2))
+
+    def test_no_wanted_devices(self):
+        self.assertIsNone(diskstats.parse_diskstats(_DISKSTATS, ['nvme0n1']))
+
+    def test_default_devices(self):
+        with tempfile.TemporaryDirectory() as sys_block_dir:
+            for name in ['sdb', 'loop0', 'dm-0', 'sda', 'zram0', 'nvme0n1']:
+                os.mkdir(os.path.join(sys_block_dir, name))
+
+            self.assertEqual(diskstats.get_default_devices(sys_block_dir), ['nvme0n1', 'sda', 'sdb'])
+
+    def test_no_default_devices(self):
+        self.assertEqual(diskstats.get_default_devices('/nonexistent'), [])
+
+
+class CalculateRatesTest(unittest.TestCase):
+
+    def test_rates(self):
+        old = _parse(['sda', 'sdb'])[1]
+        new = list(old)
+        new[1] += 20  # reads
+        new[2] += 400  # sectors read
+        new[3] += 10  # writes
+        new[4] += 200  # sectors written
+        new[5] += 500  # sda busy for 500 ms
+        new[6] += 1000  # sdb busy for 1000 ms
+
+        self.assertEqual(diskstats.calculate_rates(old, new, 2.0), (102400.0, 51200.0, 15.0, 50.0))
+
+    def test_utilization_is_at_most_100(self):
+        old = _parse(['sda'])[1]
+        new = list(old)
+        new[5] += 3000
+
+        self.assertEqual(diskstats.calculate_rates(old, new, 1.0)[3], 100.0)
+
+    def test_different_devices(self):
+        old = _parse(['sda'])[1]
+        new = _parse(['sdb'])[1]
+
+        self.assertIsNone(diskstats.calculate_rates(old, new, 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import math
+
+
+# Eight levels of block characters, from nearly empty to full, used to draw sparklines.
+_SPARK_LEVELS = '▁▂▃▄▅▆▇█'
+
+# Drawn in a sparkline where a sample has no value
+_SPARK_GAP = ' '
+
+
+def ema(values, span):
+    """Calculates the exponential moving average of `values' over `span' samples.
+
+    Args:
+        values (list): the samples, oldest first.  Samples that are None are skipped.
+        span (int): the number of samples the average is taken over.  A span of 1 is just the newest sample.
+
+    Returns:
+        Returns the average, or None if there are no samples.
+    """
+    alpha = 2 / (span + 1)
+    average = None
+
+    for value in values:
+        if value is not None:
+            average = value if average is None else average + alpha * (value - average)
+
+    return average
+
+
+def window_range(values):
+    """Returns a (minimum, maximum) tuple of the samples that are not None, or None if there are no such samples."""
+    present = [value for value in values if value is not None]
+    return (min(present), max(present)) if present else None
+
+
+def sparkline(values, low=0.0, high=100.0):
+    """Draws one block character per sample, taller for larger samples.
+
+    Args:
+        values (list): the samples, oldest first.  Samples that are None are drawn as a gap.
+        low (float): the value drawn as the shortest block.
+        high (float): the value drawn as the tallest block.
+    """
+    return ''.join(_SPARK_GAP if value is None else _SPARK_LEVELS[_get_spark_level(value, low, high)]
+                   for value in values)
+
+
+def _get_spark_level(value, low, high):
+    top_level = len(_SPARK_LEVELS) - 1
+    scaled = (value - low) / (high - low) if high > low else 0
+
+    return max(0, min(top_level, math.floor(scaled * len(_SPARK_LEVELS))))
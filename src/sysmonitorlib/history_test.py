@@ -0,0 +1,47 @@
+import unittest
+
+from sysmonitorlib import history
+
+
+class EmaTest(unittest.TestCase):
+
+    def test_span_of_one_is_newest(self):
+        self.assertEqual(history.ema([10.0, 20.0, 30.0], 1), 30.0)
+
+    def test_newer_values_weigh_more(self):
+        # alpha = 2 / (3 + 1) = 0.5
+        self.assertEqual(history.ema([10.0, 20.0, 40.0], 3), 27.5)
+
+    def test_missing_values_are_skipped(self):
+        self.assertEqual(history.ema([None, 10.0, None, 20.0], 3), 15.0)
+
+    def test_no_values(self):
+        self.assertIsNone(history.ema([None, None], 3))
+
+
+class WindowRangeTest(unittest.TestCase):
+
+    def test_range(self):
+        self.assertEqual(history.window_range([5.0, None, 1.0, 9.0]), (1.0, 9.0))
+
+    def test_no_values(self):
+        self.assertIsNone(history.window_range([None]))
+
+
+class SparklineTest(unittest.TestCase):
+
+    def test_one_block_per_value(self):
+        self.assertEqual(history.sparkline([0.0, 50.0, 100.0]), '▁▅█')
+
+    def test_missing_values_are_gaps(self):
+        self.assertEqual(history.sparkline([0.0, None, 100.0]), '▁ █')
+
+    def test_values_are_clamped(self):
+        self.assertEqual(history.sparkline([-10.0, 200.0]), '▁█')
+
+    def test_scale(self):
+        self.assertEqual(history.sparkline([10.0, 20.0], low=10.0, high=20.0), '▁█')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import re
+
+
+# The fields that are always read
+DEFAULT_FIELDS = (
+    'MemTotal', 'MemFree', 'MemAvailable', 'Buffers', 'Cached', 'Dirty', 'Writeback', 'SwapTotal', 'SwapFree', 'Slab',
+    'HugePages_Total', 'HugePages_Free', 'HugePages_Rsvd', 'HugePages_Surp', 'Hugepagesize',
+)
+
+_KILOBYTE = 1024
+
+# The fields that count huge pages instead of measuring a size
+_PAGE_COUNT_PREFIX = 'HugePages_'
+
+
+class MemInfoParser:
+    """Reads a fixed set of fields from the contents of /proc/meminfo.
+
+    The fields are found with a single regular expression that is compiled once, so parsing is one pass over the text
+    that only creates objects for the wanted fields, instead of splitting every line.
+
+    Args:
+        fields (iterable): the names of the fields to read, as they appear in /proc/meminfo.
+    """
+
+    def __init__(self, fields=DEFAULT_FIELDS):
+        self.fields = tuple(dict.fromkeys(fields))
+        self._indexes = {field: i for i, field in enumerate(self.fields)}
+        self._pattern = re.compile(r'^({}):\s+(\d+)( kB)?$'.format('|'.join(re.escape(field) for field in self.fields)),
+                                   re.MULTILINE)
+
+    def parse(self, meminfo):
+        """Returns a `MemInfo' with the fields found in `meminfo'."""
+        values = [None] * len(self.fields)
+
+        for match in self._pattern.finditer(meminfo or ''):
+            value = int(match.group(2))
+            values[self._indexes[match.group(1)]] = value * _KILOBYTE if match.group(3) else value
+
+        return MemInfo(self._indexes, values)
+
+
+class MemInfo:
+    """The fields read by a `MemInfoParser'.  Sizes are in bytes.  The HugePages_* fields are counts of pages."""
+
+    __slots__ = ('_indexes', '_values')
+
+    def __init__(self, indexes, values):
+        self._indexes = indexes
+        self._values = values
+
+    def get(self, field):
+        """Returns the value of a field, or None if it was not read or is not reported by this kernel."""
+        index = self._indexes.get(field)
+        return None if index is None else self._values[index]
+
+
+def is_page_count(field):
+    """Returns whether a field is a number of huge pages instead of a size in bytes."""
+    return field.startswith(_PAGE_COUNT_PREFIX)
+
+
+def get_memory_usage(info):
+    """Returns the percentage of memory in use, or None if it cannot be calculated."""
+    total = info.get('MemTotal')
+
+    # MemAvailable is not available in Cygwin, so MemFree has to be used instead
+    available = info.get('MemAvailable') or info.get('MemFree')
+
+    return (total - available) / total * 100 if total and available else None
+
+
+def get_swap_usage(info):
+    """Returns the percentage of swap in use, or None if there is no swap."""
+    total = info.get('SwapTotal')
+    free = info.get('SwapFree')
+
+    return (total - free) / total * 100 if total and free is not None else None
+
+
+def get_dirty_backlog(info):
+    """Returns the bytes of dirty pages waiting to be written back and the bytes being written back right now."""
+    return info.get('Dirty'), info.get('Writeback')
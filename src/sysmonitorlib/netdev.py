@@ -0,0 +1,56 @@
+from . import deltas
+
+
+# Interfaces that are left out unless they are asked for by name
+_IGNORED_INTERFACES = ('lo',)
+
+# The indexes of the counters used from each line of /proc/net/dev, after the interface name
+_RX_BYTES_INDEX = 0
+_TX_BYTES_INDEX = 8
+
+# The counters kept for each reading are the checksum of the interface names, then the bytes received and the bytes
+# transmitted by each interface.
+_COUNTERS_PER_INTERFACE = 2
+
+
+def get_counter_count(interface_count):
+    return 1 + interface_count * _COUNTERS_PER_INTERFACE
+
+
+def get_result_count(interface_count):
+    return interface_count * _COUNTERS_PER_INTERFACE
+
+
+def parse_net_dev(net_dev, interfaces=None):
+    """Reads the byte counters of network interfaces from the contents of /proc/net/dev.
+
+    Args:
+        net_dev (str): the contents of /proc/net/dev.
+        interfaces (list): the names of the interfaces to read.  If not given, every interface except loopback is read.
+
+    Returns:
+        Returns a (names, counters) tuple, or None if no interfaces were found.  `names' holds the interface names that
+        were found.  `counters' is meant to be given to a `CounterDelta' built with `get_counter_count' counters.
+    """
+    wanted = None if interfaces is None else set(interfaces)
+    names = []
+    counters = []
+
+    for line in (net_dev or '').splitlines():
+        name, sep, values = line.partition(':')
+        name = name.strip()
+
+        if sep and (name in wanted if wanted is not None else name not in _IGNORED_INTERFACES):
+            parts = values.split()
+            names.append(name)
+            counters.append(int(parts[_RX_BYTES_INDEX]))
+            counters.append(int(parts[_TX_BYTES_INDEX]))
+
+    return (names, [deltas.checksum_names(names)] + counters) if names else None
+
+
+def calculate_rates(counters_old, counters_new, seconds):
+    """Calculates the bytes received per second and bytes transmitted per second of each interface, one interface after
+    another."""
+    counter_deltas = deltas.get_named_deltas(counters_old, counters_new, seconds)
+    return None if counter_deltas is None else [delta / seconds for delta in counter_deltas]
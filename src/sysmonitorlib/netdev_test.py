@@ -0,0 +1,55 @@
+import unittest
+
+from sysmonitorlib import netdev
+
+
+_NET_DEV = '''\
+Inter-|   Receive                                       |  Transmit
+ face |bytes packets errs drop fifo frame compressed multicast|bytes packets errs drop fifo colls carrier compressed
+    lo:    5000 50 0 0 0 0 0 0    5000 50 0 0 0 0 0 0
+  eth0: 1000000 900 0 0 0 0 0 0 200000 300 0 0 0 0 0 0
+ wlan0:    3000 20 0 0 0 0 0 0    4000 30 0 0 0 0 0 0
+'''
+
+
+def _parse(interfaces=None):
+    parsed = netdev.parse_net_dev(_NET_DEV, interfaces)
+    return parsed if parsed is not None else ([], [])
+
+
+class ParseNetDevTest(unittest.TestCase):
+
+    def test_all_but_loopback(self):
+        names, counters = _parse()
+
+        self.assertEqual(names, ['eth0', 'wlan0'])
+        self.assertEqual(counters[1:], [1000000, 200000, 3000, 4000])
+        self.assertEqual(len(counters), netdev.get_counter_count(2))
+
+    def test_named_interfaces(self):
+        names, counters = _parse(['lo'])
+
+        self.assertEqual(names, ['lo'])
+        self.assertEqual(counters[1:], [5000, 5000])
+
+    def test_no_interfaces(self):
+        self.assertIsNone(netdev.parse_net_dev(_NET_DEV, ['eth9']))
+
+
+class CalculateRatesTest(unittest.TestCase):
+
+    def test_rates_of_each_interface(self):
+        old = _parse()[1]
+        new = [old[0], old[1] + 4000, old[2] + 2000, old[3], old[4] + 40]
+
+        self.assertEqual(netdev.calculate_rates(old, new, 4.0), [1000.0, 500.0, 0.0, 10.0])
+
+    def test_interfaces_changed(self):
+        old = _parse()[1]
+        new = _parse(['eth0', 'lo'])[1]
+
+        self.assertIsNone(netdev.calculate_rates(old, new[:len(old)], 1.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import array
+import collections
+import heapq
+import operator
+
+from . import history
+
+
+# The number of counters kept for each CPU core.  These are the same counters that are kept in `CPUInfo'.
+FIELD_COUNT = 8
+
+# The index of the idle counter within each CPU core's counters
+_IDLE_INDEX = 3
+
+
+# The counters of every CPU core in /proc/stat.  `cpu_ids' holds the number of each core.  `counters' holds
+# `FIELD_COUNT' counters for each core, one core after another in the same order as `cpu_ids'.
+PerCPUStat = collections.namedtuple('PerCPUStat', ['cpu_ids', 'counters'])
+
+
+def parse_per_cpu_stat(cpu_stat, extended_fields=True):
+    """Reads every `cpuN' line of /proc/stat in a single pass.
+
+    Args:
+        cpu_stat (str): the contents of /proc/stat.
+        extended_fields (bool): whether the lines have the iowait, irq, softirq and steal counters.  Cygwin only has the
+            first four counters.  When this is false, the missing counters are recorded as zero.
+
+    Returns:
+        Returns a `PerCPUStat', or None if `cpu_stat' does not contain any per-core lines.
+    """
+    cpu_ids = array.array('L')
+    counters = array.array('Q')
+    field_count = FIELD_COUNT if extended_fields else 4
+    padding = [0] * (FIELD_COUNT - field_count)
+
+    for line in (cpu_stat or '').splitlines():
+        if not line.startswith('cpu'):
+            # The CPU lines are always first, so there is nothing left to find
+            break
+
+        parts = line.split(maxsplit=field_count + 1)
+
+        if parts[0] != 'cpu':
+            cpu_ids.append(int(parts[0][3:]))
+            counters.extend(map(int, parts[1:field_count + 1]))
+            counters.extend(padding)
+
+    return PerCPUStat(cpu_ids=cpu_ids, counters=counters) if cpu_ids else None
+
+
+def calculate_usages(stat_old, stat_new):
+    """Calculates the usage of every core between two readings.
+
+    Returns:
+        Returns an `array' with the usage percentage of each core, in the same order as `stat_new.cpu_ids', or None if
+        the readings are not of the same cores.
+    """
+    usages = None
+
+    if stat_old is not None and stat_new is not None and stat_old.cpu_ids == stat_new.cpu_ids:
+        deltas = array.array('q', map(operator.sub, stat_new.counters, stat_old.counters))
+        totals = [sum(deltas[i:i + FIELD_COUNT]) for i in range(0, len(deltas), FIELD_COUNT)]
+        idles = deltas[_IDLE_INDEX::FIELD_COUNT]
+        usages = array.array('d', map(_calculate_usage, totals, idles))
+
+    return usages
+
+
+def _calculate_usage(delta_total, delta_idle):
+    return (delta_total - delta_idle) / delta_total * 100 if delta_total > 0 else 0.0
+
+
+def get_total(stat):
+    """Returns the sum of every counter of every core."""
+    return sum(stat.counters)
+
+
+def busiest(cpu_ids, usages, count):
+    """Returns up to `count' (cpu_id, usage) pairs for the busiest cores, busiest first."""
+    return heapq.nlargest(count, zip(cpu_ids, usages), key=operator.itemgetter(1))
+
+
+def format_bar(usages):
+    """Draws one block character per core, taller for busier cores."""
+    return history.sparkline(usages)
@@ -0,0 +1,68 @@
+# The short names used for each Pressure Stall Information resource, and the file in /proc/pressure that describes it
+RESOURCE_FILES = {
+    'cpu': 'cpu',
+    'mem': 'memory',
+    'io': 'io',
+}
+
+KINDS = ['some', 'full']
+WINDOWS = ['avg10', 'avg60', 'avg300']
+
+# The windows of /proc/loadavg, in minutes
+LOAD_WINDOWS = ['1', '5', '15']
+
+
+def parse_pressure(pressure):
+    """Reads the contents of one of the files in /proc/pressure.
+
+    Returns:
+        Returns a dictionary from each kind of stall (`some' and, when the kernel reports it, `full') to a dictionary
+        from each window to its percentage.  Returns None if nothing could be read.
+    """
+    stalls = {}
+
+    for line in (pressure or '').splitlines():
+        kind, _, values = line.partition(' ')
+
+        if kind in KINDS:
+            stalls[kind] = {key: float(value) for key, _, value in
+                            (field.partition('=') for field in values.split()) if key in WINDOWS}
+
+    return stalls if stalls else None
+
+
+def parse_load_average(loadavg):
+    """Reads the 1, 5 and 15 minute load averages from the contents of /proc/loadavg, or None if they are missing."""
+    parts = (loadavg or '').split()
+    return tuple(float(part) for part in parts[:len(LOAD_WINDOWS)]) if len(parts) >= len(LOAD_WINDOWS) else None
+
+
+def get_metric_names():
+    """Returns the names of every metric that can be given to `get_metric'."""
+    names = ['{}.{}.{}'.format(resource, kind, window)
+             for resource in RESOURCE_FILES for kind in KINDS for window in WINDOWS]
+    names.extend('load.{}'.format(window) for window in LOAD_WINDOWS)
+
+    return names
+
+
+def get_metric(name, pressures, load_average):
+    """Looks up a single value by name, like `mem.full.avg10' or `load.5'.
+
+    Args:
+        name (str): the name of the metric.
+        pressures (dict): a dictionary from each resource's short name to what `parse_pressure' returned for it.
+        load_average (tuple): what `parse_load_average' returned.
+
+    Returns:
+        Returns the value, or None if it is not available on this system.
+    """
+    parts = name.split('.')
+
+    if parts[0] == 'load':
+        value = load_average[LOAD_WINDOWS.index(parts[1])] if load_average else None
+    else:
+        resource, kind, window = parts
+        value = ((pressures.get(resource) or {}).get(kind) or {}).get(window)
+
+    return value
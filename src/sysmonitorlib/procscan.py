@@ -0,0 +1,136 @@
+import collections
+import os
+import os.path
+
+
+# Enough to hold all of /proc/[pid]/stat in a single read
+_MAX_STAT_LENGTH = 4096
+
+# Enough of /proc/[pid]/cmdline to fill a terminal line
+_MAX_CMDLINE_LENGTH = 1024
+
+# The indexes of the fields in /proc/[pid]/stat that come after the command name, which is the only field that can
+# contain spaces.  The state is field 3 in proc(5), so these are each 3 less than the field numbers in proc(5).
+_UTIME_INDEX = 11
+_STIME_INDEX = 12
+_START_TIME_INDEX = 19
+_RSS_PAGES_INDEX = 21
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+# A process is identified by its PID and start time together so that a PID that has been reused by a new process is not
+# mistaken for the old one.
+ProcessKey = collections.namedtuple('ProcessKey', ['pid', 'start_time'])
+ProcessUsage = collections.namedtuple('ProcessUsage', ['key', 'comm', 'cpu_percent', 'rss_bytes'])
+
+
+class ProcessScanner:
+    """Scans every process in /proc and calculates how much CPU each one used since the previous scan.
+
+    The command line of each process is read only when it is asked for, and then cached for as long as the process
+    lives, so repeated scans only read the stat file of each process.  The resident set size is also taken from the stat
+    file, which holds the same value as /proc/[pid]/statm and saves an open() and read() per process.
+    """
+
+    def __init__(self, proc_dir='/proc'):
+        self._proc_dir = proc_dir
+        self._cpu_ticks = {}
+        self._cmdlines = {}
+        self._scan_time = None
+
+    def scan(self, now):
+        """Scans every process.
+
+        Args:
+            now (float): the time of the scan, in seconds.  Only the difference between scans matters.
+
+        Returns:
+            Returns a list of `ProcessUsage'.  The CPU percentage is None for processes that were not seen by the
+            previous scan, and for every process on the first scan.  Like top, 100% is one whole core.
+        """
+        seconds = None if self._scan_time is None else now - self._scan_time
+        cpu_ticks = {}
+        usages = []
+
+        with os.scandir(self._proc_dir) as entries:
+            for entry in entries:
+                if entry.name.isdigit():
+                    process = self._read_process(entry.name, entry.path)
+
+                    if process is not None:
+                        key, comm, ticks, rss_bytes = process
+                        cpu_ticks[key] = ticks
+                        cpu_percent = self._get_cpu_percent(key, ticks, seconds)
+                        usages.append(ProcessUsage(key=key, comm=comm, cpu_percent=cpu_percent, rss_bytes=rss_bytes))
+
+        self._cpu_ticks = cpu_ticks
+        self._cmdlines = {key: cmdline for key, cmdline in self._cmdlines.items() if key in cpu_ticks}
+        self._scan_time = now
+
+        return usages
+
+    def get_cmdline(self, usage):
+        """Returns the command line of a process that was found by the last scan.
+
+        Kernel threads do not have command lines, so their command name is returned in brackets instead, like ps does.
+        """
+        cmdline = self._cmdlines.get(usage.key)
+
+        if cmdline is None:
+            raw = _read_proc_file(os.path.join(self._proc_dir, str(usage.key.pid), 'cmdline'), _MAX_CMDLINE_LENGTH)
+            cmdline = raw.rstrip(b'\0').replace(b'\0', b' ').decode('utf-8', 'replace') if raw else None
+            cmdline = cmdline or '[{}]'.format(usage.comm)
+            self._cmdlines[usage.key] = cmdline
+
+        return cmdline
+
+    def _read_process(self, pid, pid_dir):
+        # Plain concatenation is used instead of os.path.join() because this runs for every process on every scan
+        stat = _read_proc_file(pid_dir + '/stat', _MAX_STAT_LENGTH)
+
+        # The process exited before it could be read
+        return _parse_stat(pid, stat) if stat else None
+
+    def _get_cpu_percent(self, key, ticks, seconds):
+        ticks_old = self._cpu_ticks.get(key)
+        percent = None
+
+        if ticks_old is not None and seconds and seconds > 0:
+            percent = (ticks - ticks_old) / _CLOCK_TICKS / seconds * 100
+
+        return percent
+
+
+def _parse_stat(pid, stat):
+    comm_start = stat.find(b'(')
+    comm_end = stat.rfind(b')')
+    fields = stat[comm_end + 2:].split()
+
+    key = ProcessKey(pid=int(pid), start_time=int(fields[_START_TIME_INDEX]))
+    comm = stat[comm_start + 1:comm_end].decode('utf-8', 'replace')
+    ticks = int(fields[_UTIME_INDEX]) + int(fields[_STIME_INDEX])
+    rss_bytes = int(fields[_RSS_PAGES_INDEX]) * _PAGE_SIZE
+
+    return key, comm, ticks, rss_bytes
+
+
+def _read_proc_file(file_name, max_length):
+    """Reads a small /proc file with one open() and one read() system call.  Returns None if it could not be read."""
+    contents = None
+
+    try:
+        file_desc = os.open(file_name, os.O_RDONLY)
+    except OSError:
+        file_desc = None
+
+    if file_desc is not None:
+        try:
+            contents = os.read(file_desc, max_length)
+        except OSError:
+            contents = None
+        finally:
+            os.close(file_desc)
+
+    return contents
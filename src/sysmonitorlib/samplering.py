@@ -0,0 +1,265 @@
+import collections
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+
+# File layout
+# -----------
+# The file is a fixed size header followed by `slot_count' fixed size slots.  Each slot holds one timestamped sample.
+#
+#   header: magic, version, record format checksum, record size, slot count, sequence number of the newest sample
+#   slot:   sequence number, timestamp, record
+#
+# Samples are numbered starting from 1, and sample N is always stored in slot N % slot_count.  A slot whose sequence
+# number does not match the sample being looked for is either empty, has since been overwritten, or was being written
+# when its writer died.  In all of those cases the slot is ignored.
+#
+# Writers serialize on an exclusive flock() of the file.  Readers never lock.  Instead, a writer zeroes a slot's
+# sequence number before changing it and only sets it to the new sample's number once the rest of the slot is written.
+# Readers read the sequence number before and after copying a slot and throw the copy away if they do not match.
+#
+# Another process that uses a different layout for the same file replaces it.  The new file is written to a temporary
+# file and renamed over the old one, and a file is never truncated or resized once it has been renamed into place, so a
+# process that still has the old file mapped can keep reading it without faulting.  Readers and writers check whether
+# the file was replaced and map the new one.  A writer checks again once it holds the lock, so it never writes a sample
+# to a file that has been replaced.  A reader treats a file with a different layout as empty.
+_MAGIC = b'JNSR'
+_VERSION = 1
+
+_HEADER = struct.Struct('<4sHHII')
+_SEQ = struct.Struct('<Q')
+_HEAD_SEQ_OFFSET = _HEADER.size
+_SLOTS_OFFSET = 32
+
+_SLOT_PREFIX = struct.Struct('<Qd')
+
+# How many times a reader will re-read a slot that is in the middle of being written before giving up on it.
+_MAX_READ_ATTEMPTS = 3
+
+
+Sample = collections.namedtuple('Sample', ['seq', 'timestamp', 'record'])
+
+
+class SampleRing:
+    """A fixed-size, memory-mapped ring buffer of timestamped samples shared between processes.
+
+    Args:
+        path (str): the file backing the ring.  It is created if it does not exist and replaced if it has an
+            incompatible layout.
+        record_format (str): a `struct' format describing the values stored in each sample.
+        slot_count (int): the number of samples the ring holds before the oldest is overwritten.
+    """
+
+    def __init__(self, path, record_format, slot_count):
+        self._record = struct.Struct('<' + record_format.lstrip('<>=!@'))
+        self._slot = struct.Struct(_SLOT_PREFIX.format + self._record.format.lstrip('<'))
+        self._slot_count = slot_count
+        self._size = _SLOTS_OFFSET + self._slot.size * slot_count
+        format_checksum = zlib.crc32(self._record.format.encode('ascii')) & 0xffff
+        self._header = _HEADER.pack(_MAGIC, _VERSION, format_checksum, self._record.size, slot_count)
+        self._path = path
+        self._file_desc = None
+        self._map = None
+
+        try:
+            self._open_file(replace=True)
+        except Exception:
+            self._close_file()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._close_file()
+
+    @property
+    def head_seq(self):
+        """The sequence number of the newest sample, or 0 if nothing has been appended yet."""
+        return _SEQ.unpack_from(self._map, _HEAD_SEQ_OFFSET)[0] if self._is_current() else 0
+
+    def latest(self):
+        """Returns the newest complete sample, or None if the ring is empty."""
+        self._reopen_if_replaced()
+        head_seq = self.head_seq
+        sample = None
+
+        while sample is None and head_seq > 0:
+            sample = self._read_sample(head_seq)
+            head_seq -= 1
+
+        return sample
+
+    def samples(self, count=None):
+        """Returns up to `count' of the newest complete samples, oldest first.
+
+        All of the samples are returned if `count' is not given.
+        """
+        self._reopen_if_replaced()
+        head_seq = self.head_seq
+        count = self._slot_count if count is None else min(count, self._slot_count)
+        samples = (self._read_sample(seq) for seq in range(max(1, head_seq - count + 1), head_seq + 1))
+
+        return [sample for sample in samples if sample is not None]
+
+    def append(self, timestamp, record, expected_head_seq=None):
+        """Adds a sample to the ring, overwriting the oldest one if the ring is full.
+
+        Args:
+            timestamp (float): the time the sample was taken.
+            record (tuple): the values of the sample.  They must match the ring's record format.
+            expected_head_seq (int): if given, the sample is only added when the newest sample in the ring still has
+                this sequence number.  This lets a caller that computed the sample from the newest sample detect that
+                another process got there first.
+
+        Returns:
+            Returns the sequence number of the added sample, or None if `expected_head_seq' did not match.
+        """
+        seq = None
+
+        with self._locked():
+            head_seq = self.head_seq
+
+            if expected_head_seq is None or head_seq == expected_head_seq:
+                seq = head_seq + 1
+                offset = self._slot_offset(seq)
+
+                _SEQ.pack_into(self._map, offset, 0)
+                self._slot.pack_into(self._map, offset, 0, timestamp, *record)
+                _SEQ.pack_into(self._map, offset, seq)
+                _SEQ.pack_into(self._map, _HEAD_SEQ_OFFSET, seq)
+
+        return seq
+
+    def _read_sample(self, seq):
+        offset = self._slot_offset(seq)
+        sample = None
+
+        for _ in range(_MAX_READ_ATTEMPTS):
+            seq_before = _SEQ.unpack_from(self._map, offset)[0]
+            values = self._slot.unpack_from(self._map, offset)
+            seq_after = _SEQ.unpack_from(self._map, offset)[0]
+
+            # Otherwise a writer changed the slot while it was being copied
+            if seq_before == seq_after and seq_before != 0:
+                sample = Sample(seq=seq, timestamp=values[1], record=values[2:]) if seq_before == seq else None
+                break
+
+        return sample
+
+    def _slot_offset(self, seq):
+        return _SLOTS_OFFSET + (seq % self._slot_count) * self._slot.size
+
+    def _is_current(self):
+        return self._map is not None and self._map[:_HEADER.size] == self._header
+
+    def _is_replaced(self):
+        file_id = _get_file_id(os.fstat, self._file_desc) if self._file_desc is not None else None
+        return _get_file_id(os.stat, self._path) != file_id
+
+    def _reopen_if_replaced(self):
+        if self._is_replaced():
+            self._open_file(replace=False)
+
+    def _open_file(self, replace):
+        # A file that is shorter than the ring is never mapped, since reading past its end would fault
+        self._close_file()
+        file_desc = _open_or_none(self._path)
+
+        if replace and (file_desc is None or not self._has_layout(file_desc)):
+            if file_desc is not None:
+                os.close(file_desc)
+
+            file_desc = self._create_file()
+
+        self._file_desc = file_desc
+
+        if file_desc is not None and os.fstat(file_desc).st_size >= self._size:
+            self._map = mmap.mmap(file_desc, self._size)
+
+    def _create_file(self):
+        file_desc, temp_path = tempfile.mkstemp(dir=os.path.dirname(self._path) or '.', prefix='.', suffix='.tmp')
+
+        try:
+            os.fchmod(file_desc, 0o644)
+            os.ftruncate(file_desc, self._size)
+            os.pwrite(file_desc, self._header, 0)
+            os.replace(temp_path, self._path)
+        except BaseException:
+            os.close(file_desc)
+            os.remove(temp_path)
+            raise
+
+        return file_desc
+
+    def _has_layout(self, file_desc):
+        return os.pread(file_desc, _HEADER.size, 0) == self._header and os.fstat(file_desc).st_size == self._size
+
+    def _close_file(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+        if self._file_desc is not None:
+            os.close(self._file_desc)
+            self._file_desc = None
+
+    def _lock(self):
+        # The lock is on the file that was open when it was taken, so the file is checked again once the lock is held
+        # in case another process replaced it while this one waited
+        locked = False
+
+        while not locked:
+            if self._is_replaced() or not self._is_current():
+                self._open_file(replace=True)
+
+            fcntl.flock(self._file_desc, fcntl.LOCK_EX)
+            locked = not self._is_replaced() and self._is_current()
+
+            if not locked:
+                fcntl.flock(self._file_desc, fcntl.LOCK_UN)
+
+    def _unlock(self):
+        fcntl.flock(self._file_desc, fcntl.LOCK_UN)
+
+    def _locked(self):
+        return _RingLock(self._lock, self._unlock)
+
+
+class _RingLock:
+    def __init__(self, lock, unlock):
+        self._lock = lock
+        self._unlock = unlock
+
+    def __enter__(self):
+        self._lock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._unlock()
+
+
+def _open_or_none(path):
+    try:
+        file_desc = os.open(path, os.O_RDWR)
+    except FileNotFoundError:
+        file_desc = None
+
+    return file_desc
+
+
+def _get_file_id(stat_fn, file):
+    try:
+        file_stat = stat_fn(file)
+        file_id = file_stat.st_dev, file_stat.st_ino
+    except FileNotFoundError:
+        file_id = None
+
+    return file_id
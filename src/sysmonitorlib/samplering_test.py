@@ -0,0 +1,99 @@
+import os
+import os.path
+import shutil
+import struct
+import tempfile
+import unittest
+
+from sysmonitorlib import samplering
+
+
+class SampleRingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'ring')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_new_ring_is_empty(self):
+        with samplering.SampleRing(self.path, 'Qd', 4) as ring:
+            self.assertEqual(ring.head_seq, 0)
+            self.assertIsNone(ring.latest())
+            self.assertEqual(ring.samples(), [])
+
+    def test_file_layout(self):
+        with samplering.SampleRing(self.path, 'Qd', 4) as ring:
+            ring.append(12.5, (7, 0.25))
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        slot = struct.Struct('<QdQd')
+        self.assertEqual(len(data), 32 + slot.size * 4)
+        self.assertEqual(data[:4], b'JNSR')
+        self.assertEqual(struct.unpack_from('<HHII', data, 4)[0], 1)
+        self.assertEqual(struct.unpack_from('<HHII', data, 4)[2:], (16, 4))
+        self.assertEqual(struct.unpack_from('<Q', data, 16)[0], 1)
+        self.assertEqual(slot.unpack_from(data, 32 + slot.size), (1, 12.5, 7, 0.25))
+
+    def test_latest_is_newest_sample(self):
+        with samplering.SampleRing(self.path, 'Q', 4) as ring:
+            ring.append(1.0, (10,))
+            ring.append(2.0, (20,))
+
+            self.assertEqual(ring.latest(), samplering.Sample(seq=2, timestamp=2.0, record=(20,)))
+
+    def test_oldest_are_overwritten(self):
+        with samplering.SampleRing(self.path, 'Q', 3) as ring:
+            for i in range(1, 6):
+                ring.append(float(i), (i,))
+
+            self.assertEqual([s.record[0] for s in ring.samples()], [3, 4, 5])
+            self.assertEqual([s.record[0] for s in ring.samples(2)], [4, 5])
+
+    def test_expected_head_seq(self):
+        with samplering.SampleRing(self.path, 'Q', 4) as ring:
+            self.assertEqual(ring.append(1.0, (1,), expected_head_seq=0), 1)
+            self.assertIsNone(ring.append(2.0, (2,), expected_head_seq=0))
+            self.assertEqual(ring.head_seq, 1)
+
+    def test_shared_between_rings(self):
+        with samplering.SampleRing(self.path, 'Q', 4) as writer, samplering.SampleRing(self.path, 'Q', 4) as reader:
+            writer.append(1.0, (42,))
+
+            self.assertEqual(reader.latest().record, (42,))
+
+    def test_other_layout_replaces(self):
+        with samplering.SampleRing(self.path, 'Q', 4) as old_ring:
+            old_ring.append(1.0, (1,))
+
+            with samplering.SampleRing(self.path, 'QQ', 8) as new_ring:
+                self.assertIsNone(new_ring.latest())
+                new_ring.append(2.0, (2, 3))
+
+            # The old ring sees that its file was replaced and treats the new layout as empty
+            self.assertIsNone(old_ring.latest())
+            self.assertEqual(old_ring.head_seq, 0)
+
+    def test_writer_replaces_back(self):
+        with samplering.SampleRing(self.path, 'Q', 4) as ring:
+            samplering.SampleRing(self.path, 'QQ', 8).close()
+            ring.append(1.0, (5,))
+
+            self.assertEqual(ring.latest().record, (5,))
+
+        with samplering.SampleRing(self.path, 'Q', 4) as ring:
+            self.assertEqual(ring.latest().record, (5,))
+
+    def test_removed_file_is_empty(self):
+        with samplering.SampleRing(self.path, 'Q', 4) as ring:
+            ring.append(1.0, (1,))
+            os.remove(self.path)
+
+            self.assertIsNone(ring.latest())
+
+
+if __name__ == '__main__':
+    unittest.main()
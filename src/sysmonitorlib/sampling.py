@@ -0,0 +1,484 @@
+import array
+import os
+import os.path
+import time
+
+from jnscommons import jnsos
+
+from . import cgroup
+from . import daemon
+from . import deltas
+from . import diskstats
+from . import meminfo
+from . import netdev
+from . import percpu
+from . import pressure
+from . import samplering
+from . import watch
+
+PROC_MEM_FILE = '/proc/meminfo'
+PROC_CPU_FILE = '/proc/stat'
+PROC_DISK_FILE = '/proc/diskstats'
+PROC_NET_DEV_FILE = '/proc/net/dev'
+PROC_LOADAVG_FILE = '/proc/loadavg'
+PROC_PRESSURE_DIR = '/proc/pressure'
+
+# The sample rings are kept next to the daemons' sockets
+CONFIG_DIR = daemon.SOCKET_DIR
+CPU_SAMPLE_RING_FILE = 'cpu-samples.ring'
+CGROUP_CPU_SAMPLE_RING_FILE = 'cgroup-cpu-samples.ring'
+PER_CPU_SAMPLE_RING_FILE = 'per-cpu-samples.ring'
+DISK_SAMPLE_RING_FILE = 'disk-samples-{:08x}.ring'
+NET_SAMPLE_RING_FILE = 'net-samples-{:08x}.ring'
+
+# The CPU, per-CPU, disk and network readings are each kept in their own sample ring, along with the values calculated
+# from them.  The format of a ring depends on the number of cores, disks or interfaces being read, so a ring is
+# recreated whenever that number changes.  The disks and interfaces can be chosen on the command line, so each set of
+# them gets its own ring, named after the checksum of their names (the first counter of every reading).  Otherwise
+# invocations that read different disks or interfaces would keep recreating each other's rings.
+DELTA_SAMPLE_RING_SLOTS = 16
+
+# The minimum/maximum number of seconds between disk and network readings.  These work like `CPU_STAT_MIN_TIME' and
+# `CPU_STAT_MAX_TIME'.
+IO_MIN_INTERVAL = 1.0
+IO_MAX_INTERVAL = 60.0
+
+# Whether the memory and CPU usage describe the whole machine (the host) or the cgroup sysmonitor runs in (the
+# container).  The automatic view uses the container's usage for each resource that the container limits.
+VIEW_AUTO = 'auto'
+VIEW_HOST = 'host'
+VIEW_CONTAINER = 'container'
+
+# The time lengths in /proc/stat are mesured in 1/100ths of a second by default on x86 systems.  These variables are the
+# minimum/maximum amount of time between reading the CPU stats that this script will allow.  If the time between
+# readings is less than the minimum, the old CPU usage will be used.  If the time between readings is greater than this,
+# the CPU usage will be `None'.
+#
+# The time lengths have to be multiplied by the number of CPU cores in the current computer.  This is becuase the master
+# CPU stat line is just a sumation of all the individual CPU cores' stat lines.  So, with an 8 core machine, if a single
+# second has passed between readings of the stats, each CPU stat line will have incremented by a second.  That means the
+# total stat line will have incremented by 8 seconds.
+_CPU_COUNT = os.cpu_count() or 1
+CPU_STAT_MIN_TIME = 1000 * _CPU_COUNT
+CPU_STAT_MAX_TIME = 5000 * _CPU_COUNT
+
+
+##########################
+# Memory Usage Functions #
+##########################
+
+
+def get_memory_usage():
+    return OneShotSampler(VIEW_HOST).memory_usage()
+
+
+#######################
+# CPU Usage Functions #
+#######################
+
+
+def get_cpu_usage():
+    return OneShotSampler(VIEW_HOST).cpu_usage()
+
+
+def _create_cpu_delta():
+    return deltas.CounterDelta(counter_count=CPUInfo.FIELD_COUNT, result_count=1,
+                               calculate_fn=_calculate_cpu_results, interval_fn=_get_cpu_stat_interval,
+                               min_interval=CPU_STAT_MIN_TIME, max_interval=CPU_STAT_MAX_TIME)
+
+
+def _calculate_cpu_results(counters_old, counters_new, seconds):
+    cpu_info_old = CPUInfo.from_record(counters_old)
+    cpu_info_new = CPUInfo.from_record(counters_new)
+    usage = None
+
+    # There is not enough information to calculate the CPU usage
+    if _can_calculate_cpu_usage(cpu_info_old, cpu_info_new):
+        usage = _calculate_cpu_usage(cpu_info_old, cpu_info_new)
+
+    return None if usage is None else (usage,)
+
+
+def _get_cpu_stat_interval(counters_old, counters_new, seconds):
+    return sum(counters_new) - sum(counters_old)
+
+
+def _calculate_cpu_usage(cpu_info_old, cpu_info_new):
+    delta_total = cpu_info_new.total - cpu_info_old.total
+    delta_idle = cpu_info_new.idle - cpu_info_old.idle
+
+    return (delta_total - delta_idle) / delta_total * 100 if delta_total else None
+
+
+def _can_calculate_cpu_usage(cpu_info_old, cpu_info_new):
+    return (cpu_info_old and
+            cpu_info_old.idle and
+            cpu_info_old.total and
+            cpu_info_new and
+            cpu_info_new.idle and
+            cpu_info_new.total)
+
+
+def _get_cpu_info(cpu_stat):
+    cpu_info = None
+
+    if cpu_stat:
+        lines_it = iter(cpu_stat.splitlines())
+        line = next(lines_it, None)
+
+        while cpu_info is None and line:
+            if line.startswith('cpu '):
+                cpu_info = _read_cpu_stat_line(line)
+
+            line = next(lines_it, None)
+
+    return cpu_info
+
+
+def _read_cpu_stat_line(line):
+    parts = line.split()
+
+    user, system, nice, idle = parts[1:5]
+
+    if jnsos.is_linux():
+        wait, irq, srq, zero = parts[5:9]
+    else:
+        wait, irq, srq, zero = [0, 0, 0, 0]
+
+    return CPUInfo(
+        user=int(user),
+        system=int(system),
+        nice=int(nice),
+        idle=int(idle),
+        wait=int(wait),
+        irq=int(irq),
+        srq=int(srq),
+        zero=int(zero))
+
+
+###########################
+# Per-CPU Usage Functions #
+###########################
+
+
+def get_per_cpu_usages():
+    """Calculates the usage of every CPU core.
+
+    The same minimum/maximum time between readings that `get_cpu_usage' uses applies here.
+
+    Returns:
+        Returns a (cpu_ids, usages) tuple of arrays, or None if the usage could not be calculated.
+    """
+    return OneShotSampler().per_cpu_usages()
+
+
+def _create_per_cpu_delta(core_count):
+    # The counters of each reading are the ID of every core followed by the counters of every core
+    def calculate_fn(counters_old, counters_new, seconds):
+        stat_old = _get_counters_per_cpu_stat(core_count, counters_old)
+        stat_new = _get_counters_per_cpu_stat(core_count, counters_new)
+
+        return percpu.calculate_usages(stat_old, stat_new)
+
+    def interval_fn(counters_old, counters_new, seconds):
+        return sum(counters_new[core_count:]) - sum(counters_old[core_count:])
+
+    return deltas.CounterDelta(counter_count=core_count * (percpu.FIELD_COUNT + 1), result_count=core_count,
+                               calculate_fn=calculate_fn, interval_fn=interval_fn,
+                               min_interval=CPU_STAT_MIN_TIME, max_interval=CPU_STAT_MAX_TIME)
+
+
+def _get_per_cpu_stat(cpu_stat):
+    return percpu.parse_per_cpu_stat(cpu_stat, extended_fields=jnsos.is_linux())
+
+
+def _get_per_cpu_stat_counters(stat):
+    return tuple(stat.cpu_ids) + tuple(stat.counters)
+
+
+def _get_counters_per_cpu_stat(core_count, counters):
+    return percpu.PerCPUStat(cpu_ids=counters[:core_count], counters=counters[core_count:])
+
+
+####################################
+# Disk and Network Usage Functions #
+####################################
+
+
+def _create_disk_delta(device_count):
+    return deltas.CounterDelta(counter_count=diskstats.get_counter_count(device_count),
+                               result_count=diskstats.RESULT_COUNT, calculate_fn=diskstats.calculate_rates,
+                               min_interval=IO_MIN_INTERVAL, max_interval=IO_MAX_INTERVAL)
+
+
+def _create_net_delta(interface_count):
+    return deltas.CounterDelta(counter_count=netdev.get_counter_count(interface_count),
+                               result_count=netdev.get_result_count(interface_count),
+                               calculate_fn=netdev.calculate_rates,
+                               min_interval=IO_MIN_INTERVAL, max_interval=IO_MAX_INTERVAL)
+
+
+#############################
+# Container Usage Functions #
+#############################
+
+
+def _get_container(view):
+    """Finds the cgroup to describe for the given view.
+
+    Returns:
+        Returns a tuple of the cgroup directory, whether to use it for the memory usage, and whether to use it for the
+        CPU usage.  Returns None if the whole machine should be described.
+    """
+    cgroup_dir = None if view == VIEW_HOST else cgroup.find_cgroup_dir()
+    container = None
+
+    if cgroup_dir is not None:
+        limits = cgroup.read_limits(cgroup_dir)
+        use_memory = view == VIEW_CONTAINER or limits.memory_max is not None
+        use_cpu = view == VIEW_CONTAINER or cgroup.get_cpu_limit(limits) is not None
+        container = (cgroup_dir, limits, use_memory, use_cpu) if use_memory or use_cpu else None
+
+    return container
+
+
+def _get_container_memory_usage(cgroup_dir, limits, info):
+    # A cgroup without a memory limit can use all of the machine's memory
+    memory_limit = limits.memory_max if limits.memory_max is not None else info.get('MemTotal')
+
+    usage = cgroup.read_memory_usage(cgroup_dir, memory_limit)
+
+    return round(usage) if usage is not None else None
+
+
+def _create_container_cpu_delta(limits):
+    cpu_limit = min(cgroup.get_cpu_limit(limits) or _CPU_COUNT, _CPU_COUNT)
+    return deltas.CounterDelta(counter_count=len(cgroup.CPU_COUNTER_NAMES), result_count=cgroup.CPU_RESULT_COUNT,
+                               calculate_fn=cgroup.create_cpu_calculate_fn(cpu_limit),
+                               min_interval=IO_MIN_INTERVAL, max_interval=IO_MAX_INTERVAL)
+
+
+#####################
+# Utility Functions #
+#####################
+
+
+def make_config_dir():
+    if not os.path.isdir(CONFIG_DIR):
+        os.makedirs(CONFIG_DIR)
+
+
+def _read_proc_file(proc_file):
+    contents = None
+
+    # Some files exist but cannot be read when the kernel feature behind them is turned off, like /proc/pressure when
+    # the kernel was booted with psi=0.
+    try:
+        with open(proc_file, 'r') as f:
+            contents = f.read()
+    except OSError:
+        contents = None
+
+    return contents
+
+
+###########
+# Classes #
+###########
+
+
+class CPUInfo:
+    FIELD_COUNT = 8
+
+    def __init__(self, user, system, nice, idle, wait, irq, srq, zero):
+        self.user = user
+        self.system = system
+        self.nice = nice
+        self.idle = idle
+        self.wait = wait
+        self.irq = irq
+        self.srq = srq
+        self.zero = zero
+        self.total = user + system + nice + idle + wait + irq + srq + zero
+
+    @classmethod
+    def from_record(cls, record):
+        user, system, nice, idle, wait, irq, srq, zero = record[:cls.FIELD_COUNT]
+        return cls(user=user, system=system, nice=nice, idle=idle, wait=wait, irq=irq, srq=srq, zero=zero)
+
+    def as_record(self):
+        return (self.user, self.system, self.nice, self.idle, self.wait, self.irq, self.srq, self.zero)
+
+
+class OneShotSampler:
+    """Samples the usage using the state that is kept in the config directory between invocations."""
+
+    check_interval = True
+
+    def __init__(self, view=None, meminfo_fields=()):
+        self._view = view
+        self._meminfo_parser = meminfo.MemInfoParser(meminfo.DEFAULT_FIELDS + tuple(meminfo_fields))
+        self._meminfo = None
+        self._cpu_stat = None
+        self._pressures = None
+        self._container = None
+        self._container_cpu_results = None
+
+    def memory_usage(self):
+        container = self._get_container()
+
+        if container is not None and container[2]:
+            usage = _get_container_memory_usage(container[0], container[1], self.memory_info())
+        else:
+            usage = meminfo.get_memory_usage(self.memory_info())
+            usage = round(usage) if usage is not None else None
+
+        return usage
+
+    def memory_info(self):
+        # Read /proc/meminfo once no matter how many of its values are needed
+        if self._meminfo is None:
+            self._meminfo = self._meminfo_parser.parse(self._read_proc(PROC_MEM_FILE))
+
+        return self._meminfo
+
+    def cpu_usage(self):
+        container = self._get_container()
+        counters = cgroup.read_cpu_counters(container[0]) if container is not None and container[3] else None
+
+        if counters is not None:
+            self._container_cpu_results = self._update(CGROUP_CPU_SAMPLE_RING_FILE,
+                                                       _create_container_cpu_delta(container[1]), counters)
+            results = self._container_cpu_results
+        else:
+            cpu_info = _get_cpu_info(self._get_cpu_stat())
+            results = None
+
+            if cpu_info is not None:
+                results = self._update(CPU_SAMPLE_RING_FILE, _create_cpu_delta(), cpu_info.as_record())
+
+        return round(results[0]) if results is not None else None
+
+    def cpu_throttling(self):
+        """Returns the percentage of the container's CPU quota periods that were throttled and the milliseconds per
+        second that it spent throttled, or None if the CPU usage is not of a container with a CPU limit.
+
+        `cpu_usage' must be called first.
+        """
+        container = self._get_container()
+        results = self._container_cpu_results
+        limited = container is not None and cgroup.get_cpu_limit(container[1]) is not None
+
+        return (results[1], results[2]) if limited and results is not None else None
+
+    def per_cpu_usages(self):
+        stat = _get_per_cpu_stat(self._get_cpu_stat())
+        results = None
+
+        if stat is not None:
+            results = self._update(PER_CPU_SAMPLE_RING_FILE, _create_per_cpu_delta(len(stat.cpu_ids)),
+                                   _get_per_cpu_stat_counters(stat))
+
+        return (stat.cpu_ids, array.array('d', results)) if results is not None else None
+
+    def disk_rates(self, devices=None):
+        parsed = diskstats.parse_diskstats(self._read_proc(PROC_DISK_FILE), devices or diskstats.get_default_devices())
+        results = None
+
+        if parsed is not None:
+            names, counters = parsed
+            results = self._update(DISK_SAMPLE_RING_FILE.format(counters[0]), _create_disk_delta(len(names)), counters)
+
+        return results
+
+    def net_rates(self, interfaces=None):
+        parsed = netdev.parse_net_dev(self._read_proc(PROC_NET_DEV_FILE), interfaces)
+        results = None
+
+        if parsed is not None:
+            names, counters = parsed
+            results = self._update(NET_SAMPLE_RING_FILE.format(counters[0]), _create_net_delta(len(names)), counters)
+
+        return (names, results) if results is not None else None
+
+    def pressures(self):
+        # Read the pressure files once no matter how many of their values are needed
+        if self._pressures is None:
+            self._pressures = {resource: pressure.parse_pressure(self._read_proc(os.path.join(PROC_PRESSURE_DIR, file)))
+                               for resource, file in pressure.RESOURCE_FILES.items()}
+
+        return self._pressures
+
+    def load_average(self):
+        return pressure.parse_load_average(self._read_proc(PROC_LOADAVG_FILE))
+
+    def _update(self, ring_file, counter_delta, counters):
+        with self._open_store(ring_file, counter_delta.record_format) as store:
+            return counter_delta.update(store, counters, time.time(), check_interval=self.check_interval)
+
+    def _open_store(self, ring_file, record_format):
+        make_config_dir()
+        return samplering.SampleRing(os.path.join(CONFIG_DIR, ring_file), record_format,
+                                     DELTA_SAMPLE_RING_SLOTS)
+
+    def _get_container(self):
+        # Find the cgroup and read its limits once per sample.  The limits can be changed while the container runs.
+        if self._container is None:
+            self._container = _get_container(self._view) or ()
+
+        return self._container or None
+
+    def _get_cpu_stat(self):
+        # Read /proc/stat once no matter how many of its values are needed
+        if self._cpu_stat is None:
+            self._cpu_stat = self._read_proc(PROC_CPU_FILE)
+
+        return self._cpu_stat
+
+    def _read_proc(self, proc_file):
+        return _read_proc_file(proc_file)
+
+
+class DaemonSampler(OneShotSampler):
+    """Samples the usage for the daemon, keeping the previous readings in memory instead of in the config directory.
+
+    The daemon controls how often it samples, so the minimum/maximum time checks used by the one-shot path are not
+    needed here.  `tick' must be called before each new set of readings.
+    """
+
+    check_interval = False
+
+    def __init__(self, view=None, meminfo_fields=()):
+        super().__init__(view, meminfo_fields)
+        self._stores = {}
+
+    def tick(self):
+        self._meminfo = None
+        self._cpu_stat = None
+        self._pressures = None
+        self._container = None
+        self._container_cpu_results = None
+        return self
+
+    def _open_store(self, ring_file, record_format):
+        return self._stores.setdefault((ring_file, record_format), deltas.MemoryStore())
+
+
+class WatchSampler(DaemonSampler):
+    """Samples the usage for `--watch', keeping every /proc file it reads open between samples."""
+
+    def __init__(self, view=None, meminfo_fields=()):
+        super().__init__(view, meminfo_fields)
+        self._proc_files = {}
+
+    def close(self):
+        for proc_file in self._proc_files.values():
+            proc_file.close()
+
+        self._proc_files = {}
+
+    def _read_proc(self, proc_file):
+        if proc_file not in self._proc_files:
+            self._proc_files[proc_file] = watch.ProcFile(proc_file)
+
+        return self._proc_files[proc_file].read()
@@ -0,0 +1,264 @@
+import datetime
+import json
+import math
+import os
+import sys
+import time
+
+from . import diskstats
+from . import meminfo
+from . import pressure
+
+
+FORMAT_CSV = 'csv'
+FORMAT_JSON = 'json'
+
+# The starting size of the buffer used to read a /proc file.  It is doubled until the whole file fits.
+_INITIAL_READ_SIZE = 4096
+
+
+class ProcFile:
+    """A /proc file that is opened once and read again from the start with pread() every time it is needed.
+
+    The kernel regenerates the contents of a /proc file whenever it is read from offset zero, so keeping the file open
+    saves an open() and a close() on every read.
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._file_desc = None
+        self._read_size = _INITIAL_READ_SIZE
+
+    def read(self):
+        """Returns the current contents of the file, or None if it cannot be read."""
+        try:
+            if self._file_desc is None:
+                self._file_desc = os.open(self._path, os.O_RDONLY)
+
+            data = os.pread(self._file_desc, self._read_size, 0)
+
+            # The file may have been cut short, so read it again with a bigger buffer
+            while len(data) >= self._read_size:
+                self._read_size *= 2
+                data = os.pread(self._file_desc, self._read_size, 0)
+        except OSError:
+            self.close()
+            data = None
+
+        return None if data is None else data.decode('utf-8', 'replace')
+
+    def close(self):
+        if self._file_desc is not None:
+            os.close(self._file_desc)
+            self._file_desc = None
+
+
+class RecordWriter:
+    """Writes records, one per line, as CSV (with a header line) or as JSON lines.
+
+    Args:
+        columns (list): the name of each value in a record, in order.
+        record_format (str): `FORMAT_CSV' or `FORMAT_JSON'.
+        file_name (str): the file to write to, or None to write to stdout.
+        max_bytes (int): the size a file may grow to before it is rotated.  Zero means it is never rotated.
+        backup_count (int): the number of rotated files to keep, named FILE.1 (the newest) through FILE.N.
+    """
+
+    def __init__(self, columns, record_format, file_name=None, max_bytes=0, backup_count=0):
+        self._columns = columns
+        self._record_format = record_format
+        self._file_name = file_name
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._file = None
+        self._size = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, values):
+        if self._file is None:
+            self._open()
+
+        line = self._format(values)
+
+        if self._max_bytes and self._size and self._size + len(line.encode('utf-8')) > self._max_bytes:
+            self._rotate()
+
+        self._write_line(line)
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None and self._file is not sys.stdout:
+            self._file.close()
+
+        self._file = None
+
+    def _open(self):
+        if self._file_name is None:
+            self._file = sys.stdout
+        else:
+            self._file = open(self._file_name, 'a', encoding='utf-8')
+            self._size = self._file.tell()
+
+        if self._record_format == FORMAT_CSV and not self._size:
+            self._write_line(','.join(self._columns) + '\n')
+
+    def _rotate(self):
+        self.close()
+
+        if self._backup_count > 0:
+            for i in range(self._backup_count - 1, 0, -1):
+                backup = '{}.{}'.format(self._file_name, i)
+
+                if os.path.exists(backup):
+                    os.replace(backup, '{}.{}'.format(self._file_name, i + 1))
+
+            os.replace(self._file_name, self._file_name + '.1')
+        else:
+            os.remove(self._file_name)
+
+        self._open()
+
+    def _write_line(self, line):
+        self._file.write(line)
+        self._size += len(line.encode('utf-8'))
+
+    def _format(self, values):
+        if self._record_format == FORMAT_JSON:
+            line = json.dumps(dict(zip(self._columns, values)), separators=(',', ':'))
+        else:
+            line = ','.join('' if value is None else str(value) for value in values)
+
+        return line + '\n'
+
+
+def run(interval, sample_fn, writer, count=0):
+    """Writes a record every `interval' seconds until `count' records have been written, or forever if `count' is 0.
+
+    The records are scheduled against a fixed clock, so the time spent taking a sample does not make the records drift.
+    If sampling falls behind, the missed records are skipped instead of being written all at once.
+
+    Args:
+        interval (float): the seconds between records.
+        sample_fn (callable): returns the values of the next record.
+        writer (RecordWriter): writes each record.
+        count (int): the number of records to write.
+
+    Returns:
+        Returns a (records, cpu_seconds, wall_seconds) tuple with the number of records written, the CPU time this
+        process spent taking and writing them, and the time that passed while it did.  Neither time includes starting
+        the interpreter.
+    """
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    next_time = wall_start
+    records = 0
+
+    while not count or records < count:
+        writer.write(sample_fn())
+        records += 1
+
+        if count and records >= count:
+            break
+
+        now = time.monotonic()
+        next_time += interval
+
+        if next_time < now:
+            next_time += (now - next_time) // interval * interval + interval
+
+        time.sleep(next_time - now)
+
+    return records, time.process_time() - cpu_start, time.monotonic() - wall_start
+
+
+def get_columns(opts):
+    """Returns the name of each value that `create_record' samples for the output options, in order."""
+    columns = ['time', 'mem', 'cpu', 'throttled', 'throttled_ms']
+
+    if opts.swap:
+        columns.append('swap')
+
+    if opts.dirty:
+        columns.extend(['dirty', 'writeback'])
+
+    columns.extend(opts.meminfo_fields or [])
+
+    if opts.disk:
+        columns.extend(['disk_read', 'disk_write', 'disk_iops', 'disk_util'])
+
+    if opts.net:
+        columns.extend(['net_rx', 'net_tx'])
+
+    if opts.pressure:
+        columns.extend(name.replace('.', '_') for name in pressure.get_metric_names() if not name.startswith('load.'))
+
+    if opts.loadavg:
+        columns.extend('load_' + window for window in pressure.LOAD_WINDOWS)
+
+    return columns
+
+
+def create_record(opts, sampler):
+    """Samples the values of each of `get_columns' in the same order."""
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds')
+    values = [timestamp, sampler.memory_usage(), sampler.cpu_usage()]
+    values.extend(_round_values(sampler.cpu_throttling(), 2))
+
+    if opts.swap:
+        values.extend(_round_values([meminfo.get_swap_usage(sampler.memory_info())]))
+
+    if opts.dirty:
+        values.extend(meminfo.get_dirty_backlog(sampler.memory_info()))
+
+    values.extend(sampler.memory_info().get(field) for field in opts.meminfo_fields or [])
+
+    if opts.disk:
+        values.extend(_round_values(sampler.disk_rates(opts.disk_devices), diskstats.RESULT_COUNT))
+
+    if opts.net:
+        net_rates = sampler.net_rates(opts.net_interfaces)
+        rates = net_rates[1] if net_rates else None
+        values.extend(_round_values((sum(rates[0::2]), sum(rates[1::2])) if rates else None, 2))
+
+    if opts.pressure:
+        pressures = sampler.pressures()
+        values.extend(_round_values([pressure.get_metric(name, pressures, None)
+                                     for name in pressure.get_metric_names() if not name.startswith('load.')]))
+
+    if opts.loadavg:
+        values.extend(_round_values(sampler.load_average(), len(pressure.LOAD_WINDOWS)))
+
+    return values
+
+
+def check_overhead(records, cpu_seconds, wall_seconds, budget, interval):
+    """Prints the CPU overhead of a watch to stderr.  Returns whether it was within the budget.
+
+    Args:
+        records (int): the number of records that were written.
+        cpu_seconds (float): the CPU time spent taking and writing them.
+        wall_seconds (float): the time that passed while they were taken.
+        budget (float): the CPU overhead, as a percentage of one core, allowed at an interval of one second.
+        interval (float): the seconds between records.
+    """
+    # The budget is for the default interval of one second, so a watch that samples twice as often may use twice as much
+    budget = budget / interval
+    overhead = cpu_seconds / wall_seconds * 100 if wall_seconds > 0 else 0.0
+    print('sysmonitor: {} records, {:.2f}ms of CPU per record, {:.3f}% CPU overhead (budget {:.3f}%)'.format(
+        records, cpu_seconds / records * 1000, overhead, budget), file=sys.stderr)
+
+    return overhead <= budget
+
+
+def _round_values(values, count=None):
+    rounded = [None] * count if values is None else None
+
+    if values is not None:
+        rounded = [None if value is None or math.isnan(value) else round(value, 2) for value in values]
+
+    return rounded